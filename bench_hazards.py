@@ -0,0 +1,119 @@
+"""
+Hazard Scanner Benchmark - executor.validate_command against the per-pattern loop
+Checks the regression corpus of executor.test_hazard_patterns (every dangerous
+command blocked, every safe one allowed, same decision and matched rule as the
+old loop, also run by tests/test_executor_hazards.py), then times both
+implementations on the corpus.
+
+Usage:
+    python bench_hazards.py
+    python bench_hazards.py --iterations 20000 --json hazards.json
+"""
+import re
+import json
+import time
+import argparse
+from typing import Callable, Dict, List, Optional, Tuple
+
+from executor import (
+    DANGEROUS_TEST_COMMANDS,
+    HAZARD_PATTERNS,
+    SAFE_TEST_COMMANDS,
+    scan_hazards,
+    validate_command,
+)
+
+
+def legacy_validate(cmd_str: str) -> Tuple[bool, Optional[str]]:
+    """The previous validate_command hazard check: one re.search per pattern, first hit only"""
+    for pattern in HAZARD_PATTERNS:
+        try:
+            if re.search(pattern, cmd_str, re.IGNORECASE):
+                return False, pattern
+        except re.error:
+            continue
+    return True, None
+
+
+def corpus() -> List[Tuple[str, bool]]:
+    """(command, expected safe) pairs: the test commands plus every safe/dangerous concatenation"""
+    cases = [(cmd, False) for cmd in DANGEROUS_TEST_COMMANDS] + [(cmd, True) for cmd in SAFE_TEST_COMMANDS]
+    cases += [(f"{safe} {bad}", False) for safe in SAFE_TEST_COMMANDS for bad in DANGEROUS_TEST_COMMANDS]
+    return cases
+
+
+def check_regressions(cases: List[Tuple[str, bool]]) -> List[str]:
+    """Differences between the scanner, the legacy loop and the expected outcome"""
+    failures = []
+    for cmd, expected_safe in cases:
+        is_valid, _, pattern = validate_command(cmd)
+        legacy_safe, legacy_pattern = legacy_validate(cmd)
+        if is_valid != expected_safe:
+            failures.append(f"{'blocked' if expected_safe else 'allowed'} unexpectedly: {cmd}")
+        if is_valid != legacy_safe or pattern != legacy_pattern:
+            failures.append(f"differs from legacy loop ({pattern!r} vs {legacy_pattern!r}): {cmd}")
+        if legacy_pattern is not None and legacy_pattern not in {match.pattern for match in scan_hazards(cmd)}:
+            failures.append(f"rule {legacy_pattern!r} missing from scan_hazards: {cmd}")
+    return failures
+
+
+def time_calls(fn: Callable[[str], object], commands: List[str], iterations: int) -> float:
+    """Microseconds per call, best of three runs"""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for i in range(iterations):
+            fn(commands[i % len(commands)])
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def run(iterations: int) -> Dict:
+    cases = corpus()
+    failures = check_regressions(cases)
+
+    safe = [cmd for cmd, expected_safe in cases if expected_safe]
+    dangerous = [cmd for cmd, expected_safe in cases if not expected_safe]
+    timings = {}
+    for name, commands in (("safe", safe), ("dangerous", dangerous)):
+        legacy_us = time_calls(legacy_validate, commands, iterations)
+        scanner_us = time_calls(lambda cmd: scan_hazards(cmd), commands, iterations)
+        timings[name] = {"legacy_us": legacy_us, "scanner_us": scanner_us, "speedup": legacy_us / scanner_us}
+
+    return {
+        "patterns": len(HAZARD_PATTERNS),
+        "corpus": len(cases),
+        "failures": failures,
+        "iterations": iterations,
+        "timings": timings,
+    }
+
+
+def print_report(results: Dict) -> None:
+    print("=" * 70)
+    print("HAZARD SCANNER BENCHMARK")
+    print("=" * 70)
+    print(f"Patterns: {results['patterns']}   Corpus: {results['corpus']} commands   Iterations: {results['iterations']}")
+    status = f"{len(results['failures'])} FAILURES" if results["failures"] else "OK"
+    print(f"\nRegression corpus: {status}")
+    for failure in results["failures"]:
+        print(f"  ✗ {failure}")
+    print(f"\n{'commands':<12}{'legacy loop':>16}{'scanner':>16}{'speedup':>12}")
+    for name, timing in results["timings"].items():
+        print(f"{name:<12}{timing['legacy_us']:>13.2f} us{timing['scanner_us']:>13.2f} us{timing['speedup']:>11.1f}x")
+    print("\nThe legacy loop stops at the first hit, the scanner reports every matched rule of a dangerous command.")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark of the executor hazard scanner")
+    parser.add_argument("--iterations", type=int, default=5000, help="validate calls per timing run")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    raise SystemExit(1 if results["failures"] else 0)
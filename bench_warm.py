@@ -0,0 +1,135 @@
+"""
+Warm Python Benchmark - executor warm worker runs against cold interpreter spawns
+Runs workspace scripts through executor.execute_streaming with and without the
+warm worker, checks both give the same output and exit code (and that every
+warm run starts from a fresh module cache), then times both per invocation.
+
+Usage:
+    python bench_warm.py
+    EXECUTOR_WARM_PRELOAD=asyncio,decimal,email.mime.text python bench_warm.py --runs 50 --json warm.json
+"""
+import io
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import contextlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from executor import BASE_DIR, WARM_PRELOAD, execute_streaming, resolve_toolchain, warm_worker
+
+SCRIPT_DIR = BASE_DIR / ".bench_warm"
+
+SCRIPTS = {
+    "hello": 'print("hello")\n',
+    "argv": 'import sys\nprint(sys.argv[1:], __name__)\n',
+    "exit": 'import sys\nprint("leaving")\nsys.exit(3)\n',
+    "error": 'def fail():\n    raise ValueError("boom")\n\nfail()\n',
+    "isolation": 'import sys\nprint(hasattr(sys, "_bench_marker"))\nsys._bench_marker = True\n',
+    "imports": 'import asyncio, decimal, email.mime.text, json\nprint("imported")\n',
+}
+
+# (script, arguments) pairs whose output must not depend on the worker
+PARITY_CASES = [("hello", []), ("argv", ["a", "b"]), ("exit", []), ("error", []), ("isolation", []), ("isolation", [])]
+TIMED_SCRIPTS = ["hello", "imports"]
+
+
+def command(script: str, args: List[str]) -> List[str]:
+    return ["python", f"{SCRIPT_DIR.name}/{script}.py"] + args
+
+
+async def run(script: str, args: List[str], warm: bool) -> Tuple[float, Tuple[int, str, str]]:
+    """(seconds, (exit code, stdout, stderr)) of one invocation, the executor's own logging is muted"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        result = await execute_streaming(command(script, args), warm_python=warm)
+        elapsed = time.perf_counter() - started
+    return elapsed, (result.exit_code, result.stdout, result.stderr)
+
+
+async def check_parity() -> List[str]:
+    """Differences between warm and cold runs of the parity cases"""
+    failures = []
+    for script, args in PARITY_CASES:
+        _, cold = await run(script, args, warm=False)
+        _, warm = await run(script, args, warm=True)
+        if warm != cold:
+            failures.append(f"{script} {' '.join(args)}: warm {warm!r} vs cold {cold!r}")
+    return failures
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean())}
+
+
+async def bench(runs: int) -> Dict:
+    SCRIPT_DIR.mkdir(parents=True, exist_ok=True)
+    for name, source in SCRIPTS.items():
+        (SCRIPT_DIR / f"{name}.py").write_text(source)
+    try:
+        worker = warm_worker(resolve_toolchain().python[0])
+        started = time.perf_counter()
+        available = await asyncio.to_thread(worker.warm_up)
+        worker_start_ms = (time.perf_counter() - started) * 1000
+
+        failures = await check_parity() if available else ["warm worker unavailable on this platform"]
+        timings = {}
+        for script in TIMED_SCRIPTS if available else []:
+            samples = {"cold": [], "warm": []}
+            for _ in range(runs):
+                for mode in samples:    # interleaved, so both modes see the same machine load
+                    elapsed, _ = await run(script, [], warm=mode == "warm")
+                    samples[mode].append(elapsed)
+            cold, warm = summarize(samples["cold"]), summarize(samples["warm"])
+            timings[script] = {"cold": cold, "warm": warm, "speedup": cold["p50_ms"] / warm["p50_ms"]}
+        stats = worker.stats()
+    finally:
+        shutil.rmtree(SCRIPT_DIR, ignore_errors=True)
+
+    return {
+        "python": stats["python"],
+        "preload": WARM_PRELOAD,
+        "preloaded": stats["preloaded"],
+        "worker_start_ms": worker_start_ms,
+        "fallbacks": stats["fallbacks"],
+        "runs": runs,
+        "failures": failures,
+        "timings": timings,
+    }
+
+
+def print_report(results: Dict) -> None:
+    print("=" * 70)
+    print("WARM PYTHON WORKER BENCHMARK")
+    print("=" * 70)
+    print(f"Interpreter: {results['python']}")
+    print(f"Preloaded: {', '.join(results['preloaded']) or '-'}   Worker start: {results['worker_start_ms']:.1f} ms   Runs: {results['runs']}")
+    status = f"{len(results['failures'])} FAILURES" if results["failures"] else "OK"
+    print(f"\nWarm/cold parity: {status}   Cold fallbacks: {results['fallbacks']}")
+    for failure in results["failures"]:
+        print(f"  ✗ {failure}")
+    print(f"\n{'script':<10}{'cold p50':>12}{'warm p50':>12}{'cold p99':>12}{'warm p99':>12}{'speedup':>10}")
+    for name, timing in results["timings"].items():
+        cold, warm = timing["cold"], timing["warm"]
+        print(f"{name:<10}{cold['p50_ms']:>9.1f} ms{warm['p50_ms']:>9.1f} ms"
+              f"{cold['p99_ms']:>9.1f} ms{warm['p99_ms']:>9.1f} ms{timing['speedup']:>9.1f}x")
+    print("\nLatency is per execute_streaming call, including validation, routing and the process pool.")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of warm worker runs against cold python spawns")
+    parser.add_argument("--runs", type=int, default=30, help="invocations per script and mode")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args.runs))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    raise SystemExit(1 if results["failures"] else 0)
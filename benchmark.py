@@ -0,0 +1,194 @@
+"""
+Benchmark - End-to-end latency harness for /api/chat/stream
+Runs the server in-process on the fake LLM backend (no network access) and
+drives N concurrent sessions, reporting time-to-first-event, events/sec,
+p50/p99 per-tool latency and RSS growth of the server process.
+
+Usage:
+    python benchmark.py --sessions 8 --turns 3
+    python benchmark.py --sessions 32 --latency 0.2 --json results.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+from collections import defaultdict
+from typing import Dict, List
+
+
+# ============================================
+# Helpers
+# ============================================
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile, 0.0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    # ru_maxrss is the peak, in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ============================================
+# Load Generation
+# ============================================
+async def run_session(client, session_no: int, turns: int, stats: Dict) -> None:
+    """Drive one chat thread through `turns` sequential turns"""
+    thread_id = f"bench-{session_no}"
+    for turn in range(turns):
+        started = time.perf_counter()
+        first_event = None
+        first_token = None
+        tool_started: Dict[str, tuple] = {}
+
+        async with client.stream(
+            "POST", "/api/chat/stream",
+            json={"content": f"benchmark turn {turn}", "thread_id": thread_id}
+        ) as response:
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                now = time.perf_counter()
+                event = json.loads(line[6:])
+                stats["events"] += 1
+                if first_event is None:
+                    first_event = now - started
+
+                if event["type"] == "assistant_message" and first_token is None:
+                    first_token = now - started
+                elif event["type"] == "tool_call":
+                    tool_started[event["id"]] = (event["name"], now)
+                elif event["type"] == "tool_response" and event.get("id") in tool_started:
+                    name, tool_time = tool_started.pop(event["id"])
+                    stats["tools"][name].append(now - tool_time)
+                elif event["type"] == "error":
+                    stats["errors"].append(event.get("message"))
+
+        stats["ttfe"].append(first_event or 0.0)
+        if first_token is not None:
+            stats["ttft"].append(first_token)
+        stats["turns"].append(time.perf_counter() - started)
+
+
+async def run_benchmark(sessions: int, turns: int) -> Dict:
+    import httpx
+    import uvicorn
+    import server
+
+    port = free_port()
+    uv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+    serve_task = asyncio.create_task(uv.serve())
+    while not uv.started:
+        await asyncio.sleep(0.01)
+
+    stats = {"events": 0, "ttfe": [], "ttft": [], "turns": [], "tools": defaultdict(list), "errors": []}
+    rss_before = rss_mb()
+    started = time.perf_counter()
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        await asyncio.gather(*(run_session(client, i, turns, stats) for i in range(sessions)))
+
+    wall = time.perf_counter() - started
+    rss_after = rss_mb()
+    uv.should_exit = True
+    await serve_task
+
+    return {
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "wall_time_s": wall,
+        "turns_per_s": len(stats["turns"]) / wall,
+        "events": stats["events"],
+        "events_per_s": stats["events"] / wall,
+        "ttfe_p50_ms": percentile(stats["ttfe"], 50) * 1000,
+        "ttfe_p99_ms": percentile(stats["ttfe"], 99) * 1000,
+        "ttft_p50_ms": percentile(stats["ttft"], 50) * 1000,
+        "ttft_p99_ms": percentile(stats["ttft"], 99) * 1000,
+        "turn_p50_ms": percentile(stats["turns"], 50) * 1000,
+        "turn_p99_ms": percentile(stats["turns"], 99) * 1000,
+        "tools": {
+            name: {
+                "calls": len(values),
+                "p50_ms": percentile(values, 50) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+            for name, values in sorted(stats["tools"].items())
+        },
+        "rss_before_mb": rss_before,
+        "rss_after_mb": rss_after,
+        "rss_growth_mb": rss_after - rss_before,
+        "errors": stats["errors"],
+    }
+
+
+def print_report(results: Dict) -> None:
+    """Pretty print benchmark results"""
+    print("\n" + "=" * 70)
+    print(f"BENCHMARK: {results['sessions']} sessions x {results['turns_per_session']} turns")
+    print("=" * 70)
+    print(f"Wall time:             {results['wall_time_s']:.2f} s")
+    print(f"Turns/sec:             {results['turns_per_s']:.2f}")
+    print(f"Events/sec:            {results['events_per_s']:.1f} ({results['events']} events)")
+    print(f"Time to first event:   p50 {results['ttfe_p50_ms']:.1f} ms   p99 {results['ttfe_p99_ms']:.1f} ms")
+    print(f"Time to first token:   p50 {results['ttft_p50_ms']:.1f} ms   p99 {results['ttft_p99_ms']:.1f} ms")
+    print(f"Turn latency:          p50 {results['turn_p50_ms']:.1f} ms   p99 {results['turn_p99_ms']:.1f} ms")
+    print(f"RSS:                   {results['rss_before_mb']:.1f} MB -> {results['rss_after_mb']:.1f} MB "
+          f"({results['rss_growth_mb']:+.1f} MB)")
+
+    print(f"\n{'Tool':<24}{'Calls':>8}{'p50 ms':>12}{'p99 ms':>12}")
+    for name, tool in results["tools"].items():
+        print(f"{name:<24}{tool['calls']:>8}{tool['p50_ms']:>12.1f}{tool['p99_ms']:>12.1f}")
+
+    if results["errors"]:
+        print(f"\n✗ {len(results['errors'])} errors, first: {results['errors'][0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark for /api/chat/stream")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=2, help="Sequential turns per session")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per fake model call")
+    parser.add_argument("--script", help="JSON file with fake model scripts per role")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    # Configure the fake backend before the server is imported and run it in a scratch directory,
+    # so the benchmark's workspace, memory entries and checkpoints do not touch the project's own
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="bench-"))
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ.setdefault("CHECKPOINT_DB", os.path.join(os.getcwd(), "checkpoints.sqlite"))
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+    if args.script:
+        os.environ["FAKE_LLM_SCRIPT"] = args.script
+
+    results = asyncio.run(run_benchmark(args.sessions, args.turns))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
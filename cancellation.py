@@ -0,0 +1,75 @@
+"""
+Cancellation - Cooperative cancellation of running agent turns
+A token is created per run and checked between graph steps, before every
+tool call and inside long running tools (executor, human feedback)
+"""
+import threading
+from typing import Any, Optional
+
+from langchain.agents.middleware import AgentMiddleware
+from langgraph.config import get_config
+
+
+class RunCancelled(Exception):
+    """Raised inside a run once its token has been cancelled"""
+
+
+class CancellationToken:
+    """Thread-safe flag shared by the event loop and tool worker threads"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Request cancellation (first reason wins)"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Raise RunCancelled if cancellation was requested"""
+        if self._event.is_set():
+            raise RunCancelled(self.reason)
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to timeout seconds, returns True early if cancelled"""
+        return self._event.wait(timeout)
+
+
+def get_cancel_token(config: Optional[dict]) -> Optional[CancellationToken]:
+    """Get the run's token from a RunnableConfig (configurable.cancel_token)"""
+    if not config:
+        return None
+    return config.get("configurable", {}).get("cancel_token")
+
+
+def check_cancelled(config: Optional[dict] = None) -> None:
+    """Raise RunCancelled if the current run was cancelled"""
+    token = get_cancel_token(config if config is not None else get_config())
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class CancellationMiddleware(AgentMiddleware):
+    """Stop the agent loop between steps: before each model call and tool call"""
+
+    def before_model(self, state: Any, runtime: Any) -> None:
+        check_cancelled()
+        return None
+
+    async def abefore_model(self, state: Any, runtime: Any) -> None:
+        check_cancelled()
+        return None
+
+    def wrap_tool_call(self, request, handler):
+        check_cancelled(request.runtime.config)
+        return handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        check_cancelled(request.runtime.config)
+        return await handler(request)
@@ -0,0 +1,462 @@
+"""
+Checkpoint Store - Persistent, compressed LangGraph checkpointer
+SQLite (WAL mode) backed saver with zstd compressed msgpack payloads,
+per-thread retention and lazy loading of checkpoints from disk
+"""
+import os
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+import zstandard
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+# ============================================
+# Configuration
+# ============================================
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")     # sqlite | memory
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join(os.getcwd(), "checkpoints.sqlite"))
+CHECKPOINT_RETENTION = int(os.getenv("CHECKPOINT_RETENTION", "20"))        # checkpoints kept per thread
+CHECKPOINT_MAX_AGE = int(os.getenv("CHECKPOINT_MAX_AGE", str(60 * 60 * 24 * 30)))  # drop threads idle for 30 days
+COMPRESSION_LEVEL = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS refs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, channel)
+);
+CREATE INDEX IF NOT EXISTS refs_by_blob ON refs (thread_id, checkpoint_ns, channel, version);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Checkpointer storing every checkpoint on disk instead of process memory.
+
+    Channel values are stored once per version (like InMemorySaver blobs) and
+    all payloads are zstd compressed. Only the newest `retention` checkpoints
+    of each thread are kept; older ones, their writes and unreferenced blobs
+    are pruned on every put. The channel versions each checkpoint refers to
+    are kept in the `refs` table, so pruning blobs is a single SQL delete.
+    Nothing is cached, checkpoints are read lazily. The async API runs the
+    SQLite, zstd and msgpack work on a dedicated thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str = CHECKPOINT_DB,
+        retention: int = CHECKPOINT_RETENTION,
+        max_age: int = CHECKPOINT_MAX_AGE,
+        *,
+        serde=None
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.retention = retention
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._backfill_refs()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-store")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self.conn.close()
+
+    def _backfill_refs(self) -> None:
+        """INTERNAL: Fill the refs table of a database written before it existed (runs once)"""
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM refs LIMIT 1").fetchone() is not None:
+                return
+            rows = []
+            for thread_id, checkpoint_ns, checkpoint_id, type_, checkpoint_b in self.conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, type, checkpoint FROM checkpoints"
+            ).fetchall():
+                versions = self._loads(type_, checkpoint_b)["channel_versions"]
+                rows.extend(_ref_rows(thread_id, checkpoint_ns, checkpoint_id, versions))
+            if rows:
+                self.conn.executemany("INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)", rows)
+
+    # ============================================
+    # Serialization
+    # ============================================
+    def _dumps(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        return type_, self._compressor.compress(data)
+
+    def _loads(self, type_: str, data: bytes) -> Any:
+        return self.serde.loads_typed((type_, self._decompressor.decompress(data)))
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        channel_values: Dict[str, Any] = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row and row[0] != "empty":
+                channel_values[channel] = self._loads(row[0], row[1])
+        return channel_values
+
+    def _load_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint = self._loads(type_, checkpoint_b)
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self._loads(metadata_type, metadata_b),
+            pending_writes=[(task_id, channel, self._loads(t, v)) for task_id, channel, t, v in writes],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    # ============================================
+    # Sync API
+    # ============================================
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get the requested checkpoint, or the latest one of the thread"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._load_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints newest first, loading each one only when it is yielded"""
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id FROM checkpoints"
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id=?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns=?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id=?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id<?")
+            params.append(before_checkpoint_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            keys = self.conn.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, checkpoint_id in keys:
+            if limit is not None and limit <= 0:
+                break
+            item = self.get_tuple({
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            })
+            if item is None:
+                continue  # pruned meanwhile
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint and prune the thread down to the retention limit"""
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        values: Dict[str, Any] = c.pop("channel_values")
+        blob_rows = []
+        for channel, version in new_versions.items():
+            type_, blob = self._dumps(values[channel]) if channel in values else ("empty", b"")
+            blob_rows.append((thread_id, checkpoint_ns, channel, str(version), type_, blob))
+        type_, checkpoint_b = self._dumps(c)
+        metadata_type, metadata_b = self._dumps(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id, checkpoint_ns, checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),  # parent
+                        type_, checkpoint_b, metadata_type, metadata_b, time.time(),
+                    ),
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)",
+                    _ref_rows(thread_id, checkpoint_ns, checkpoint["id"], checkpoint["channel_versions"]),
+                )
+                self._prune(thread_id, checkpoint_ns)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Save pending writes of a task for a checkpoint"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        upserts, inserts = [], []
+        for idx, (channel, value) in enumerate(writes):
+            type_, value_b = self._dumps(value)
+            row = (
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, type_, value_b, task_path,
+            )
+            # Special channels (errors, interrupts) are overwritten, regular writes are kept once
+            (upserts if channel in WRITES_IDX_MAP else inserts).append(row)
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", upserts)
+            self.conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", inserts)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints, blobs and writes of a thread"""
+        with self._lock:
+            self.conn.execute("BEGIN")
+            for table in ("checkpoints", "blobs", "writes", "refs"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id=?", (thread_id,))
+            self.conn.execute("COMMIT")
+
+    def prune_stale_threads(self) -> int:
+        """Delete threads without a checkpoint newer than max_age. Returns number of threads deleted"""
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            stale = [row[0] for row in self.conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?", (cutoff,)
+            ).fetchall()]
+        for thread_id in stale:
+            self.delete_thread(thread_id)
+        return len(stale)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """INTERNAL: Keep only the newest `retention` checkpoints (caller holds the lock)"""
+        old_ids = [row[0] for row in self.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.retention),
+        ).fetchall()]
+        if not old_ids:
+            return
+
+        for checkpoint_id in old_ids:
+            for table in ("checkpoints", "writes", "refs"):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+
+        # Drop channel versions no remaining checkpoint refers to
+        self.conn.execute(
+            "DELETE FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND NOT EXISTS ("
+            "SELECT 1 FROM refs WHERE refs.thread_id=blobs.thread_id AND refs.checkpoint_ns=blobs.checkpoint_ns "
+            "AND refs.channel=blobs.channel AND refs.version=blobs.version)",
+            (thread_id, checkpoint_ns),
+        )
+
+    # ============================================
+    # Async API (runs the sync API on the store's own thread)
+    # ============================================
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = self.list(config, filter=filter, before=before, limit=limit)
+        while (item := await self._run(next, items, None)) is not None:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await self._run(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await self._run(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Sortable string versions, same scheme as InMemorySaver"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def _ref_rows(thread_id: str, checkpoint_ns: str, checkpoint_id: str, versions: ChannelVersions) -> list:
+    """refs rows of a checkpoint: the channel versions it reads its values from"""
+    return [(thread_id, checkpoint_ns, checkpoint_id, channel, str(version)) for channel, version in versions.items()]
+
+
+# ============================================
+# Factory
+# ============================================
+def create_checkpointer(backend: str = CHECKPOINT_BACKEND) -> BaseCheckpointSaver:
+    """Create the checkpointer selected by CHECKPOINT_BACKEND (sqlite or memory)"""
+    if backend == "memory":
+        return InMemorySaver()
+    if backend == "sqlite":
+        saver = SqliteCheckpointSaver()
+        pruned = saver.prune_stale_threads()
+        if pruned:
+            print(f"Pruned {pruned} stale checkpoint threads")
+        return saver
+    raise ValueError(f"Unknown checkpoint backend: {backend}. Use: sqlite or memory")
+
+
+def is_persistent(checkpointer: BaseCheckpointSaver) -> bool:
+    """True if conversation state survives restarts and need not be dropped on eviction"""
+    return not isinstance(checkpointer, InMemorySaver)
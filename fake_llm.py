@@ -0,0 +1,148 @@
+"""
+Fake LLM - Deterministic scripted chat model for offline runs and benchmarks
+Selected with LLM_BACKEND=fake. Each turn replays a script of steps: the step
+is chosen by the number of AI messages since the last user message, so the
+model is stateless and safe to share between concurrent sessions.
+"""
+import os
+import json
+import time
+import asyncio
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# ============================================
+# Configuration
+# ============================================
+FAKE_LLM_SCRIPT = os.getenv("FAKE_LLM_SCRIPT")                         # JSON file {role: [steps]} overriding the defaults
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0"))           # simulated seconds per model call
+FAKE_LLM_TOKEN_LATENCY = float(os.getenv("FAKE_LLM_TOKEN_LATENCY", "0"))  # simulated seconds per streamed token
+
+# A step is {"content": str, "tool_calls": [{"name": str, "args": dict}]}
+DEFAULT_SCRIPTS: Dict[str, List[Dict[str, Any]]] = {
+    "coding": [
+        {"content": "I will plan the task first.", "tool_calls": [
+            {"name": "todo_write", "args": {"todos": [
+                {"subtask": "Inspect the workspace", "status": "pending"},
+                {"subtask": "Check the python version", "status": "pending"},
+            ]}},
+        ]},
+        {"content": "", "tool_calls": [{"name": "todo_next", "args": {"intial_todo": True}}]},
+        {"content": "", "tool_calls": [{"name": "list_files", "args": {"directory": ""}}]},
+        {"content": "", "tool_calls": [{"name": "execute_command", "args": {"command": "python --version"}}]},
+        {"content": "", "tool_calls": [{"name": "memory_recollection", "args": {
+            "memory_context": "Checking python version of the workspace environment"}}]},
+        {"content": "", "tool_calls": [{"name": "memorization", "args": {
+            "observations": "The workspace python interpreter responds to python --version."}}]},
+        {"content": "All todos are completed. The workspace was inspected and the python version was checked.",
+         "tool_calls": []},
+    ],
+    # Memory and consolidation agents answer directly without touching the memory files,
+    # NONE is the consolidation reply for "nothing worth keeping"
+    "memory": [
+        {"content": "NONE", "tool_calls": []},
+    ],
+}
+
+
+def load_scripts(path: Optional[str] = FAKE_LLM_SCRIPT) -> Dict[str, List[Dict[str, Any]]]:
+    """Default scripts, overridden per role by the JSON file at path"""
+    scripts = dict(DEFAULT_SCRIPTS)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            scripts.update(json.load(f))
+    return scripts
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted stand-in for the remote chat models"""
+
+    role: str = "coding"
+    script: List[Dict[str, Any]] = []
+    latency: float = FAKE_LLM_LATENCY
+    token_latency: float = FAKE_LLM_TOKEN_LATENCY
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-scripted"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"role": self.role}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatModel":
+        # Tool calls come from the script, the schemas are not needed
+        return self
+
+    def _step(self, messages: List[BaseMessage]) -> AIMessage:
+        """Pick the scripted step for the current position in the turn"""
+        step = 0
+        for msg in reversed(messages):
+            if isinstance(msg, HumanMessage):
+                break
+            if isinstance(msg, AIMessage):
+                step += 1
+
+        if step < len(self.script):
+            entry = self.script[step]
+        else:
+            entry = {"content": "Done.", "tool_calls": []}
+
+        tool_calls = [
+            {"name": call["name"], "args": call.get("args", {}), "id": f"call_{step}_{i}", "type": "tool_call"}
+            for i, call in enumerate(entry.get("tool_calls", []))
+        ]
+        return AIMessage(content=entry.get("content", ""), tool_calls=tool_calls)
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        """Split a scripted message into word deltas and tool call chunks"""
+        words = message.content.split(" ") if message.content else []
+        for i, word in enumerate(words):
+            text = word if i == len(words) - 1 else word + " "
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        for index, call in enumerate(message.tool_calls):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": call["name"],
+                "args": json.dumps(call["args"]),
+                "id": call["id"],
+                "index": index,
+            }]))
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._step(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._step(messages))])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        for chunk in self._chunks(self._step(messages)):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self._step(messages)):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def create_fake_chat_model(role: str) -> FakeChatModel:
+    """Fake model for a role ("coding" or "memory")"""
+    scripts = load_scripts()
+    return FakeChatModel(role=role, script=scripts.get(role, []))
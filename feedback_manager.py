@@ -1,69 +1,82 @@
 """
 Feedback Manager - Handles human feedback requests without circular imports
+Each chat thread has at most one pending request; the tool waits on its event
+until the UI of that thread submits a response.
 """
 import time
-import asyncio
+import threading
+from dataclasses import dataclass, field
 from typing import Optional, Dict
 
-# Global state for human feedback
-feedback_state: Dict = {
-    "requested": False,
-    "request_id": None,
-    "response": None,
-    "timestamp": None
-}
-
-
-def set_feedback_request(request_id: str) -> None:
-    """Set a feedback request"""
-    global feedback_state
-    feedback_state["requested"] = True
-    feedback_state["request_id"] = request_id
-    feedback_state["response"] = None
-    feedback_state["timestamp"] = time.time()
-
-
-def set_feedback_response(feedback: str, accepted: bool) -> None:
-    """Set the feedback response"""
-    global feedback_state
-    feedback_state["response"] = {
-        "feedback": feedback,
-        "accepted": accepted
-    }
-    feedback_state["requested"] = False
+from cancellation import CancellationToken
+
+FEEDBACK_TIMEOUT = 300  # seconds a tool waits for the UI before carrying on without feedback
+
+
+@dataclass
+class FeedbackRequest:
+    """A feedback request of one thread, answered through `response` and `answered`"""
+    request_id: str
+    timestamp: float
+    answered: threading.Event = field(default_factory=threading.Event)
+    response: Optional[Dict] = None
+
+
+# Pending feedback requests per thread_id
+pending_requests: Dict[str, FeedbackRequest] = {}
+_pending_lock = threading.Lock()
+
+
+def set_feedback_request(thread_id: str, request_id: str) -> FeedbackRequest:
+    """Open a feedback request on a thread, replacing an unanswered older one"""
+    request = FeedbackRequest(request_id=request_id, timestamp=time.time())
+    with _pending_lock:
+        pending_requests[thread_id] = request
+    return request
 
 
-def get_feedback_state() -> Dict:
-    """Get current feedback state"""
-    global feedback_state
+def set_feedback_response(thread_id: str, feedback: str, accepted: bool) -> bool:
+    """Answer the pending request of a thread, False when there is none"""
+    with _pending_lock:
+        request = pending_requests.pop(thread_id, None)
+    if request is None:
+        return False
+    request.response = {"feedback": feedback, "accepted": accepted}
+    request.answered.set()
+    return True
+
+
+def get_feedback_state(thread_id: str) -> Dict:
+    """Get the feedback state of a thread"""
+    with _pending_lock:
+        request = pending_requests.get(thread_id)
     return {
-        "requested": feedback_state["requested"],
-        "request_id": feedback_state["request_id"],
-        "timestamp": feedback_state["timestamp"]
+        "requested": request is not None,
+        "request_id": request.request_id if request else None,
+        "timestamp": request.timestamp if request else None,
     }
 
 
-def request_feedback_from_ui() -> Dict:
-    """Request feedback from UI and wait for response (blocking version for tools)"""
-    global feedback_state
-    
-    # Set feedback request state
-    request_id = str(time.time())
-    set_feedback_request(request_id)
-    
-    # Wait for response (with timeout) using non-blocking sleep
-    timeout = 300  # 5 minutes
-    start_time = time.time()
-    
-    while feedback_state["response"] is None:
-        if time.time() - start_time > timeout:
-            feedback_state["requested"] = False
+def _discard_request(thread_id: str, request: FeedbackRequest) -> None:
+    with _pending_lock:
+        if pending_requests.get(thread_id) is request:
+            del pending_requests[thread_id]
+
+
+def request_feedback_from_ui(thread_id: str, cancel_token: Optional[CancellationToken] = None) -> Dict:
+    """Request feedback from the UI of a thread and wait for the response (blocking version for tools)
+    Raises RunCancelled if the run is cancelled while waiting"""
+    request = set_feedback_request(thread_id, str(time.time()))
+    deadline = time.time() + FEEDBACK_TIMEOUT
+
+    # wake up regularly to notice a cancelled run
+    while not request.answered.wait(0.1):
+        if time.time() > deadline:
+            _discard_request(thread_id, request)
             return {"feedback": "", "accepted": False}
-        
-        # Use shorter sleep to be more responsive
-        time.sleep(0.1)
-    
-    response = feedback_state["response"]
-    feedback_state["response"] = None
-    
-    return response
+
+        if cancel_token is not None and cancel_token.cancelled:
+            _discard_request(thread_id, request)
+            cancel_token.raise_if_cancelled()
+
+    return request.response
@@ -0,0 +1,40 @@
+"""
+LLM Factory - Single place where chat models are created
+LLM_BACKEND=ollama (default) uses the remote models, LLM_BACKEND=fake the
+deterministic scripted stand-in from fake_llm.py (no network access needed).
+LLM_CACHE=record|replay puts the response cache from llm_cache.py in front.
+"""
+import os
+from typing import Any
+
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+
+from llm_cache import get_response_cache
+
+# ============================================
+# Configuration
+# ============================================
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama")   # ollama | fake
+
+
+def create_chat_model(role: str = "coding", **kwargs: Any) -> BaseChatModel:
+    """
+    Create the chat model for a role ("coding" agent or "memory" agents).
+
+    Args:
+        role: Which agent the model is for, selects the fake script
+        **kwargs: Passed to init_chat_model (model, model_provider, base_url, ...)
+    """
+    if LLM_BACKEND == "fake":
+        from fake_llm import create_fake_chat_model
+        model = create_fake_chat_model(role)
+    elif LLM_BACKEND == "ollama":
+        model = init_chat_model(**kwargs)
+    else:
+        raise ValueError(f"Unknown LLM backend: {LLM_BACKEND}. Use: ollama or fake")
+
+    cache = get_response_cache()
+    if cache is not None:
+        model.cache = cache
+    return model
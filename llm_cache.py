@@ -0,0 +1,205 @@
+"""
+LLM Cache - Content addressed record/replay cache for chat model calls
+Plugs into LangChain's model cache hook: identical prompts sent to the same
+model (same name, temperature and bound tools) are answered from a SQLite
+file instead of a remote round-trip. LLM_CACHE=replay never calls the model.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+import xxhash
+import zstandard
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+# ============================================
+# Configuration
+# ============================================
+LLM_CACHE = os.getenv("LLM_CACHE", "off")                                   # off | record | replay
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", os.path.join(os.getcwd(), "llm_cache.sqlite"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))     # least recently used evicted above this
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(60 * 60 * 24 * 7)))      # seconds, 0 keeps entries forever
+COMPRESSION_LEVEL = 3
+
+# Per-run message fields that must not change the key (ids, timings, token counts)
+VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a prompt was never recorded"""
+
+
+def _encode(generations: RETURN_VAL_TYPE) -> bytes:
+    records = []
+    for gen in generations:
+        record = {"text": gen.text, "generation_info": gen.generation_info}
+        if isinstance(gen, ChatGeneration):
+            record["message"] = message_to_dict(gen.message)
+        records.append(record)
+    return json.dumps(records).encode("utf-8")
+
+
+def _decode(data: bytes) -> RETURN_VAL_TYPE:
+    generations = []
+    for record in json.loads(data):
+        if "message" in record:
+            message = messages_from_dict([record["message"]])[0]
+            generations.append(ChatGeneration(message=message, generation_info=record["generation_info"]))
+        else:
+            generations.append(Generation(text=record["text"], generation_info=record["generation_info"]))
+    return generations
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """
+    xxhash of the model parameters and the normalized messages.
+
+    `llm_string` is LangChain's description of the model call (model name,
+    temperature, bound tools, ...). Message ids and response metadata differ
+    between runs of the same conversation and are dropped from `prompt`.
+    """
+    try:
+        messages = json.loads(prompt)
+        for msg in messages:
+            kwargs = msg.get("kwargs", {})
+            for field in VOLATILE_FIELDS:
+                kwargs.pop(field, None)
+        prompt = json.dumps(messages, sort_keys=True)
+    except (ValueError, AttributeError, TypeError):
+        pass  # not a serialized message list, hash it as is
+    hasher = xxhash.xxh3_128()
+    hasher.update(llm_string.encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(prompt.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class ResponseCache(BaseCache):
+    """
+    On-disk LRU/TTL cache of chat model generations.
+
+    mode="record" answers hits from disk and stores every miss; mode="replay"
+    answers hits and raises CacheMiss instead of calling the model, so test
+    runs never touch the network. Entries older than `ttl` are ignored and
+    the least recently used ones are evicted above `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_DB,
+        mode: str = "record",
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl: int = LLM_CACHE_TTL
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown LLM cache mode: {mode}. Use: record or replay")
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._expire()
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def _expire(self) -> None:
+        if self.ttl:
+            with self._lock:
+                self.conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and row[1] < now - self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+            else:
+                self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                # zstd (de)compressors are not thread-safe, use them under the lock
+                return _decode(self._decompressor.decompress(row[0]))
+
+        if self.mode == "replay":
+            raise CacheMiss(f"No recorded LLM response for key {key} (LLM_CACHE=replay)")
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.mode == "replay":
+            return
+        key = cache_key(prompt, llm_string)
+        data = _encode(return_val)
+        now = time.time()
+        with self._lock:
+            value = self._compressor.compress(data)
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self.conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"mode": self.mode, "entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache(mode: str = LLM_CACHE) -> Optional[ResponseCache]:
+    """Shared cache selected by LLM_CACHE (off, record or replay), None when off"""
+    global _cache
+    if mode == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(mode=mode)
+        return _cache
@@ -0,0 +1,79 @@
+"""
+Long-Term Memory Prompt - Assemble the system prompt per model call
+The long-term memory section comes from a LongTermMemoryLoader snapshot, so
+consolidations and edits of long_term_memory/*.md reach the running agent
+without a restart. Only the sections most relevant to the user goal that fit
+the LTM token budget are injected, the prompt is rebuilt only when they change.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.config import get_config, get_stream_writer
+
+from memory.ltm import LTM_TOKEN_BUDGET, LongTermMemoryLoader
+from prompts import build_coding_system_prompt
+
+PROMPT_CACHE_SIZE = 64      # built system prompts kept, keyed by (memory version, goal, budget)
+
+
+def _user_goal(messages) -> str:
+    """Text of the latest user message, the goal of the current turn"""
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            return msg.text
+    return ""
+
+
+class LongTermMemoryMiddleware(AgentMiddleware):
+    """
+    Replace the system prompt with one built from the current long-term memory.
+
+    The LTM token budget is read per thread from `configurable.ltm_token_budget`
+    (falls back to LTM_TOKEN_BUDGET). Each call emits a custom stream event
+    with the memory tokens injected and available. Built prompts are cached
+    per memory version and goal, so a turn's tool loop reuses its prompt.
+    """
+
+    def __init__(
+        self,
+        loader: LongTermMemoryLoader,
+        build_prompt: Callable[[str], str] = build_coding_system_prompt
+    ):
+        super().__init__()
+        self.loader = loader
+        self.build_prompt = build_prompt
+        self._cache: "OrderedDict[Tuple[int, str, int], Tuple[SystemMessage, Dict[str, Any]]]" = OrderedDict()
+
+    def _system_message(self, goal: str, budget: int) -> Tuple[SystemMessage, Dict[str, Any]]:
+        version, _ = self.loader.snapshot()
+        key = (version, goal, budget)
+        cached = self._cache.get(key)
+        if cached is None:
+            version, content, metrics = self.loader.select(goal, budget)
+            cached = (SystemMessage(self.build_prompt(content)), metrics)
+            self._cache[(version, goal, budget)] = cached
+            while len(self._cache) > PROMPT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return cached
+
+    def _inject(self, request):
+        budget = get_config().get("configurable", {}).get("ltm_token_budget")
+        budget = LTM_TOKEN_BUDGET if budget is None else budget
+        system_message, metrics = self._system_message(_user_goal(request.messages), budget)
+
+        try:
+            get_stream_writer()({"type": "ltm_injection", **metrics})
+        except Exception:
+            pass  # not streaming (e.g. invoke), metrics are best effort
+
+        return request.override(system_message=system_message)
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._inject(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._inject(request))
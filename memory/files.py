@@ -0,0 +1,110 @@
+"""
+Memory Files - Safe concurrent writes of the Markdown memory files
+Writes go to a temp file in the same folder and are swapped in with
+os.replace, under a per-file lock (a threading lock plus an fcntl advisory
+lock, so other server processes sharing the memory folder are excluded too).
+compare_and_swap() only writes if the file still has the content hash the
+caller read, so lost updates are detected instead of silently overwritten.
+"""
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import xxhash
+
+try:
+    import fcntl
+except ImportError:     # Windows: only threads of this process are excluded
+    fcntl = None
+
+# ============================================
+# Configuration
+# ============================================
+MEMORY_WRITE_RETRIES = int(os.getenv("MEMORY_WRITE_RETRIES", "5"))   # compare-and-swap attempts before giving up
+LOCK_DIR = os.path.join(tempfile.gettempdir(), "memory-locks")       # lock files are kept out of the memory folder
+
+_locks: Dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+
+
+class WriteConflict(RuntimeError):
+    """The file changed since it was read and the write was not applied"""
+
+
+def content_hash(content: Optional[str]) -> Optional[str]:
+    """Hash of a file content, None for a missing file"""
+    return None if content is None else xxhash.xxh64_hexdigest(content)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on a memory file, held across threads and processes"""
+    path = os.path.abspath(path)
+    with _locks_guard:
+        lock = _locks.setdefault(path, threading.RLock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        lock_path = os.path.join(LOCK_DIR, xxhash.xxh64_hexdigest(path) + ".lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_versioned(path: str) -> Tuple[Optional[str], Optional[str]]:
+    """(content, content hash) of a file, (None, None) if it does not exist"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None, None
+    return content, content_hash(content)
+
+
+def atomic_write(path: str, content: str) -> None:
+    """Write to a temp file next to `path` and swap it in, readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def compare_and_swap(path: str, expected_hash: Optional[str], content: str) -> bool:
+    """Atomically write `content` if the file still hashes to `expected_hash` (None = must not exist)"""
+    with file_lock(path):
+        if read_versioned(path)[1] != expected_hash:
+            return False
+        atomic_write(path, content)
+        return True
+
+
+def update_file(path: str, transform: Callable[[Optional[str]], str], retries: int = MEMORY_WRITE_RETRIES) -> str:
+    """
+    Read-modify-write a file with compare-and-swap: `transform` gets the current
+    content (None if missing) and returns the new one, it is re-run on the
+    fresh content when another writer got in between. Returns the content written.
+    """
+    for _ in range(max(retries, 1)):
+        current, digest = read_versioned(path)
+        content = transform(current)
+        if compare_and_swap(path, digest, content):
+            return content
+    raise WriteConflict(f"{os.path.basename(path)} kept changing, gave up after {retries} attempts")
@@ -0,0 +1,193 @@
+"""
+Long-Term Memory Loader - Cached snapshot of long_term_memory/*.md
+The snapshot is only rebuilt when a file changed: a `watchfiles` watcher
+marks it stale as soon as the folder changes, and without a running
+watcher every call compares file mtimes and sizes instead. select() ranks
+the snapshot's sections against a goal and keeps the best within a token budget.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import xxhash
+from watchfiles import awatch
+from langchain_core.messages.utils import count_tokens_approximately
+
+from .retrieval import BM25Index
+
+# ============================================
+# Configuration
+# ============================================
+LTM_TOKEN_BUDGET = int(os.getenv("LTM_TOKEN_BUDGET", "4000"))   # long-term memory tokens per system prompt (0 = no limit)
+
+LTM_HEADINGS = {
+    "episodic.md": "Episodic Memory",
+    "semantic.md": "Semantic Memory",
+    "procedural.md": "Procedural Memory",
+}
+
+
+@dataclass
+class LtmSection:
+    """A `## section` of a long-term memory file"""
+
+    file: str           # e.g. semantic.md
+    text: str           # section text including its heading line
+    tokens: int
+
+
+def split_sections(file_name: str, text: str) -> List[LtmSection]:
+    """Split a memory file at its `## ` headings, text before the first heading is a section of its own"""
+    chunks, current = [], []
+    for line in text.splitlines():
+        if line.startswith("## ") and current:
+            chunks.append("\n".join(current))
+            current = []
+        current.append(line)
+    chunks.append("\n".join(current))
+    return [
+        LtmSection(file_name, chunk.strip(), count_tokens_approximately([chunk], extra_tokens_per_message=0))
+        for chunk in chunks if chunk.strip()
+    ]
+
+
+class LongTermMemoryLoader:
+    """
+    Snapshot of the long-term memory files, formatted like prompts.get_ltm_content().
+
+    snapshot() returns (version, content); the version only changes when the
+    content does, so callers can cache anything derived from it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[Tuple[int, int], str]] = {}   # file name -> ((mtime_ns, size), content)
+        self._content = ""
+        self._hash: Optional[str] = None
+        self._version = 0
+        self._sections: List[LtmSection] = []
+        self._index = BM25Index()          # doc id = position in self._sections
+        self._stale = True
+        self._watching = False
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        versions = {}
+        try:
+            names = sorted(os.listdir(self.path))
+        except OSError:
+            return versions
+        for name in names:
+            if name.startswith("."):
+                continue    # temp files of atomic writes
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            if os.path.isfile(os.path.join(self.path, name)):
+                versions[name] = (stat.st_mtime_ns, stat.st_size)
+        return versions
+
+    def _reload(self) -> None:
+        """Re-read only the files whose mtime/size changed and rebuild the snapshot"""
+        versions = self._scan()
+        files = {}
+        for name, version in versions.items():
+            cached = self._files.get(name)
+            if cached is not None and cached[0] == version:
+                files[name] = cached
+                continue
+            try:
+                with open(os.path.join(self.path, name), 'r', encoding='utf-8') as f:
+                    files[name] = (version, f.read())
+            except OSError:
+                continue
+        self._files = files
+
+        content = ""
+        for name, (_, text) in files.items():
+            heading = LTM_HEADINGS.get(name, "General Memory")
+            content += f"## {heading}\n\n{text}\n\n"
+        digest = xxhash.xxh64_hexdigest(content)
+        if digest != self._hash:
+            self._hash = digest
+            self._content = content
+            self._version += 1
+            self._sections = [section for name, (_, text) in files.items() for section in split_sections(name, text)]
+            self._index = BM25Index()
+            for position, section in enumerate(self._sections):
+                self._index.add(str(position), section.text)
+
+    def _refresh(self) -> None:
+        if self._stale or not self._watching:
+            self._stale = False
+            self._reload()
+
+    def snapshot(self) -> Tuple[int, str]:
+        """(version, formatted long-term memory), re-read only when a file changed"""
+        with self._lock:
+            self._refresh()
+            return self._version, self._content
+
+    def select(self, goal: str, budget: int = LTM_TOKEN_BUDGET) -> Tuple[int, str, Dict[str, Any]]:
+        """
+        (version, formatted long-term memory, metrics) holding only the sections
+        most relevant to `goal` that fit in `budget` tokens.
+
+        Sections are taken by BM25 score against the goal, then in file order
+        for those sharing no term with it, skipping any that no longer fit.
+        When everything fits (or budget is 0) the whole snapshot is returned.
+        """
+        with self._lock:
+            self._refresh()
+            version, content, sections, index = self._version, self._content, self._sections, self._index
+
+        available = sum(section.tokens for section in sections)
+        metrics = {
+            "tokens_available": available,
+            "sections_available": len(sections),
+            "token_budget": budget,
+        }
+        if budget <= 0 or available <= budget:
+            return version, content, {**metrics, "tokens_injected": available, "sections_injected": len(sections)}
+
+        ranked = [int(doc_id) for doc_id, _ in index.search(goal, k=len(sections))]
+        matched = set(ranked)
+        ranked += [position for position in range(len(sections)) if position not in matched]
+
+        selected, used = [], 0
+        for position in ranked:
+            if used + sections[position].tokens <= budget:
+                selected.append(position)
+                used += sections[position].tokens
+
+        by_file: Dict[str, List[str]] = {}
+        for position in sorted(selected):
+            by_file.setdefault(sections[position].file, []).append(sections[position].text)
+        content = ""
+        for name, texts in by_file.items():
+            heading = LTM_HEADINGS.get(name, "General Memory")
+            content += f"## {heading}\n\n" + "\n\n".join(texts) + "\n\n"
+        return version, content, {**metrics, "tokens_injected": used, "sections_injected": len(selected)}
+
+    async def watch(self) -> None:
+        """
+        Mark the snapshot stale whenever the folder changes (run as a background task).
+        awatch gives no signal once its watcher is registered, so snapshots keep
+        checking mtimes until it delivered its first change and edits made while
+        it was starting are not missed.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        try:
+            async for _ in awatch(self.path, debounce=100, step=20):
+                self._watching = True
+                self.invalidate()
+        except Exception as e:
+            print(f"Long-term memory watcher stopped, falling back to mtime checks: {e}")
+        finally:
+            self._watching = False
+            self.invalidate()
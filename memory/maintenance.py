@@ -0,0 +1,91 @@
+"""
+Memory Maintenance - Near-duplicate merging and value-based eviction
+Entries are embedded as L2-normalized vectors of hashed character n-grams,
+so the cosine similarity of two entries is a dot product. Entries are scored
+by recency and recall hits; the lowest-value ones are evicted (or archived)
+when a tier grows over its size cap.
+"""
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import xxhash
+
+from .store import MemoryEntry
+
+# ============================================
+# Configuration
+# ============================================
+MEMORY_DEDUP_THRESHOLD = float(os.getenv("MEMORY_DEDUP_THRESHOLD", "0.85"))       # cosine similarity of near-duplicates
+MEMORY_DECAY_HALF_LIFE = float(os.getenv("MEMORY_DECAY_HALF_LIFE", str(60 * 60 * 24 * 30)))  # seconds until an unused entry is worth half
+MEMORY_SHORT_TERM_MAX_ENTRIES = int(os.getenv("MEMORY_SHORT_TERM_MAX_ENTRIES", "2000"))     # short-term size cap (0 = no cap)
+MEMORY_LONG_TERM_MAX_ENTRIES = int(os.getenv("MEMORY_LONG_TERM_MAX_ENTRIES", "1000"))       # long-term size cap (0 = no cap)
+MEMORY_ARCHIVE = os.getenv("MEMORY_ARCHIVE", "1") == "1"      # evicted entries are moved to the archive table instead of deleted
+TIER_CAPS = {"short": MEMORY_SHORT_TERM_MAX_ENTRIES, "long": MEMORY_LONG_TERM_MAX_ENTRIES}
+NGRAM = 4               # character shingle length
+DIMENSIONS = 1 << 12    # hashed feature space
+
+
+def embed(texts: Sequence[str]) -> np.ndarray:
+    """(len(texts), DIMENSIONS) matrix of L2-normalized hashed character n-gram counts"""
+    vectors = np.zeros((len(texts), DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        normalized = f" {' '.join(text.lower().split())} "
+        grams = [normalized[i:i + NGRAM] for i in range(max(len(normalized) - NGRAM + 1, 1))]
+        buckets = np.fromiter((xxhash.xxh32_intdigest(gram) % DIMENSIONS for gram in grams), dtype=np.int64, count=len(grams))
+        np.add.at(vectors[row], buckets, 1.0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def find_duplicates(
+    entries: Sequence[MemoryEntry],
+    after_id: int = 0,
+    threshold: float = MEMORY_DEDUP_THRESHOLD
+) -> List[Tuple[int, int]]:
+    """
+    (kept id, duplicate id) pairs among entries of one category. Only entries
+    newer than `after_id` are checked, each against the older entries still
+    kept; the older entry of a pair survives.
+    """
+    new = [i for i, entry in enumerate(entries) if entry.id > after_id]
+    if not new:
+        return []
+    vectors = embed([entry.content for entry in entries])
+    ids = np.asarray([entry.id for entry in entries], dtype=np.int64)
+    alive = np.ones(len(entries), dtype=bool)
+
+    similarities = vectors[new] @ vectors.T
+    pairs = []
+    for row, i in enumerate(new):
+        similarity = similarities[row]
+        candidates = np.flatnonzero(alive & (ids < ids[i]) & (similarity >= threshold))
+        if len(candidates):
+            best = candidates[np.argmax(similarity[candidates])]
+            pairs.append((int(ids[best]), int(ids[i])))
+            alive[i] = False
+    return pairs
+
+
+def value_scores(entries: Sequence[MemoryEntry], now: Optional[float] = None, half_life: float = MEMORY_DECAY_HALF_LIFE) -> np.ndarray:
+    """Value of each entry: (1 + recall hits), halved every `half_life` seconds since it was created or last recalled"""
+    now = time.time() if now is None else now
+    last_used = np.asarray([max(entry.created_at, entry.last_recalled or 0) for entry in entries], dtype=np.float64)
+    hits = np.asarray([entry.hits for entry in entries], dtype=np.float64)
+    return (1 + hits) * np.power(0.5, np.maximum(now - last_used, 0) / half_life)
+
+
+def eviction_candidates(entries: Sequence[MemoryEntry], cap: int, protected_after: Optional[int] = None) -> List[int]:
+    """
+    Ids of the lowest-value entries to drop so that at most `cap` remain.
+    Entries with id > `protected_after` (e.g. not consolidated yet) are never chosen.
+    """
+    excess = len(entries) - cap
+    if cap <= 0 or excess <= 0:
+        return []
+    eligible = [entry for entry in entries if protected_after is None or entry.id <= protected_after]
+    if not eligible:
+        return []
+    order = np.argsort(value_scores(eligible), kind="stable")[:excess]
+    return [eligible[i].id for i in order]
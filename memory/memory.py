@@ -1,17 +1,146 @@
 import os
-from langchain.chat_models import init_chat_model
+import re
+import time
+import uuid
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import xxhash
+from llm import create_chat_model
 from dotenv import load_dotenv
-from langchain.tools import tool
+from langchain.tools import tool, ToolRuntime
 from langchain.agents import create_agent
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
 from .memory_prompts import MEMORY_SYSTEM_PROMPT, CONSOLIDATION_SYSTEM_PROMPT
+from .retrieval import BM25Index
+from .store import MemoryEntry, MemoryStore, entry_hash
+from .paths import LONG_TERM_DIR, SHORT_TERM_DIR, resolve_memory_path
+from .files import MEMORY_WRITE_RETRIES, WriteConflict, compare_and_swap, read_versioned
+from .write_queue import Incident, MemorizationQueue
+from .maintenance import MEMORY_ARCHIVE, TIER_CAPS, eviction_candidates, find_duplicates
 
 
 # Load environment variables from a .env file
 load_dotenv()
 
+MEMORY_LLM_COMPACTION = os.getenv("MEMORY_LLM_COMPACTION", "0") == "1"       # LLM rewrite of grown short-term files
+MEMORY_COMPACTION_BYTES = int(os.getenv("MEMORY_COMPACTION_BYTES", "16000"))  # file size that triggers the rewrite
+MEMORY_RECALL_TOP_K = int(os.getenv("MEMORY_RECALL_TOP_K", "8"))               # entries returned by recall
+MEMORY_RECALL_RERANK = os.getenv("MEMORY_RECALL_RERANK", "0") == "1"           # LLM re-rank of ambiguous results
+RERANK_MARGIN = 0.15    # results are ambiguous when the k-th score is within this fraction of the best
+MEMORY_MODEL_MAX_TOKENS = 1000     # output token cap of the memory model
+MEMORY_CONSOLIDATION_BATCH = int(os.getenv("MEMORY_CONSOLIDATION_BATCH", "20"))    # short-term entries per consolidation call, the reply has to fit MEMORY_MODEL_MAX_TOKENS
+MEMORY_CONSOLIDATION_ENTRIES = int(os.getenv("MEMORY_CONSOLIDATION_ENTRIES", "50"))     # pending entries that trigger consolidation
+MEMORY_CONSOLIDATION_BYTES = int(os.getenv("MEMORY_CONSOLIDATION_BYTES", "32000"))      # pending bytes that trigger consolidation
+MEMORY_CONSOLIDATION_PERIOD = int(os.getenv("MEMORY_CONSOLIDATION_PERIOD", str(60 * 60 * 24)))  # seconds between consolidations
+CONSOLIDATION_WATERMARK = "consolidated_short_term_id"
+CONSOLIDATED_AT = "consolidated_at"
+DEDUP_WATERMARK = "deduplicated_id"
+
+# memorization argument -> (short-term file, heading)
+SHORT_TERM_CATEGORIES = {
+    "coding_knowledge": ("coding-knowledge.md", "Coding Knowledge"),
+    "architectural_decisions": ("architectural-decisions.md", "Architectural Decisions"),
+    "preferences": ("preferences.md", "Preferences"),
+    "observations": ("observations.md", "Observations"),
+    "insights": ("insights.md", "Insights"),
+    "constraints_discovery": ("constraints-discovery.md", "Constraints Discovery"),
+    "edges_cases_discovery": ("edge-cases-discovery.md", "Edges Cases Discovery"),
+    "failures": ("failures.md", "Failures"),
+}
+
+LONG_TERM_FILES = {
+    "episodic.md": "Episodic Memory",
+    "semantic.md": "Semantic Memory",
+    "procedural.md": "Procedural Memory",
+}
+
+# Markdown view (category) -> heading shown in recall results
+CATEGORY_HEADINGS = {**dict(SHORT_TERM_CATEGORIES.values()), **LONG_TERM_FILES}
+
+
+def parse_entries(content: str) -> List[Tuple[str, str]]:
+    """(section, entry) pairs of a Markdown view: every non-empty line that is not a heading or rule, under its last heading"""
+    entries = []
+    section = ""
+    for line in content.splitlines():
+        text = line.strip()
+        if text.startswith("#"):
+            section = text.lstrip("#").strip()
+            continue
+        text = text.lstrip("-*").strip()
+        if text and not text.startswith("---"):
+            entries.append((section, text))
+    return entries
+
+
+def parse_consolidation_deltas(content: str) -> List[Tuple[str, str, str]]:
+    """
+    (long-term file, section, entry) triples from a consolidation reply of the form:
+
+        [semantic.md] Section name
+        - entry
+        - entry
+    """
+    deltas = []
+    file_name, section = None, ""
+    for line in content.splitlines():
+        header = re.match(r"^\s*\[(episodic|semantic|procedural)\.md\]\s*(.*)$", line)
+        if header:
+            file_name, section = f"{header.group(1)}.md", header.group(2).strip().strip("#").strip()
+            continue
+        text = line.strip()
+        if file_name and text[:1] in ("-", "*"):
+            text = text.lstrip("-*").strip()
+            if text:
+                deltas.append((file_name, section, text))
+    return deltas
+
+
+def parse_consolidation_reply(message) -> Optional[List[Tuple[str, str, str]]]:
+    """
+    Deltas of a consolidation reply, [] for NONE. None when the reply cannot be
+    trusted: cut off at the output token cap, or neither NONE nor in the delta format.
+    """
+    metadata = getattr(message, "response_metadata", None) or {}
+    stop = metadata.get("finish_reason") or metadata.get("done_reason") or metadata.get("stop_reason")
+    if stop in ("length", "max_tokens"):
+        return None
+    content = message.text
+    if content.strip().strip(".").upper() == "NONE":
+        return []
+    deltas = parse_consolidation_deltas(content)
+    return deltas or None
+
+
+def render_entries(entries: List[MemoryEntry]) -> str:
+    """Markdown view of a category: bullets grouped under their section headings"""
+    sections: Dict[str, List[str]] = {}
+    for entry in entries:
+        sections.setdefault(entry.section, []).append(f"- {entry.content}")
+
+    blocks = []
+    for section, bullets in sections.items():
+        block = "\n".join(bullets)
+        blocks.append(f"## {section}\n\n{block}" if section else block)
+    return "\n\n".join(blocks) + "\n" if blocks else ""
+
+
+def _run_key(runtime: ToolRuntime) -> str:
+    """Memory agent run the tool call belongs to (the thread_id each run is invoked with)"""
+    return (runtime.config or {}).get("configurable", {}).get("thread_id", "default")
+
+
+def forget_reads(run_key: str) -> None:
+    """Drop the read versions recorded by a finished memory agent run"""
+    with _read_hashes_lock:
+        for key in [key for key in _read_hashes if key[0] == run_key]:
+            del _read_hashes[key]
+
 
 @tool
-def read_file(relative_path: str) -> str:
+def read_file(relative_path: str, runtime: ToolRuntime) -> str:
     """
     Reads the content of a file present in specified relative path and returns it content.
     
@@ -25,7 +154,7 @@ def read_file(relative_path: str) -> str:
     - read_file("\short_term_memory\architectural-decisions.md") to access architectural decisions memory
 
     Important:
-    - Always use relative file paths in the format start with backslash followed by the folder name (e.g., \short_term_memory\coding-knowledge.md).
+    - Always use relative file paths starting with the folder name, separated by backslashes or forward slashes (e.g., \short_term_memory\coding-knowledge.md or short_term_memory/coding-knowledge.md).
     - Do not use absolute paths.
 
     args:
@@ -33,18 +162,19 @@ def read_file(relative_path: str) -> str:
 
     """
     try:
-        parts = relative_path.split("\\")  # Ensure the path uses backslashes
-        file_path = os.path.join(os.getcwd(), "memory", *parts)
-        
-        with open(file_path, 'r') as f:
-            content = f.read()
+        file_path = str(resolve_memory_path(relative_path))
+        content, digest = read_versioned(file_path)
+        with _read_hashes_lock:
+            _read_hashes[(_run_key(runtime), file_path)] = digest  # None: the file may be created
+        if content is None:
+            raise FileNotFoundError(f"No such file: {relative_path}")
         return content
     except Exception as e:
         return f"Error reading file: {e}"
 
 
 @tool
-def write_file(relative_path: str, content: str) -> str:
+def write_file(relative_path: str, content: str, runtime: ToolRuntime) -> str:
     """
     Writes the given content to a file at the specified relative path.
 
@@ -57,7 +187,7 @@ def write_file(relative_path: str, content: str) -> str:
     - write_file("\short_term_memory\architectural-decisions.md", "updated architectural decision")
 
     Important:
-    - Always use relative file paths in the format start with backslash followed by the folder name (e.g., \short_term_memory\coding-knowledge.md).
+    - Always use relative file paths starting with the folder name, separated by backslashes or forward slashes (e.g., \short_term_memory\coding-knowledge.md or short_term_memory/coding-knowledge.md).
     - Do not use absolute paths.
 
     args:
@@ -65,12 +195,16 @@ def write_file(relative_path: str, content: str) -> str:
 
     """
     try:
-        parts = relative_path.split("\\")  # Ensure the path uses backslashes
-        file_path = os.path.join(os.getcwd(), "memory", *parts)
-
-        
-        with open(file_path, 'w') as f:
-            f.write(content)
+        file_path = str(resolve_memory_path(relative_path))
+        key = (_run_key(runtime), file_path)
+
+        # compare-and-swap against the version this run read, so a concurrent update is not lost
+        with _read_hashes_lock:
+            if key not in _read_hashes:
+                return "Error writing to file: read it first with read_file, then write your updated version."
+            expected = _read_hashes.pop(key)
+        if not compare_and_swap(file_path, expected, content):
+            return "Error writing to file: it was changed since you read it. Read it again and reapply your changes."
         return f"Content successfully written"
     except Exception as e:
         return f"Error writing to file: {e}"
@@ -78,17 +212,36 @@ def write_file(relative_path: str, content: str) -> str:
 
 tools = [read_file, write_file]
 
+# (memory agent run, memory file path) -> content hash when that run last read it, write_file only overwrites that version
+_read_hashes: Dict[Tuple[str, str], Optional[str]] = {}
+_read_hashes_lock = threading.Lock()
+
 
 
 class Memory:
     def __init__(self):
         
-        current_dir = os.getcwd()
-        self.short_term_memory_path = f"{current_dir}\memory\short_term_memory"
-        self.long_term_memory_path = f"{current_dir}\memory\long_term_memory"
-        self.consolidation_periodicity = 60 * 60 * 24 # 24 hours in seconds
+        self.short_term_memory_path = str(SHORT_TERM_DIR)
+        self.long_term_memory_path = str(LONG_TERM_DIR)
+        self.consolidation_periodicity = MEMORY_CONSOLIDATION_PERIOD # 24 hours in seconds by default
+
+        # one record per memory entry, the Markdown files are views rendered from the store
+        self.store = MemoryStore()
+        self._lock = threading.RLock()
+        self._compacting: Set[str] = set()
+        self._view_stats: Dict[str, Tuple[int, int]] = {}       # view path -> (mtime_ns, size) when last synced
+        self._view_hashes: Dict[str, str] = {}                  # view path -> content hash when last synced
+        self._view_paths: Optional[List[Tuple[str, str, str]]] = None
+
+        # local BM25 index over all stored entries, doc id = entry id
+        self.index = BM25Index()
+        with self._lock:
+            self._import_markdown()
+            for entry in self.store.entries():
+                self.index.add(str(entry.id), entry.content)
         
-        self.model = init_chat_model(
+        self.model = create_chat_model(
+                                        "memory",
                                         model="gpt-oss:20b",
                                         model_provider="ollama",
                                         base_url="https://ollama.com",
@@ -96,7 +249,7 @@ class Memory:
                                         # Kwargs passed to the model:
                                         temperature=1,
                                         #timeout=30,
-                                        max_tokens=1000,
+                                        max_tokens=MEMORY_MODEL_MAX_TOKENS,
                                     ) 
         
         
@@ -106,125 +259,412 @@ class Memory:
                                             tools=tools
                                             )
         
+        # consolidation replies with long-term deltas instead of rewriting the files through tools
         self.consolidation_agent = create_agent(
                                             self.model,
-                                            system_prompt=CONSOLIDATION_SYSTEM_PROMPT,
-                                            tools=tools
+                                            system_prompt=CONSOLIDATION_SYSTEM_PROMPT
                                             )
+        self._consolidation_lock = threading.Lock()
+
+        # write-behind queue of memorization calls, drained in batches by worker threads
+        self.queue = MemorizationQueue(self._write_incidents)
         
 
     
     
-    def memorize(self, memory_incident:str):
+    def memorize(self, memory_entries: Dict[str, str], source_thread: Optional[str] = None, source_todo: Optional[str] = None) -> str:
         """
-        This method takes a memory incident (a string describing an event, observation, or experience) and stores it in the appropriate memory storage (short-term) based on its relevance and importance.
+        This method stores a memory incident in short-term memory without an LLM call.
+        Each provided field of the incident (coding_knowledge, failures, ...) becomes an entry of its category in the memory store, entries already present are skipped by hash.
+        Grown categories are optionally rewritten by the memory agent in the background (MEMORY_LLM_COMPACTION=1).
         """
+        stored, duplicates = self._write_incidents([Incident(memory_entries, source_thread, source_todo)])
+        return f"Stored {stored} new memory entries, skipped {duplicates} duplicates."
 
-        memorize_prompt = f"""
-        MEMORIZE: Analyze the memory incident clearly and recognize the appropriate memory category files based on the following memory incident, then read those files, integrate the new structured details without duplication, rewrite the entire updated content, and save it.
-        
-        use only single backslash for file paths in the format start with backslash followed by the folder name (e.g., \short_term_memory\coding-knowledge.md) when mentioning the file paths while reading and writing the files.
 
-        #memory incident: 
-        {memory_incident} 
+    def memorize_later(self, memory_entries: Dict[str, str], source_thread: Optional[str] = None, source_todo: Optional[str] = None) -> int:
+        """
+        Queue a memory incident for the write-behind workers and return right away with the number of entries queued.
+        Queued incidents are written before any recall or consolidation, call flush() to wait for them explicitly.
+        """
+        entries = {category: text for category, text in memory_entries.items() if category in SHORT_TERM_CATEGORIES and text and text.strip()}
+        if entries:
+            self.queue.submit(Incident(entries, source_thread, source_todo))
+        return len(entries)
+
+
+    def flush(self) -> None:
+        """Wait until every queued memory incident is stored"""
+        self.queue.flush()
+
+
+    def _write_incidents(self, incidents: List[Incident]) -> Tuple[int, int]:
+        """Store the entries of several incidents in one store transaction, returns (stored, duplicates)"""
+        duplicates = 0
+        touched = set()
+
+        with self._lock:
+            added = []
+            with self.store.transaction():
+                for incident in incidents:
+                    for category, text in incident.entries.items():
+                        if category not in SHORT_TERM_CATEGORIES or not text or not text.strip():
+                            continue
+                        file_name = SHORT_TERM_CATEGORIES[category][0]
+                        entry = self.store.add(
+                            "short", file_name, " ".join(text.split()),
+                            source_thread=incident.source_thread, source_todo=incident.source_todo
+                        )
+                        if entry is None:
+                            duplicates += 1
+                            continue
+                        added.append(entry)
+                        touched.add(file_name)
+            # index only once the transaction is committed
+            for entry in added:
+                self.index.add(str(entry.id), entry.content)
+            stored = len(added)
+
+        if MEMORY_LLM_COMPACTION:
+            for file_name in touched:
+                if self.store.size(category=file_name)[1] > MEMORY_COMPACTION_BYTES:
+                    self.compact_in_background(file_name)
+
+        return stored, duplicates
+
+
+    def compact(self, file_name: str) -> str:
+        """
+        This method lets the memory agent rewrite one short-term file, merging overlapping entries and dropping redundant ones.
+        """
+        compact_prompt = f"""
+        COMPACT: Read the short-term memory file \\short_term_memory\\{file_name}, merge entries that describe the same learning, remove redundant or trivial entries, and rewrite the entire file as a list of "- " bullet points.
+
+        use only single backslash for file paths in the format start with backslash followed by the folder name (e.g., \\short_term_memory\\coding-knowledge.md) when mentioning the file paths while reading and writing the files.
 
-        give some done message in brief after successful memorization."""
+        give some done message in brief after successful compaction."""
 
-        
+        self.sync_markdown()  # the agent reads the rendered view
+        run_key = f"compact-{file_name}-{uuid.uuid4().hex}"  # read versions are tracked per run
+        try:
+            response = self.memory_agent.invoke(
+                                                {"messages": [{"role": "user", "content": compact_prompt}]},
+                                                config={"configurable": {"thread_id": run_key}}
+                                                )
+        finally:
+            forget_reads(run_key)
+        self.sync_markdown()  # import the rewritten view back into the store
 
-        response = self.memory_agent.invoke(
-                                            {"messages": [{"role": "user", "content": memorize_prompt}]}
-                                            )
-        
-        return f"Response: {response['messages'][-1].content}" # Return the content of the last message in the response
+        return f"Response: {response['messages'][-1].content}"
+
+
+    def compact_in_background(self, file_name: str) -> None:
+        """Start compact(file_name) in a daemon thread unless it is already running"""
+        with self._lock:
+            if file_name in self._compacting:
+                return
+            self._compacting.add(file_name)
+
+        def run():
+            try:
+                self.compact(file_name)
+            except Exception as e:
+                print(f"Memory compaction of {file_name} failed: {e}")
+            finally:
+                with self._lock:
+                    self._compacting.discard(file_name)
+
+        threading.Thread(target=run, name=f"memory-compact-{file_name}", daemon=True).start()
 
 
     def recall(self, memory_context:str):
         """
         This method retrieves relevant structured memories from external memory based on the provided context. The context can be a query, a situation, or any information that helps in identifying which memories are relevant to the current situation.
+        Short- and long-term entries are ranked locally with BM25, the memory model only re-ranks ambiguous results when MEMORY_RECALL_RERANK=1.
         """
-        recall_prompt = f"""
-        RECALL: Analyze the following memory context, determine which memory category files are relevant, read only those files, extract only the memory details directly related to the provided context, and return only the relevant memory content.
-        
+        top_k = MEMORY_RECALL_TOP_K
+        self.flush()  # queued incidents are recalled too
+        with self._lock:
+            self._import_markdown()
+            results = self.index.search(memory_context, k=top_k * 2 if MEMORY_RECALL_RERANK else top_k)
+        entries = {entry.id: entry for entry in self.store.get(int(doc_id) for doc_id, _ in results)}
+        hits = [(entries[int(doc_id)], score) for doc_id, score in results if int(doc_id) in entries]
+
+        if not hits:
+            return "No relevant memories found for this context."
+
+        scores = [score for _, score in hits]
+        last = scores[min(top_k, len(scores)) - 1]
+        if MEMORY_RECALL_RERANK and len(hits) > 1 and scores[0] - last < RERANK_MARGIN * scores[0]:
+            hits = self._rerank(memory_context, hits)
+
+        hits = hits[:top_k]
+        self.store.record_hits(entry.id for entry, _ in hits)
+        lines = [f"- [{CATEGORY_HEADINGS.get(entry.category, entry.category)}] {entry.content}" for entry, _ in hits]
+        return "Relevant memories:\n" + "\n".join(lines)
+
+
+    def _rerank(self, memory_context: str, hits: List[Tuple[MemoryEntry, float]]) -> List[Tuple[MemoryEntry, float]]:
+        """Let the memory model order candidates whose BM25 scores are too close to call"""
+        candidates = "\n".join(
+            f"{i}. [{CATEGORY_HEADINGS.get(entry.category, entry.category)}] {entry.content}"
+            for i, (entry, _) in enumerate(hits, 1)
+        )
+        rerank_prompt = f"""
+        RERANK: Order the candidate memories below by relevance to the memory context. Reply only with the numbers of the relevant candidates, most relevant first, separated by commas.
+
         #memory context:
         {memory_context}
 
-        give some done message in brief after successful recall.
-
+        #candidates:
+        {candidates}
         """
-
-        response = self.memory_agent.invoke(
-                                            {"messages": [{"role": "user", "content": recall_prompt}]}
-                                            )
-        
-        return f"Response: {response['messages'][-1].content}" # Return the relevant memory content
+        try:
+            response = self.model.invoke(rerank_prompt)
+            order = [int(n) - 1 for n in re.findall(r"\d+", str(response.content))]
+        except Exception as e:
+            print(f"Memory re-rank failed, using BM25 order: {e}")
+            return hits
+
+        ranked = [hits[i] for i in dict.fromkeys(order) if 0 <= i < len(hits)]
+        return ranked or hits
+
+
+    def _views(self) -> List[Tuple[str, str, str]]:
+        """(tier, category, path) of every Markdown view, resolved once"""
+        if self._view_paths is None:
+            views = [("short", name, str(SHORT_TERM_DIR / name)) for name, _ in SHORT_TERM_CATEGORIES.values()]
+            views += [("long", name, str(LONG_TERM_DIR / name)) for name in LONG_TERM_FILES]
+            self._view_paths = views
+        return self._view_paths
+
+
+    def _import_markdown(self) -> None:
+        """Import Markdown views edited outside the store (memory agents, UI editor, files from older versions)"""
+        for tier, category, path in self._views():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._view_hashes.pop(path, None)
+                continue  # missing views are rendered again by sync_markdown
+            version = (stat.st_mtime_ns, stat.st_size)
+            if self._view_stats.get(path) == version:
+                continue
+
+            content, digest = read_versioned(path)
+            if content is None:
+                self._view_hashes.pop(path, None)
+                continue
+            content_hash, _, synced_at = self.store.view(category)
+            if digest != content_hash and (content_hash is not None or content.strip()):
+                items = parse_entries(content)
+                added, removed = self.store.replace_category(tier, category, items, keep_after=synced_at)
+                for entry_id in removed:
+                    self.index.remove(str(entry_id))
+                for entry in added:
+                    self.index.add(str(entry.id), entry.content)
+                self.store.set_view(category, digest, time.time())
+                # entries stored after the file was last written are not in it yet
+                if self.store.size(category=category)[0] != len({entry_hash(text) for _, text in items}):
+                    self.store.mark_dirty(category)
+            self._view_stats[path] = version
+            self._view_hashes[path] = digest
+
+
+    def sync_markdown(self) -> None:
+        """
+        Bring the Markdown views up to date: import files edited outside the store, then re-render the categories changed in the store (or missing on disk).
+        Rendering is lazy, call this before anything reads the files (UI, memory agents, system prompt).
+        Views are written atomically with a compare-and-swap against the content last imported, a file edited in the meantime is imported again instead of being overwritten.
+        """
+        with self._lock:
+            for _ in range(MEMORY_WRITE_RETRIES):
+                self._import_markdown()
+                if all(self._render_view(category, path) for _, category, path in self._views()):
+                    return
+            raise WriteConflict(f"Memory views kept changing, gave up after {MEMORY_WRITE_RETRIES} attempts")
+
+
+    def _render_view(self, category: str, path: str) -> bool:
+        """Render a dirty or missing view, False if the file changed since it was last imported"""
+        _, dirty, _ = self.store.view(category)
+        if not dirty and os.path.exists(path):
+            return True
+        content = render_entries(self.store.entries(category=category))
+        if not compare_and_swap(path, self._view_hashes.get(path), content):
+            self._view_stats.pop(path, None)  # re-read it on the next import even if mtime and size match
+            return False
+        digest = xxhash.xxh64_hexdigest(content)
+        self.store.set_view(category, digest, time.time())
+        stat = os.stat(path)
+        self._view_stats[path] = (stat.st_mtime_ns, stat.st_size)
+        self._view_hashes[path] = digest
+        return True
     
 
-    def consolidate(self):
+    def maintain(self) -> Dict[str, int]:
+        """
+        Merge near-duplicate entries stored since the last run into their older twin (recall hits are added up), then evict the lowest-value entries (recency and hits) of tiers over their size cap.
+        Short-term entries that were not consolidated yet are never evicted. Evicted entries are archived (MEMORY_ARCHIVE=1) or deleted.
+        """
+        stats = {"merged": 0, "evicted": 0}
+        with self._lock:
+            self._import_markdown()
+            watermark = self.store.watermark(DEDUP_WATERMARK)
+            last_id = watermark
+            for tier, category, _ in self._views():
+                entries = self.store.entries(tier=tier, category=category)
+                if not entries:
+                    continue
+                last_id = max(last_id, entries[-1].id)
+                duplicates: Dict[int, List[int]] = {}
+                for keep_id, duplicate_id in find_duplicates(entries, after_id=watermark):
+                    duplicates.setdefault(keep_id, []).append(duplicate_id)
+                for keep_id, duplicate_ids in duplicates.items():
+                    self.store.merge(keep_id, duplicate_ids)
+                    for entry_id in duplicate_ids:
+                        self.index.remove(str(entry_id))
+                    stats["merged"] += len(duplicate_ids)
+            self.store.set_watermark(DEDUP_WATERMARK, last_id)
+
+            consolidated = self.store.watermark(CONSOLIDATION_WATERMARK)
+            for tier, cap in TIER_CAPS.items():
+                evicted = eviction_candidates(
+                    self.store.entries(tier=tier), cap,
+                    protected_after=consolidated if tier == "short" else None
+                )
+                if MEMORY_ARCHIVE:
+                    self.store.archive(evicted)
+                else:
+                    self.store.delete(evicted)
+                for entry_id in evicted:
+                    self.index.remove(str(entry_id))
+                stats["evicted"] += len(evicted)
+        return stats
+
+
+    def consolidate(self) -> Dict[str, float]:
         """
         This method is responsible for transferring important and relevant structured memories from short-term memory to long-term memory based on their significance, relevance, and potential future utility. 
         It ensures that valuable insights and knowledge are preserved for long-term retention while maintaining an organized structure in the long-term memory storage.
 
+        Only short-term entries stored after the last consolidation (id watermark) are sent, in batches of MEMORY_CONSOLIDATION_BATCH.
+        The model replies with new long-term entries which are merged into the store as deltas, existing long-term entries are never rewritten.
+        The watermark only moves past a batch whose reply was complete and in the delta format, other batches are retried in halves
+        (a single entry that still fails stops the run, the next consolidation starts from it again).
+        Near-duplicates are merged and tiers over their size cap are trimmed first (maintain()).
+        Returns stats: entries processed, long-term entries added, entries merged and evicted, tokens sent, failed model calls and seconds taken.
         """
-
-        memory_headings = {
-        "coding-knowledge.md": "Coding Knowledge",
-        "architectural-decisions.md": "Architectural Decisions",
-        "preferences.md": "Preferences",
-        "observations.md": "Observations",
-        "insights.md": "Insights",
-        "constraints-discovery.md": "Constraints Discovery",
-        "edge-cases-discovery.md": "Edges Cases Discovery",
-        "failures.md": "Failures"
-                            }   
-        
-        #combined all files content in short-term memory
+        started = time.perf_counter()
+        stats = {"entries_processed": 0, "entries_added": 0, "duplicates": 0, "merged": 0, "evicted": 0, "tokens_sent": 0, "model_calls": 0, "failed_calls": 0}
+
+        self.flush()  # consolidate queued incidents as well
+        with self._consolidation_lock:
+            self.sync_markdown()  # pick up edits to the views before reading the store
+            stats.update(self.maintain())  # merge near-duplicates and evict low-value entries before batching
+            watermark = self.store.watermark(CONSOLIDATION_WATERMARK)
+            batch_size = MEMORY_CONSOLIDATION_BATCH
+
+            while True:
+                batch = self.store.entries(tier="short", after_id=watermark)[:batch_size]
+                if not batch:
+                    break
+
+                messages = [SystemMessage(CONSOLIDATION_SYSTEM_PROMPT), HumanMessage(self._consolidation_prompt(batch))]
+                stats["tokens_sent"] += count_tokens_approximately(messages)
+                stats["model_calls"] += 1
+                reply = self.consolidation_agent.invoke({"messages": messages[1:]})["messages"][-1]
+                deltas = parse_consolidation_reply(reply)
+
+                if deltas is None:
+                    # cut off or not in the delta format: the batch is not consolidated, retry it in halves
+                    stats["failed_calls"] += 1
+                    if len(batch) == 1:
+                        break   # the watermark stays, the next consolidation retries from here
+                    batch_size = max(len(batch) // 2, 1)
+                    continue
+
+                with self._lock:
+                    for file_name, section, text in deltas:
+                        entry = self.store.add("long", file_name, text, section=section)
+                        if entry is None:
+                            stats["duplicates"] += 1
+                            continue
+                        self.index.add(str(entry.id), entry.content)
+                        stats["entries_added"] += 1
+
+                watermark = batch[-1].id
+                self.store.set_watermark(CONSOLIDATION_WATERMARK, watermark)
+                stats["entries_processed"] += len(batch)
+
+            if stats["entries_added"]:
+                self.sync_markdown()  # render the long-term views for the system prompt
+            self.store.set_watermark(CONSOLIDATED_AT, int(time.time()))
+
+        stats["watermark"] = watermark
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+
+    def _consolidation_prompt(self, batch: List[MemoryEntry]) -> str:
+        """Prompt with only the new short-term entries and the section names already present in long-term memory"""
+        memory_headings = dict(SHORT_TERM_CATEGORIES.values())
+
+        #new short-term entries grouped by category
+        grouped: Dict[str, List[MemoryEntry]] = {}
+        for entry in batch:
+            grouped.setdefault(entry.category, []).append(entry)
         short_term_memory_content = ""
-
-        path = self.short_term_memory_path
-        for file_name in os.listdir(path):
-            file_path = os.path.join(path, file_name)
-            if os.path.isfile(file_path):
-                with open(file_path, 'r') as f:
-                    content = f.read()
-                    heading = memory_headings.get(file_name, "General Memory")
-                    short_term_memory_content += f"## {heading}\n\n{content}\n\n" 
-        
-        
-
-        consolidate_prompt = f""" 
-        CONSOLIDATE Short term memory to long term memory: Analyze the following combined short-term memory content and identify and extract only the most important and relevant structured knowledge that should be transferred to long-term memory seperatly into episodic.md, semantic.md, procedural.md files. 
+        for file_name, entries in grouped.items():
+            heading = memory_headings.get(file_name, "General Memory")
+            short_term_memory_content += f"## {heading}\n\n{render_entries(entries)}\n"
+
+        #existing long-term sections, so new entries can be filed under them instead of duplicating them
+        existing_sections = ""
+        for file_name in LONG_TERM_FILES:
+            sections = list(dict.fromkeys(entry.section for entry in self.store.entries(tier="long", category=file_name) if entry.section))
+            existing_sections += f"{file_name}: {', '.join(sections) if sections else '(empty)'}\n"
+
+        return f""" 
+        CONSOLIDATE Short term memory to long term memory: Analyze the following new short-term memory entries and identify and extract only the most important and relevant structured knowledge that should be transferred to long-term memory seperatly into episodic.md, semantic.md, procedural.md files. 
         Do not include any unnecessary or redundant information.
 
-        #short-term memory content:
+        #new short-term memory entries:
         {short_term_memory_content}
 
-        only save the content that should be stored in long-term memory, and do not include any explanations or justifications.
-        """
-
-        response = self.consolidation_agent.invoke(
-                                            {"messages": [{"role": "user", "content": consolidate_prompt}]}
-                                            )
-        
-        return response["messages"][-1].content # Return the consolidated long-term memory content
-    
-
-    def consolidation_trigger(self):
-
-        #it could be scheduled to run periodically (e.g., once a day) or triggered manually when the agent determines that there is enough valuable information in short-term memory that should be preserved for long-term retention.
-        #The consolidation process can also be triggered after a certain number of new memory incidents have been stored in short-term memory, indicating that there is a significant amount of new information that may warrant consolidation into long-term memory.
-
-        
-        #trigger consolidation based on periodicity
-        
-        #all short-term catergores
-        l = ["coding-knowledge", "architectural-decisions", "preferences", "observations", "insights", "constraints_discovery", "edges_cases_discovery", "failures"]
-        pass
-
+        #existing long-term memory sections:
+        {existing_sections}
 
+        Do not read or write any files. Reply only with the NEW long-term entries, grouped under a header line naming the file and section (reuse an existing section name when the entry belongs to it), for example:
 
+        [semantic.md] Async Python
+        - **Facts:** Awaiting is required before using a coroutine result
 
+        Reply with only NONE if there is nothing worth keeping, and do not include any explanations or justifications.
+        """
+    
 
+    def pending_consolidation(self) -> Dict[str, float]:
+        """Short-term entries and bytes stored since the last consolidation, and its time"""
+        watermark = self.store.watermark(CONSOLIDATION_WATERMARK)
+        entries, size = self.store.size(tier="short", after_id=watermark)
+        return {"entries": entries, "bytes": size, "last_consolidated_at": self.store.watermark(CONSOLIDATED_AT)}
 
 
+    def consolidation_trigger(self) -> Optional[str]:
+        """
+        Decide whether short-term memory should be consolidated now. Returns the reason ("entries", "bytes" or "periodic") or None.
 
+        Consolidation is due when enough new entries (MEMORY_CONSOLIDATION_ENTRIES) or bytes (MEMORY_CONSOLIDATION_BYTES) were stored since the last run,
+        or when consolidation_periodicity elapsed and there is anything new at all. The background scheduler polls this.
+        """
+        pending = self.pending_consolidation()
+        if not pending["entries"]:
+            return None
+        if pending["entries"] >= MEMORY_CONSOLIDATION_ENTRIES:
+            return "entries"
+        if pending["bytes"] >= MEMORY_CONSOLIDATION_BYTES:
+            return "bytes"
+        if time.time() - pending["last_consolidated_at"] >= self.consolidation_periodicity:
+            return "periodic"
+        return None
@@ -445,16 +445,16 @@ When optimization is needed, model has clear procedural steps: "1. Profile queri
 
 ## STM → LTM CONSOLIDATION PROCESS
 
-### STEP 1: READ EXISTING LTM FILES
+### STEP 1: REVIEW EXISTING LTM SECTIONS
 
-Before consolidating any new STM data, always read the existing LTM files to understand current knowledge.
+You have no tools and do not read or write files. The request lists only the NEW short-term entries and the section names already present in each LTM file.
 
 **Action:**
-• Read `long_term_memory/episodic.md` - Review existing situations and patterns
-• Read `long_term_memory/semantic.md` - Review existing facts and principles
-• Read `long_term_memory/procedural.md` - Review existing processes and strategies
+• Note the existing sections of `episodic.md` - situations and patterns already recorded
+• Note the existing sections of `semantic.md` - facts and principles already recorded
+• Note the existing sections of `procedural.md` - processes and strategies already recorded
 
-**Purpose:** Understand what's already known to avoid duplication and to build upon existing knowledge coherently.
+**Purpose:** File new knowledge under the sections that already exist instead of creating near-duplicate ones.
 
 ---
 
@@ -590,129 +590,60 @@ For any STM entry related to LLM hallucinations or limitations:
 
 ### STEP 6: MERGE WITH EXISTING LTM DATA
 
-Before writing to files, merge new findings with existing data.
+Your reply is merged into the LTM files as new entries, existing entries are never rewritten. Merge by choosing where the new entries go.
 
 **Merge Logic for EPISODIC:**
-• If exact situation exists: Add reinforcement, don't duplicate
-• If similar situation exists: Link as related memory
-• If new situation: Add as new entry
+• If the situation has a section: Add only what is new under that section name
+• If new situation: Add it under a new section name
 
 **Merge Logic for SEMANTIC:**
-• If concept exists: Update facts, enhance principle
-• If partially overlaps: Consolidate into single comprehensive entry
-• If new concept: Add as new entry
+• If the concept has a section: Add only the new facts or principles under that section name
+• If new concept: Add it under a new section name
 
 **Merge Logic for PROCEDURAL:**
-• If process exists: Enhance steps, add new decision points
-• If similar process exists: Merge, identify variations
-• If new process: Add as new entry
+• If the process has a section: Add only the new steps or decision points under that section name
+• If new process: Add it under a new section name
 
 ---
 
-### STEP 7: WRITE TO LTM FILES
+### STEP 7: REPLY WITH THE NEW LTM ENTRIES
 
-Write consolidated data to appropriate files in `long_term_memory/` folder.
-
-#### For EPISODIC Memory: Write to `long_term_memory/episodic.md`
+Reply only with the new entries, grouped under a header line `[<file>] <section name>` where the file is `episodic.md`, `semantic.md` or `procedural.md`. Every entry is one `- ` bullet line. Reuse an existing section name when the entry belongs to it.
 
 **Format to Use:**
-```markdown
-## [SITUATION_NAME]
-
-**Situation:** [What specific scenario occurred?]
-**Action:** [What approach/attempt was made?]
-**Outcome:** [What was the result?]
-**Observation:** [What was learned?]
 ```
+[episodic.md] [SITUATION_NAME]
+- **Situation:** [What specific scenario occurred?] **Action:** [What was attempted?] **Outcome:** [What was the result?] **Observation:** [What was learned?]
 
-**Before Writing:**
-1. Read existing episodic.md
-2. Check if situation already documented
-3. If exists: Add reinforcement, ensure accuracy
-4. If new: Add as new section
-5. Maintain chronological or categorical organization
-
----
-
-#### For SEMANTIC Memory: Write to `long_term_memory/semantic.md`
+[semantic.md] [CONCEPT_NAME]
+- **Facts:** [What is true about this?]
+- **LLM Limitations:** [Does the LLM hallucinate about this? What specifically?]
 
-**Format to Use:**
-```markdown
-## [CONCEPT_NAME]
-
-**Concept:** [What is this knowledge about?]
-**Facts:** [What is true about this?]
-**Principles:** [What universal rules apply?]
-**Why It Matters:** [Why is this important?]
-**LLM Limitations:** [Does LLM hallucinate about this? What specifically?]
+[procedural.md] [PROCESS_NAME]
+- **Steps:** 1. [First step] 2. [Second step] 3. [Continue...] **When to Use:** [When should this process be applied?]
 ```
 
-**Before Writing:**
-1. Read existing semantic.md
-2. Check if concept already documented
-3. If exists: Merge facts, enhance principles
-4. If new: Add as new section
-5. Clearly mark all LLM limitations and hallucination patterns
-6. Maintain logical organization by concept domain
+Reply with only `NONE` when no entry is worth keeping. Keep the reply short: it has an output token limit and a reply that is cut off is discarded and the entries are sent again.
 
 ---
 
-#### For PROCEDURAL Memory: Write to `long_term_memory/procedural.md`
-
-**Format to Use:**
-```markdown
-## [PROCESS_NAME]
-
-**Problem Type:** [What type of problem does this solve?]
-**Process Overview:** [High-level description]
-**Steps:**
-1. [First step]
-2. [Second step]
-3. [Continue...]
-**Decision Points:** [Where choices need to be made]
-**When to Use:** [When should this process be applied?]
-```
-
-**Before Writing:**
-1. Read existing procedural.md
-2. Check if process already documented
-3. If exists: Enhance steps, add new decision points
-4. If new: Add as new section
-5. Maintain logical organization by problem type
-
----
-
-### STEP 8: FINAL REVIEW AND ORGANIZATION
-
-After writing all three files, perform final review.
+### STEP 8: FINAL REVIEW OF THE REPLY
 
 **Review Checklist:**
-
-**EPISODIC File:**
-• [ ] All new situations documented
-• [ ] Situations clearly described
-• [ ] File is readable and organized
-
-**SEMANTIC File:**
-• [ ] All new concepts documented
-• [ ] LLM limitations clearly documented
-• [ ] Similar concepts merged (no duplication)
-• [ ] File is logically organized
-
-**PROCEDURAL File:**
-• [ ] All new processes documented
-• [ ] All steps clear and actionable
-• [ ] Decision points identified
-• [ ] File is logically organized
+• [ ] Only generalizable knowledge, nothing project-specific
+• [ ] Every bullet sits under a `[file] section` header line
+• [ ] Existing section names reused where they fit
+• [ ] LLM limitations clearly marked
+• [ ] No explanations, justifications or text outside the format
 
 ---
 
 ## COMPLETE CONSOLIDATION WORKFLOW
 
 ```
-STM Data from Current Session
+New STM entries + existing LTM section names
         ↓
-[STEP 1] Read existing episodic.md, semantic.md, procedural.md
+[STEP 1] Review the existing LTM sections
         ↓
 [STEP 2] Extract all 8 STM categories
         ↓
@@ -728,17 +659,13 @@ STM Data from Current Session
         │ (Mark all hallucinations and knowledge gaps)
         ↓
 [STEP 6] Merge with existing LTM data
-        │ (Check for duplication, enhance existing)
+        │ (Reuse existing sections, add only what is new)
         ↓
-[STEP 7] Write to LTM files
-        │ ├─ Update long_term_memory/episodic.md
-        │ ├─ Update long_term_memory/semantic.md
-        │ └─ Update long_term_memory/procedural.md
+[STEP 7] Reply with the new entries ([file] section headers, - bullets) or NONE
         ↓
-[STEP 8] Final review and organization
-        │ (Verify quality, fix organization)
+[STEP 8] Final review of the reply
         ↓
-Enhanced Long-Term Memory (Ready for Future Projects)
+Entries merged into Long-Term Memory (Ready for Future Projects)
 ```
 
 ---
@@ -747,10 +674,10 @@ Enhanced Long-Term Memory (Ready for Future Projects)
 
 ### Always Apply These Rules
 
-• **Read Before Write** - Always read existing LTM files before writing to avoid duplication
+• **Reply Format Only** - No tools, no file operations: reply with `[file] section` headers and `- ` bullets, or NONE
 • **Generalizability First** - Never consolidate project-specific facts
 • **LLM Awareness Always** - Mark all LLM limitations and hallucinations
-• **Merge Over Duplicate** - If knowledge exists, enhance it rather than duplicate
+• **Merge Over Duplicate** - If a section exists, add only what is new under its name
 • **Clear Organization** - Keep files logically organized for easy retrieval
 • **Link Related Knowledge** - Connect episodic, semantic, and procedural memories
 
@@ -0,0 +1,40 @@
+"""
+Memory Paths - Where the memory files live, resolved once
+MEMORY_ROOT is configurable and resolved at import, so tools do not look up
+the working directory per call. Relative memory paths are accepted with `/`
+or `\\` separators and are confined to the memory root.
+"""
+import os
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+
+# ============================================
+# Configuration
+# ============================================
+MEMORY_ROOT = Path(os.getenv("MEMORY_ROOT") or Path.cwd() / "memory").resolve()
+SHORT_TERM_DIR = MEMORY_ROOT / "short_term_memory"
+LONG_TERM_DIR = MEMORY_ROOT / "long_term_memory"
+
+
+def normalize_relative(relative_path: str) -> PurePosixPath:
+    """
+    Normalize a memory path such as `\\short_term_memory\\insights.md` or
+    `short_term_memory/insights.md` to `short_term_memory/insights.md`.
+    Raises ValueError for paths leaving the memory root.
+    """
+    parts = []
+    for part in relative_path.replace("\\", "/").split("/"):
+        if part in ("", "."):
+            continue
+        if part == ".." or ":" in part:
+            raise ValueError(f"Memory path must stay inside the memory folder: {relative_path}")
+        parts.append(part)
+    if not parts:
+        raise ValueError(f"Empty memory path: {relative_path!r}")
+    return PurePosixPath(*parts)
+
+
+@lru_cache(maxsize=256)
+def resolve_memory_path(relative_path: str) -> Path:
+    """Absolute path of a memory file from a relative path with either separator"""
+    return MEMORY_ROOT.joinpath(*normalize_relative(relative_path).parts)
@@ -0,0 +1,121 @@
+"""
+Memory Retrieval - Local BM25 index over memory entries
+Entries are added and removed incrementally; a query is scored against all
+entries at once with NumPy over per-term posting arrays, so recall takes
+milliseconds and does not depend on an LLM reading whole files.
+"""
+import re
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Incremental Okapi BM25 index.
+
+    Documents get a dense slot on add(); remove() only clears the slot, so
+    postings never have to be rewritten, and the next add() reuses it, so the
+    slot arrays stay as long as the most documents held at once. Posting lists
+    are kept as Python lists for cheap appends and converted to NumPy arrays
+    lazily per search.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._slots: Dict[str, int] = {}                   # doc id -> slot
+        self._doc_ids: List[Optional[str]] = []            # slot -> doc id, None when removed
+        self._lengths: List[int] = []                      # slot -> token count
+        self._terms: List[Dict[str, int]] = []             # slot -> term frequencies
+        self._free: List[int] = []                         # slots cleared by remove(), reused by add()
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}   # term -> (slots, term frequencies)
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    def add(self, doc_id: str, text: str) -> None:
+        if doc_id in self._slots:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        if self._free:
+            slot = self._free.pop()
+            self._doc_ids[slot], self._lengths[slot], self._terms[slot] = doc_id, len(tokens), frequencies
+        else:
+            slot = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._lengths.append(len(tokens))
+            self._terms.append(frequencies)
+        self._slots[doc_id] = slot
+        self._total_length += len(tokens)
+        for term, tf in frequencies.items():
+            slots, tfs = self._postings.setdefault(term, ([], []))
+            slots.append(slot)
+            tfs.append(tf)
+            self._arrays.pop(term, None)
+
+    def remove(self, doc_id: str) -> None:
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return
+        self._doc_ids[slot] = None
+        self._total_length -= self._lengths[slot]
+        for term in self._terms[slot]:
+            slots, tfs = self._postings[term]
+            i = slots.index(slot)
+            del slots[i], tfs[i]
+            self._arrays.pop(term, None)
+            if not slots:
+                del self._postings[term]
+        self._terms[slot] = {}
+        self._lengths[slot] = 0
+        self._free.append(slot)
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        if term not in self._arrays:
+            slots, tfs = self._postings[term]
+            self._arrays[term] = (np.asarray(slots, dtype=np.int64), np.asarray(tfs, dtype=np.float64))
+        return self._arrays[term]
+
+    def search(self, query: str, k: int = 8) -> List[Tuple[str, float]]:
+        """Top-k (doc id, score) pairs, best first. Documents sharing no term are never returned"""
+        n_docs = len(self._slots)
+        terms = [term for term in set(tokenize(query)) if term in self._postings]
+        if not n_docs or not terms:
+            return []
+
+        lengths = np.asarray(self._lengths, dtype=np.float64)
+        avg_length = self._total_length / n_docs or 1.0
+        norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        scores = np.zeros(len(self._doc_ids), dtype=np.float64)
+
+        for term in terms:
+            slots, tfs = self._posting_arrays(term)
+            df = len(slots)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            scores[slots] += idf * tfs * (self.k1 + 1) / (tfs + norm[slots])
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._doc_ids[slot], float(scores[slot])) for slot in ranked]
@@ -0,0 +1,124 @@
+"""
+Consolidation Scheduler - Background short-term -> long-term consolidation
+An asyncio task polls Memory.consolidation_trigger() (pending entry/byte
+thresholds and periodicity) and runs consolidation in a worker thread.
+Only one consolidation job runs at a time; manual requests join it.
+"""
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+# ============================================
+# Configuration
+# ============================================
+MEMORY_CONSOLIDATION_CHECK_INTERVAL = float(os.getenv("MEMORY_CONSOLIDATION_CHECK_INTERVAL", "30"))  # seconds
+JOB_HISTORY = 20    # finished jobs kept for the status endpoint
+
+
+@dataclass
+class ConsolidationJob:
+    """A single consolidation run"""
+
+    id: str
+    trigger: str                    # manual | entries | bytes | periodic
+    status: str = "queued"          # queued | running | done | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stats: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "trigger": self.trigger,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stats": self.stats,
+            "error": self.error,
+        }
+
+
+class ConsolidationScheduler:
+    """
+    Single-flight consolidation runner.
+
+    submit() starts a job unless one is already queued or running, in which
+    case that job is returned. run_forever() submits a job whenever the
+    memory reports a trigger; the check itself is a cheap store query.
+    """
+
+    def __init__(self, memory, check_interval: float = MEMORY_CONSOLIDATION_CHECK_INTERVAL):
+        self.memory = memory
+        self.check_interval = check_interval
+        self._jobs: "OrderedDict[str, ConsolidationJob]" = OrderedDict()
+        self._current: Optional[ConsolidationJob] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, trigger: str = "manual") -> ConsolidationJob:
+        """Start a consolidation job in the background, or join the one in flight"""
+        if self._current is not None and not self._current.finished:
+            return self._current
+
+        job = ConsolidationJob(id=uuid.uuid4().hex[:12], trigger=trigger)
+        self._current = job
+        self._jobs[job.id] = job
+        while len(self._jobs) > JOB_HISTORY:
+            self._jobs.popitem(last=False)
+        self._task = asyncio.create_task(self._run(job))
+        return job
+
+    async def _run(self, job: ConsolidationJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            # consolidation blocks on the model, keep it off the event loop
+            job.stats = await asyncio.to_thread(self.memory.consolidate)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"Memory consolidation ({job.trigger}) failed: {e}")
+        finally:
+            job.finished_at = time.time()
+
+    def job(self, job_id: str) -> Optional[ConsolidationJob]:
+        return self._jobs.get(job_id)
+
+    async def status(self) -> Dict[str, Any]:
+        """Job state, read on the event loop that updates it; only the store query runs in a thread"""
+        last = next(reversed(self._jobs.values()), None)
+        jobs = {
+            "running": self._current is not None and not self._current.finished,
+            "current_job": last.info() if last else None,
+            "check_interval": self.check_interval,
+            "jobs": [job.info() for job in reversed(self._jobs.values())],
+        }
+        pending = await asyncio.to_thread(self.memory.pending_consolidation)
+        return {**jobs, "pending": pending}
+
+    async def run_forever(self) -> None:
+        """Check the consolidation trigger every check_interval seconds"""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                reason = await asyncio.to_thread(self.memory.consolidation_trigger)
+                if reason:
+                    self.submit(reason)
+            except Exception as e:
+                print(f"Consolidation trigger check failed: {e}")
+
+    async def wait(self) -> None:
+        """Wait for the job in flight (used on shutdown)"""
+        if self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
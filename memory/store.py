@@ -0,0 +1,323 @@
+"""
+Memory Store - One record per memory entry in SQLite
+Short- and long-term entries keep their category, source thread/todo,
+timestamps, recall hit count and content hash. The Markdown files under
+memory/ are views rendered from (and re-imported into) this store.
+"""
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import xxhash
+
+from .paths import MEMORY_ROOT
+
+# ============================================
+# Configuration
+# ============================================
+MEMORY_DB = os.getenv("MEMORY_DB", str(MEMORY_ROOT / "memory.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tier TEXT NOT NULL,
+    category TEXT NOT NULL,
+    section TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    source_thread TEXT,
+    source_todo TEXT,
+    created_at REAL NOT NULL,
+    last_recalled REAL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (category, hash)
+);
+CREATE INDEX IF NOT EXISTS entries_tier ON entries (tier, id);
+CREATE TABLE IF NOT EXISTS watermarks (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archive (
+    id INTEGER PRIMARY KEY,
+    tier TEXT NOT NULL,
+    category TEXT NOT NULL,
+    section TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    source_thread TEXT,
+    source_todo TEXT,
+    created_at REAL NOT NULL,
+    last_recalled REAL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    archived_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS views (
+    category TEXT PRIMARY KEY,
+    content_hash TEXT,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL NOT NULL DEFAULT 0
+);
+"""
+
+COLUMNS = "id, tier, category, section, content, hash, source_thread, source_todo, created_at, last_recalled, hits"
+
+
+def entry_hash(text: str) -> str:
+    """Hash of a memory entry, insensitive to case, whitespace and bullet markers"""
+    normalized = " ".join(text.lower().lstrip("-*# ").split())
+    return xxhash.xxh64_hexdigest(normalized)
+
+
+@dataclass
+class MemoryEntry:
+    """A single memory item"""
+
+    id: int
+    tier: str                       # short | long
+    category: str                   # Markdown view it belongs to, e.g. failures.md
+    section: str                    # heading inside the view ('' for none)
+    content: str
+    hash: str
+    source_thread: Optional[str]
+    source_todo: Optional[str]
+    created_at: float
+    last_recalled: Optional[float]
+    hits: int
+
+
+class MemoryStore:
+    """
+    SQLite table of memory entries with a per-view dirty flag.
+
+    Entries are unique per (category, hash), so adding a duplicate is a
+    no-op. Every change marks its category dirty; the Markdown view is
+    only re-rendered by the caller when it is needed.
+    """
+
+    def __init__(self, path: str = MEMORY_DB):
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group several writes into one SQLite transaction (one commit), holding the store lock"""
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _select(self, where: str = "", params: Sequence = ()) -> List[MemoryEntry]:
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {COLUMNS} FROM entries {where}", params).fetchall()
+        return [MemoryEntry(*row) for row in rows]
+
+    # ============================================
+    # Entries
+    # ============================================
+    def add(
+        self,
+        tier: str,
+        category: str,
+        content: str,
+        section: str = "",
+        source_thread: Optional[str] = None,
+        source_todo: Optional[str] = None
+    ) -> Optional[MemoryEntry]:
+        """Append an entry, returns None if the category already holds it"""
+        digest = entry_hash(content)
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO entries (tier, category, section, content, hash, source_thread, source_todo, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (tier, category, section, content, digest, source_thread, source_todo, now)
+            )
+            if not cursor.rowcount:
+                return None
+            self.mark_dirty(category)
+            return MemoryEntry(cursor.lastrowid, tier, category, section, content, digest,
+                               source_thread, source_todo, now, None, 0)
+
+    def entries(self, tier: Optional[str] = None, category: Optional[str] = None, after_id: int = 0) -> List[MemoryEntry]:
+        """Entries in insertion order, optionally filtered by tier, category and id watermark"""
+        clauses, params = ["id > ?"], [after_id]
+        if tier is not None:
+            clauses.append("tier = ?")
+            params.append(tier)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        return self._select(f"WHERE {' AND '.join(clauses)} ORDER BY id", params)
+
+    def get(self, ids: Iterable[int]) -> List[MemoryEntry]:
+        ids = list(ids)
+        if not ids:
+            return []
+        return self._select(f"WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", ids)
+
+    def size(self, tier: Optional[str] = None, category: Optional[str] = None, after_id: int = 0) -> Tuple[int, int]:
+        """(entry count, content bytes) of the matching entries"""
+        clauses, params = ["id > ?"], [after_id]
+        if tier is not None:
+            clauses.append("tier = ?")
+            params.append(tier)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM entries WHERE {' AND '.join(clauses)}", params
+            ).fetchone()
+        return row[0], row[1]
+
+    def record_hits(self, ids: Iterable[int]) -> None:
+        """Count a recall of each entry"""
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE entries SET hits = hits + 1, last_recalled = ? WHERE id = ?",
+                [(now, entry_id) for entry_id in ids]
+            )
+
+    def replace_category(
+        self,
+        tier: str,
+        category: str,
+        items: Sequence[Tuple[str, str]],
+        keep_after: float = 0
+    ) -> Tuple[List[MemoryEntry], List[int]]:
+        """
+        Make a category hold exactly `items` ((section, content) pairs), e.g.
+        after its Markdown file was edited outside the store. Unchanged entries
+        keep their metadata; entries created after `keep_after` are kept even
+        if missing, they were added after the file was last written.
+
+        Returns (added entries, removed ids).
+        """
+        with self._lock:
+            existing = {entry.hash: entry for entry in self.entries(category=category)}
+            wanted = {}
+            for section, content in items:
+                wanted.setdefault(entry_hash(content), (section, content))
+
+            removed = [
+                entry.id for digest, entry in existing.items()
+                if digest not in wanted and entry.created_at <= keep_after
+            ]
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany("DELETE FROM entries WHERE id = ?", [(entry_id,) for entry_id in removed])
+                for digest, (section, content) in wanted.items():
+                    if digest in existing and existing[digest].section != section:
+                        self.conn.execute("UPDATE entries SET section = ? WHERE id = ?", (section, existing[digest].id))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+            added = []
+            for digest, (section, content) in wanted.items():
+                if digest not in existing:
+                    entry = self.add(tier, category, content, section=section)
+                    if entry is not None:
+                        added.append(entry)
+        return added, removed
+
+    def delete(self, ids: Iterable[int]) -> None:
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT DISTINCT category FROM entries WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+            self.conn.executemany("DELETE FROM entries WHERE id = ?", [(entry_id,) for entry_id in ids])
+            for (category,) in rows:
+                self.mark_dirty(category)
+
+    def merge(self, keep_id: int, duplicate_ids: Iterable[int]) -> None:
+        """Fold duplicates into one entry: their recall hits are added to it, then they are deleted"""
+        duplicate_ids = list(duplicate_ids)
+        if not duplicate_ids:
+            return
+        marks = ','.join('?' * len(duplicate_ids))
+        with self._lock:
+            self.conn.execute(
+                f"UPDATE entries SET hits = hits + (SELECT COALESCE(SUM(hits), 0) FROM entries WHERE id IN ({marks})), "
+                f"last_recalled = NULLIF(MAX(COALESCE(last_recalled, 0), (SELECT COALESCE(MAX(last_recalled), 0) FROM entries WHERE id IN ({marks}))), 0) "
+                "WHERE id = ?",
+                (*duplicate_ids, *duplicate_ids, keep_id)
+            )
+            self.delete(duplicate_ids)
+
+    def archive(self, ids: Iterable[int]) -> None:
+        """Move entries to the archive table, out of recall, consolidation and the Markdown views"""
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO archive ({COLUMNS}, archived_at) "
+                f"SELECT {COLUMNS}, ? FROM entries WHERE id IN ({','.join('?' * len(ids))})",
+                (time.time(), *ids)
+            )
+            self.delete(ids)
+
+    def watermark(self, name: str) -> int:
+        """Last entry id processed by a consumer (e.g. consolidation), 0 if none"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM watermarks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def set_watermark(self, name: str, value: int) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO watermarks (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, value)
+            )
+
+    # ============================================
+    # Markdown views
+    # ============================================
+    def mark_dirty(self, category: str) -> None:
+        """Flag the Markdown view of a category for re-rendering"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO views (category, dirty) VALUES (?, 1) ON CONFLICT(category) DO UPDATE SET dirty = 1",
+                (category,)
+            )
+
+    def view(self, category: str) -> Tuple[Optional[str], bool, float]:
+        """(hash of the file content last written/imported, dirty flag, time of that sync)"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content_hash, dirty, synced_at FROM views WHERE category = ?", (category,)
+            ).fetchone()
+        return (row[0], bool(row[1]), row[2]) if row else (None, False, 0.0)
+
+    def set_view(self, category: str, content_hash: str, synced_at: float) -> None:
+        """Record that the Markdown view now matches the store"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO views (category, content_hash, dirty, synced_at) VALUES (?, ?, 0, ?) "
+                "ON CONFLICT(category) DO UPDATE SET content_hash = excluded.content_hash, dirty = 0, synced_at = excluded.synced_at",
+                (category, content_hash, synced_at)
+            )
@@ -0,0 +1,130 @@
+"""
+Memorization Queue - Write-behind queue for memory incidents
+memorization() only enqueues an incident and returns; a small pool of worker
+threads drains the queue and writes several incidents per store transaction.
+flush() blocks until everything queued so far is written (recall, consolidate
+and shutdown call it), so readers never miss a queued incident.
+"""
+import os
+import time
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# ============================================
+# Configuration
+# ============================================
+MEMORY_QUEUE_WORKERS = int(os.getenv("MEMORY_QUEUE_WORKERS", "2"))        # writer threads
+MEMORY_QUEUE_BATCH = int(os.getenv("MEMORY_QUEUE_BATCH", "32"))           # incidents written per transaction
+MEMORY_QUEUE_DELAY = float(os.getenv("MEMORY_QUEUE_DELAY", "0.05"))       # seconds a worker waits to fill a batch
+
+
+@dataclass
+class Incident:
+    """One memorization call: category -> text, and where it came from"""
+
+    entries: Dict[str, str]
+    source_thread: Optional[str] = None
+    source_todo: Optional[str] = None
+
+
+class MemorizationQueue:
+    """
+    Write-behind queue drained by a worker pool.
+
+    `write_batch` receives a list of incidents and persists them, it is called
+    from the worker threads. Workers are started lazily on the first submit().
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Incident]], Any],
+        workers: int = MEMORY_QUEUE_WORKERS,
+        batch_size: int = MEMORY_QUEUE_BATCH,
+        max_delay: float = MEMORY_QUEUE_DELAY
+    ):
+        self.write_batch = write_batch
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Optional[Incident]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._flushing = 0              # flush() calls waiting, workers stop waiting for full batches
+        self._closed = False
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "failed": 0}
+
+    def submit(self, incident: Incident) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("memorization queue is closed")
+            self._stats["enqueued"] += 1
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._work, name=f"memorization-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        self._queue.put(incident)
+
+    def _next_batch(self, first: Incident) -> List[Incident]:
+        """Collect up to batch_size incidents, waiting at most max_delay for more unless a flush is waiting"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            timeout = 0 if self._flushing else deadline - time.monotonic()
+            try:
+                incident = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if incident is None:
+                self._queue.put(None)   # shutdown marker, leave it for the outer loop
+                self._queue.task_done()
+                break
+            batch.append(incident)
+        return batch
+
+    def _work(self) -> None:
+        while True:
+            incident = self._queue.get()
+            if incident is None:
+                self._queue.task_done()
+                return
+            batch = self._next_batch(incident)
+            try:
+                self.write_batch(batch)
+                with self._lock:
+                    self._stats["written"] += len(batch)
+                    self._stats["batches"] += 1
+            except Exception as e:
+                with self._lock:
+                    self._stats["failed"] += len(batch)
+                print(f"Memorization of {len(batch)} queued incidents failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every incident submitted so far has been written"""
+        with self._lock:
+            self._flushing += 1
+        try:
+            self._queue.join()
+        finally:
+            with self._lock:
+                self._flushing -= 1
+
+    def close(self) -> None:
+        """Flush and stop the workers (on shutdown), later submits are rejected"""
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+        self.flush()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "pending": self._queue.unfinished_tasks}
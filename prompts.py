@@ -1,10 +1,12 @@
 import os
 
+from memory.paths import LONG_TERM_DIR
+
 
 def get_ltm_content():
     """Load long-term memory content from long_term_memory directory"""
 
-    memory_path = os.path.join(os.getcwd(), "memory", "long_term_memory")
+    memory_path = str(LONG_TERM_DIR)
     if not os.path.exists(memory_path):
         return "" 
     ltm_content = ""
@@ -29,7 +31,7 @@ def get_ltm_content():
 
 long_term_memory = get_ltm_content()
 
-CODING_SYSTEM_PROMPT = f"""
+CODING_SYSTEM_PROMPT_TEMPLATE = """
 
 
 You are an autonomous coding agent with adaptive learning memory. 
@@ -485,11 +487,13 @@ Adapt intelligently.
 Evolve progressively.
 
 
-""" 
+"""
+
+CODING_SYSTEM_PROMPT = CODING_SYSTEM_PROMPT_TEMPLATE.format(long_term_memory=long_term_memory)
 
 
 
-CODING_SYSTEM_PROMPT2 = f"""
+CODING_SYSTEM_PROMPT2_TEMPLATE = """
 
 # Learning Coding Agent System Prompt
 
@@ -804,4 +808,11 @@ You are successful when:
 - You've adapted strategies based on real environmental feedback
 
 
-"""
\ No newline at end of file
+"""
+
+CODING_SYSTEM_PROMPT2 = CODING_SYSTEM_PROMPT2_TEMPLATE.format(long_term_memory=long_term_memory)
+
+
+def build_coding_system_prompt(long_term_memory: str) -> str:
+    """Coding agent system prompt with the given long-term memory (assembled per turn by the server)"""
+    return CODING_SYSTEM_PROMPT2_TEMPLATE.format(long_term_memory=long_term_memory)
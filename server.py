@@ -1,23 +1,34 @@
 
 import os
-import json
 import asyncio
-from typing import AsyncIterator, Optional
+from typing import Optional
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 from langchain.agents import create_agent
-from langchain.chat_models import init_chat_model
-from langgraph.checkpoint.memory import InMemorySaver
+from llm import create_chat_model
+from langchain_core.messages import AIMessage
+from checkpoint_store import create_checkpointer, is_persistent
 from prompts import CODING_SYSTEM_PROMPT, CODING_SYSTEM_PROMPT2
 import feedback_manager
-from tools import force_consolidate
+from sessions import SessionRegistry
+from cancellation import CancellationToken, CancellationMiddleware, RunCancelled
+from compaction import CompactionMiddleware
+from ltm_prompt import LongTermMemoryMiddleware
+from memory.ltm import LongTermMemoryLoader
+from memory.files import atomic_write, file_lock
+from memory import paths as memory_paths
+from sse import RunStream, SSE_HEADERS, SSE_RESUME_GRACE, parse_last_event_id
+from tools import clear_todos, memory_system
+from executor import process_pool, shutdown_warm_workers, warm_python_stats, warm_up_python
+from memory.scheduler import ConsolidationScheduler
 
 from tools import (
     edit_file,
@@ -39,8 +50,27 @@ from tools import (
 # Load environment variables from a .env file
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background tasks (idle session eviction, memory consolidation, long-term memory watcher, warm python worker) for the app lifetime"""
+    memory_system.sync_markdown()  # render the long-term views before the first system prompt is built
+    sweeper = asyncio.create_task(sessions.sweep_forever())
+    consolidator = asyncio.create_task(consolidation_scheduler.run_forever())
+    ltm_watcher = asyncio.create_task(ltm_loader.watch())
+    warm_python = asyncio.create_task(asyncio.to_thread(warm_up_python))
+    yield
+    sweeper.cancel()
+    consolidator.cancel()
+    ltm_watcher.cancel()
+    await asyncio.gather(warm_python, return_exceptions=True)
+    shutdown_warm_workers()
+    await asyncio.to_thread(memory_system.queue.close)  # store the memorization calls still queued
+    await consolidation_scheduler.wait()  # let a running consolidation finish its batch
+    memory_system.sync_markdown()  # leave the memory views up to date on disk
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Deep Agent IDE")
+app = FastAPI(title="Deep Agent IDE", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -53,7 +83,7 @@ app.add_middleware(
 
 # Get workspace and memory directories
 WORKSPACE_ROOT = os.path.join(os.getcwd(), "workspace")
-MEMORY_ROOT = os.path.join(os.getcwd(), "memory")
+MEMORY_ROOT = str(memory_paths.MEMORY_ROOT)   # MEMORY_ROOT env var, defaults to ./memory
 
 if not os.path.exists(WORKSPACE_ROOT):
     os.makedirs(WORKSPACE_ROOT)
@@ -81,8 +111,9 @@ gpt-oss:120b
 """
 
 
-# Initialize LangChain model
-model = init_chat_model(
+# Initialize LangChain model (LLM_BACKEND=fake swaps in the scripted offline model)
+model = create_chat_model(
+    "coding",
     model="kimi-k2:1t",
     model_provider="ollama",
     base_url="https://ollama.com",
@@ -113,28 +144,53 @@ tools = [
 
 
 
-agent: any = None
+# On-disk checkpointer by default (CHECKPOINT_BACKEND=memory keeps the old in-process store)
+checkpointer = create_checkpointer()
 
-def intialize_agent():
-    """Initialize agent state with default thread and empty messages"""
-    
-    global agent    
+# Long-term memory snapshot, re-read only when long_term_memory/*.md changes
+ltm_loader = LongTermMemoryLoader(memory_system.long_term_memory_path)
 
-    agent = create_agent(
+# One compiled agent shared by all sessions, conversation state is kept per thread_id in the checkpointer
+# (the system prompt is rebuilt from the current long-term memory by LongTermMemoryMiddleware)
+agent = create_agent(
     model=model,    
     tools=tools,
     system_prompt=CODING_SYSTEM_PROMPT2,
-    checkpointer=InMemorySaver()
+    middleware=[CancellationMiddleware(), LongTermMemoryMiddleware(ltm_loader), CompactionMiddleware()],
+    checkpointer=checkpointer
         )
 
 
-intialize_agent()  # Initialize agent at startup
+def close_thread(thread_id: str):
+    """Drop all conversation state of a thread (history and todos)"""
+    checkpointer.delete_thread(thread_id)
+    clear_todos(thread_id)
+
+
+def evict_thread(thread_id: str):
+    """Drop the session of an idle thread, persisted history is kept and reloaded lazily
+    The todos are kept with it (they are small), they only go with an explicit reset"""
+    if not is_persistent(checkpointer):
+        close_thread(thread_id)
+
+
+consolidation_scheduler = ConsolidationScheduler(memory_system)
+
+sessions = SessionRegistry(on_close=close_thread, on_evict=evict_thread)
 
 
 # Request/Response Models
 class ChatMessage(BaseModel):
     content: str
     thread_id: str = "1"
+    token_budget: Optional[int] = None  # prompt token budget for this thread (default CONTEXT_TOKEN_BUDGET)
+    ltm_token_budget: Optional[int] = None  # long-term memory tokens in the system prompt (default LTM_TOKEN_BUDGET)
+
+class ResetRequest(BaseModel):
+    thread_id: str = "1"
+
+class CancelRequest(BaseModel):
+    thread_id: str = "1"
 
 class FileRequest(BaseModel):
     path: str
@@ -148,6 +204,7 @@ class FileSaveRequest(BaseModel):
 class FeedbackResponse(BaseModel):
     feedback: str
     accepted: bool
+    thread_id: str = "1"
 
 
 # API Endpoints
@@ -157,16 +214,30 @@ class FeedbackResponse(BaseModel):
 # agent reset with empty mesage history
 
 
-@app.post("/api/memory/consolidate")
+@app.post("/api/memory/consolidate", status_code=202)
 async def manual_consolidate():
     """
-    Manually consolidate short-term memory to long-term memory from UI
+    Manually consolidate short-term memory to long-term memory from UI.
+    Runs in the background, poll /api/memory/consolidate/{job_id} for the result.
     """
-    try:
-        force_consolidate()  # Call the function to consolidate memory
-        return {"status": "success", "message": "Memory consolidation triggered successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    job = consolidation_scheduler.submit("manual")
+    return {"status": "accepted", "job_id": job.id, "job": job.info()}
+
+
+@app.get("/api/memory/consolidate/{job_id}")
+async def consolidation_job(job_id: str):
+    """Status and stats of a consolidation job"""
+    job = consolidation_scheduler.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown consolidation job {job_id}")
+    return job.info()
+
+
+@app.get("/api/memory/status")
+async def memory_status():
+    """Consolidation scheduler state, short-term memory pending consolidation and the memorization queue"""
+    status = await consolidation_scheduler.status()
+    return {**status, "memorization_queue": memory_system.queue.stats()}
 
 
 @app.get("/api/files/tree")
@@ -174,6 +245,8 @@ async def get_file_tree(folder: str = "workspace"):
     """Get the file tree structure from specified folder (workspace or memory)"""
     # Select root directory based on folder parameter
     root_dir = MEMORY_ROOT if folder == "memory" else WORKSPACE_ROOT
+    if folder == "memory":
+        await asyncio.to_thread(memory_system.sync_markdown)  # memory files are rendered lazily from the memory store
     
     def build_tree(directory: str, prefix: str = "", is_root: bool = False):
         items = []
@@ -207,15 +280,28 @@ async def get_file_tree(folder: str = "workspace"):
     
     return {"tree": build_tree(root_dir, "", True), "folder": folder}
 
+def resolve_file_path(folder: str, path: str) -> str:
+    """Absolute path of a file in the workspace or memory folder, 403 for paths leaving the folder"""
+    if folder == "memory":
+        # memory paths may use either separator, they are normalized by the memory path layer
+        try:
+            return str(memory_paths.resolve_memory_path(path))
+        except ValueError as e:
+            raise HTTPException(status_code=403, detail=f"Access denied: {e}")
+    file_path = os.path.join(WORKSPACE_ROOT, path)
+    # Security check: ensure path is within selected folder
+    if not os.path.abspath(file_path).startswith(os.path.abspath(WORKSPACE_ROOT)):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return file_path
+
+
 @app.post("/api/files/content")
 async def get_file_content(request: FileRequest):
     """Get content of a specific file"""
     try:
-        root_dir = MEMORY_ROOT if request.folder == "memory" else WORKSPACE_ROOT
-        file_path = os.path.join(root_dir, request.path)
-        # Security check: ensure path is within selected folder
-        if not os.path.abspath(file_path).startswith(os.path.abspath(root_dir)):
-            raise HTTPException(status_code=403, detail="Access denied")
+        file_path = resolve_file_path(request.folder, request.path)
+        if request.folder == "memory":
+            await asyncio.to_thread(memory_system.sync_markdown)
         
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="File not found")
@@ -224,6 +310,8 @@ async def get_file_content(request: FileRequest):
             content = f.read()
         
         return {"content": content, "path": request.path}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -231,154 +319,244 @@ async def get_file_content(request: FileRequest):
 async def save_file_content(request: FileSaveRequest):
     """Save content to a specific file"""
     try:
-        root_dir = MEMORY_ROOT if request.folder == "memory" else WORKSPACE_ROOT
-        file_path = os.path.join(root_dir, request.path)
-        # Security check: ensure path is within selected folder
-        if not os.path.abspath(file_path).startswith(os.path.abspath(root_dir)):
-            raise HTTPException(status_code=403, detail="Access denied")
+        file_path = resolve_file_path(request.folder, request.path)
         
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(request.content)
+        if request.folder == "memory":
+            # memory files are also written by the memory system, swap the file in atomically under its lock
+            with file_lock(file_path):
+                atomic_write(file_path, request.content)
+            await asyncio.to_thread(memory_system.sync_markdown)  # import the edited view into the memory store
+        else:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(request.content)
         
         return {"success": True, "path": request.path}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
 @app.post("/api/chat/reset")
-async def reset_chat():
-    """Reset agent conversation history"""
+async def reset_chat(request: Optional[ResetRequest] = None):
+    """Reset conversation history of a single thread"""
+    thread_id = request.thread_id if request else "1"
     try:
-        intialize_agent()  # Re-initialize agent to reset state
-        return {"status": "success", "message": "Agent conversation reset"}
+        if not sessions.reset(thread_id):
+            raise HTTPException(status_code=409, detail=f"Thread {thread_id} is busy")
+        return {"status": "success", "message": "Agent conversation reset", "thread_id": thread_id}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/chat/stream")
-async def chat_stream(message: ChatMessage):
-    """Stream agent responses using Server-Sent Events"""
-    
-    async def event_generator() -> AsyncIterator[str]:
+@app.post("/api/chat/cancel")
+async def cancel_chat(request: CancelRequest):
+    """Cancel the running agent turn of a thread"""
+    session = sessions.find(request.thread_id)
+    if session is None or not session.cancel("cancelled by user"):
+        return {"status": "idle", "message": "No running turn to cancel", "thread_id": request.thread_id}
+    return {"status": "success", "message": "Cancellation requested", "thread_id": request.thread_id}
+
+
+@app.get("/api/executor/status")
+async def executor_status():
+    """Command pool state: running and queued commands, queue wait metrics, warm python workers"""
+    return {**process_pool.stats(), "warm_python": warm_python_stats()}
+
+
+@app.get("/api/chat/sessions")
+async def list_sessions():
+    """List live chat sessions"""
+    return {"sessions": sessions.list_sessions()}
+
+
+async def run_turn(session, message: ChatMessage, cancel_token: CancellationToken, stream: RunStream):
+    """Run one agent turn and publish its events to the run stream (holds the session lock)"""
+    completed = False
+    tokens_saved = 0
+    try:
+        # Send start event
+        stream.publish({'type': 'start'})
+        
+        # Stream agent updates natively on the event loop, sync tools are run in the default executor
         try:
-            # Send start event
-            yield f"data: {json.dumps({'type': 'start'})}\n\n"
-            await asyncio.sleep(0)  # Force flush
-            
-            # Create a queue for communication between threads
-            import queue
-            event_queue = queue.Queue()
-            
-            def run_agent():
-                """Run agent in separate thread"""
-                try:
-                    for chunk in agent.stream(
-                        {"messages": [{"role": "user", "content": message.content}]},
-                        {"configurable": {"thread_id": "1"}},
-                        stream_mode="updates",
+            async for mode, chunk in agent.astream(
+                {"messages": [{"role": "user", "content": message.content}]},
+                {"configurable": {
+                    "thread_id": session.thread_id,
+                    "cancel_token": cancel_token,
+                    "token_budget": message.token_budget,
+                    "ltm_token_budget": message.ltm_token_budget,
+                }},
+                stream_mode=["messages", "updates", "custom"],
+            ):
+                # Stop between graph steps once the run is cancelled
+                cancel_token.raise_if_cancelled()
+
+                if mode == "custom":
+                    # Context compaction and memory injection metrics emitted before each model call
+                    if chunk.get("type") == "compaction":
+                        tokens_saved += chunk["tokens_saved"]
+                        stream.publish({**chunk, 'total_tokens_saved': tokens_saved})
+                    # Long-term memory tokens injected into the system prompt vs. available
+                    elif chunk.get("type") == "ltm_injection":
+                        stream.publish(chunk)
+                    # Live stdout/stderr chunks of a running execute_command
+                    elif chunk.get("type") == "tool_progress":
+                        stream.publish(chunk)
+                    continue
+
+                if mode == "messages":
+                    # Token deltas of the coding agent's model node (nested memory agents are skipped)
+                    msg, metadata = chunk
+                    if (
+                        isinstance(msg, AIMessage)
+                        and metadata.get("langgraph_node") == "model"
+                        and "|" not in metadata.get("langgraph_checkpoint_ns", "")
+                        and msg.text
                     ):
-                        event_queue.put(("chunk", chunk))
-                    event_queue.put(("done", None))
-                except Exception as e:
-                    event_queue.put(("error", str(e)))
-            
-            # Start agent in background thread
-            import threading
-            agent_thread = threading.Thread(target=run_agent, daemon=True)
-            agent_thread.start()
-            
-            # Stream agent responses from queue
-            while True:
-                # Check queue with timeout to allow async operations
-                try:
-                    event_type, event_data = event_queue.get(timeout=0.1)
-                except queue.Empty:
-                    await asyncio.sleep(0)
+                        event_data = {
+                            'type': 'assistant_message',
+                            'step': 'model',
+                            'content': msg.text,
+                            'delta': True
+                        }
+                        stream.publish(event_data)
                     continue
-                
-                if event_type == "done":
-                    break
-                elif event_type == "error":
-                    error_data = {'type': 'error', 'message': event_data}
-                    yield f"data: {json.dumps(error_data)}\n\n"
-                    await asyncio.sleep(0)
-                    break
-                elif event_type == "chunk":
-                    chunk = event_data
-                    for step, data in chunk.items():
-                        if 'messages' in data and len(data['messages']) > 0:
-                            msg = data['messages'][-1]
-                            
-                            # Check if message has content_blocks
-                            if hasattr(msg, 'content_blocks'):
-                                content_blocks = msg.content_blocks
-                                
-                                for block in content_blocks:
-                                    if block['type'] == 'text':
-                                        # Text content - check step to determine if it's tool output or assistant message
-                                        event_data = {
-                                            'type': 'tool_response' if step == 'tools' else 'assistant_message',
-                                            'step': step,
-                                            'content': block['text']
-                                        }
-                                        yield f"data: {json.dumps(event_data)}\n\n"
-                                        await asyncio.sleep(0)  # Force flush
-                                    
-                                    elif block['type'] == 'tool_call':
-                                        # Tool call event
-                                        event_data = {
-                                            'type': 'tool_call',
-                                            'step': step,
-                                            'name': block['name'],
-                                            'args': block.get('args', {}),
-                                            'id': block.get('id', '')
-                                        }
-                                        yield f"data: {json.dumps(event_data)}\n\n"
-                                        await asyncio.sleep(0)  # Force flush
-                            
-                            # Handle plain content attribute
-                            elif hasattr(msg, 'content') and msg.content:
+
+                for step, data in chunk.items():
+                    if not data or 'messages' not in data or len(data['messages']) == 0:
+                        continue
+                    msg = data['messages'][-1]
+                    
+                    # Check if message has content_blocks
+                    if hasattr(msg, 'content_blocks'):
+                        content_blocks = msg.content_blocks
+                        
+                        for block in content_blocks:
+                            if block['type'] == 'text' and step == 'model':
+                                continue  # Already streamed as token deltas
+
+                            if block['type'] == 'text':
+                                # Text content - check step to determine if it's tool output or assistant message
                                 event_data = {
                                     'type': 'tool_response' if step == 'tools' else 'assistant_message',
                                     'step': step,
-                                    'content': str(msg.content)
+                                    'content': block['text']
                                 }
-                                yield f"data: {json.dumps(event_data)}\n\n"
-                                await asyncio.sleep(0)  # Force flush
-            
-            # Send completion event
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
-            await asyncio.sleep(0)  # Force flush
-            
+                                if step == 'tools':
+                                    event_data['name'] = getattr(msg, 'name', None)
+                                    event_data['id'] = getattr(msg, 'tool_call_id', None)
+                                stream.publish(event_data)
+                            
+                            elif block['type'] == 'tool_call':
+                                # Tool call event
+                                event_data = {
+                                    'type': 'tool_call',
+                                    'step': step,
+                                    'name': block['name'],
+                                    'args': block.get('args', {}),
+                                    'id': block.get('id', '')
+                                }
+                                stream.publish(event_data)
+                    
+                    # Handle plain content attribute
+                    elif hasattr(msg, 'content') and msg.content and step != 'model':
+                        event_data = {
+                            'type': 'tool_response' if step == 'tools' else 'assistant_message',
+                            'step': step,
+                            'content': str(msg.content)
+                        }
+                        stream.publish(event_data)
+
+        except RunCancelled as e:
+            stream.publish({'type': 'cancelled', 'reason': str(e)})
         except Exception as e:
             error_data = {'type': 'error', 'message': str(e)}
-            yield f"data: {json.dumps(error_data)}\n\n"
-            await asyncio.sleep(0)  # Force flush
-    
+            stream.publish(error_data)
+        
+        # Send completion event
+        stream.publish({'type': 'done'})
+        completed = True
+        
+    except Exception as e:
+        error_data = {'type': 'error', 'message': str(e)}
+        stream.publish(error_data)
+
+    finally:
+        # Task cancelled mid-turn: stop tools and subprocesses still running in worker threads
+        if not completed:
+            cancel_token.cancel("run aborted")
+        stream.close()
+        session.cancel_token = None
+        session.touch()
+        session.lock.release()
+
+
+def abandon_run(session, stream: RunStream):
+    """All clients disconnected: cancel the run unless one resumes within the grace period"""
+    def cancel_if_abandoned():
+        if stream.subscribers == 0 and not stream.closed and session.cancel_token is not None:
+            session.cancel_token.cancel("client disconnected")
+
+    asyncio.get_running_loop().call_later(SSE_RESUME_GRACE, cancel_if_abandoned)
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """Start an agent turn and stream its events using Server-Sent Events"""
+
+    session = sessions.get(message.thread_id)
+    if session.busy:
+        raise HTTPException(status_code=409, detail=f"Thread {message.thread_id} is busy")
+
+    # Turns on the same thread are serialized, different threads stream concurrently
+    await session.lock.acquire()
+    cancel_token = CancellationToken()
+    stream = RunStream()
+    stream.on_idle = lambda: abandon_run(session, stream)
+    session.cancel_token = cancel_token
+    session.stream = stream
+    session.start_turn(run_turn(session, message, cancel_token, stream))
+
+    return StreamingResponse(
+        stream.frames(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@app.get("/api/chat/stream/{thread_id}")
+async def resume_chat_stream(thread_id: str, last_event_id: Optional[str] = Header(None)):
+    """Reconnect to the latest run of a thread, replaying events after Last-Event-ID"""
+    session = sessions.find(thread_id)
+    if session is None or session.stream is None:
+        raise HTTPException(status_code=404, detail=f"No run to resume on thread {thread_id}")
+
     return StreamingResponse(
-        event_generator(),
+        session.stream.frames(parse_last_event_id(last_event_id)),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        }
+        headers=SSE_HEADERS
     )
 
 # Human Feedback Endpoints
 @app.get("/api/feedback/check")
-async def check_feedback_request():
-    """Check if feedback is being requested"""
-    return feedback_manager.get_feedback_state()
+async def check_feedback_request(thread_id: str = "1"):
+    """Check if feedback is being requested on a thread"""
+    return feedback_manager.get_feedback_state(thread_id)
 
 @app.post("/api/feedback/submit")
 async def submit_feedback(response: FeedbackResponse):
     """Submit feedback response from UI"""
-    feedback_manager.set_feedback_response(response.feedback, response.accepted)
-    return {"status": "success"}
+    if not feedback_manager.set_feedback_response(response.thread_id, response.feedback, response.accepted):
+        return {"status": "idle", "message": "No feedback request pending", "thread_id": response.thread_id}
+    return {"status": "success", "thread_id": response.thread_id}
 
 
 # Serve static files from ui/dist directory
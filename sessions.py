@@ -0,0 +1,155 @@
+"""
+Session Registry - One agent session per chat thread
+Keeps per-thread run locks, activity timestamps and idle eviction
+"""
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Coroutine, Dict, List, Optional
+
+from cancellation import CancellationToken
+from sse import RunStream
+
+# ============================================
+# Configuration
+# ============================================
+SESSION_IDLE_TIMEOUT = 60 * 30      # Evict sessions idle for 30 minutes
+SESSION_SWEEP_INTERVAL = 60         # Check for idle sessions every minute
+
+
+@dataclass
+class Session:
+    """State of a single chat thread"""
+    thread_id: str
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.time)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    cancel_token: Optional[CancellationToken] = None    # Token of the running turn
+    stream: Optional[RunStream] = None                  # Events of the latest turn, kept for resume
+    task: Optional[asyncio.Task] = None                 # Task of the latest turn, referenced so it is not garbage-collected
+
+    @property
+    def busy(self) -> bool:
+        """True while an agent turn is streaming on this thread"""
+        return self.lock.locked()
+
+    def cancel(self, reason: str = "cancelled by user") -> bool:
+        """Cancel the running turn. Returns False if nothing is running"""
+        if not self.busy or self.cancel_token is None:
+            return False
+        self.cancel_token.cancel(reason)
+        return True
+
+    def start_turn(self, turn: Coroutine) -> asyncio.Task:
+        """Run an agent turn in a task owned by the session, an exception it raises is logged"""
+        self.task = asyncio.create_task(turn)
+        self.task.add_done_callback(self._turn_done)
+        return self.task
+
+    def _turn_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Agent turn on thread {self.thread_id} failed: {task.exception()!r}")
+
+    def stop_turn(self) -> None:
+        """Cancel the turn task if it is still running (the session is being closed)"""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    def touch(self) -> None:
+        """Mark the session as active now"""
+        self.last_active = time.time()
+
+    def info(self) -> Dict:
+        """Serializable summary for the API"""
+        return {
+            "thread_id": self.thread_id,
+            "created_at": self.created_at,
+            "last_active": self.last_active,
+            "busy": self.busy,
+        }
+
+
+class SessionRegistry:
+    """
+    Registry of chat sessions keyed by thread_id.
+
+    The compiled agent is shared; conversation state lives in the checkpointer
+    under each thread_id. `on_close` is called with the thread_id when a session
+    is reset, `on_evict` when it is evicted for being idle (defaults to on_close)
+    so callers can drop per-thread state.
+    """
+
+    def __init__(
+        self,
+        on_close: Optional[Callable[[str], None]] = None,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+        on_evict: Optional[Callable[[str], None]] = None
+    ):
+        self._sessions: Dict[str, Session] = {}
+        self._guard = threading.Lock()
+        self._on_close = on_close
+        self._on_evict = on_evict or on_close
+        self.idle_timeout = idle_timeout
+
+    def get(self, thread_id: str) -> Session:
+        """Return the session for thread_id, creating it if needed"""
+        with self._guard:
+            session = self._sessions.get(thread_id)
+            if session is None:
+                session = Session(thread_id=thread_id)
+                self._sessions[thread_id] = session
+        session.touch()
+        return session
+
+    def find(self, thread_id: str) -> Optional[Session]:
+        """Return the session for thread_id without creating it"""
+        with self._guard:
+            return self._sessions.get(thread_id)
+
+    def reset(self, thread_id: str) -> bool:
+        """Drop a session and its conversation state. Returns False if it is busy"""
+        with self._guard:
+            session = self._sessions.get(thread_id)
+            if session is not None and session.busy:
+                return False
+            self._sessions.pop(thread_id, None)
+        if session is not None:
+            session.stop_turn()
+        self._close(thread_id, self._on_close)
+        return True
+
+    def evict_idle(self, now: Optional[float] = None) -> List[str]:
+        """Evict sessions idle for longer than idle_timeout"""
+        now = now or time.time()
+        with self._guard:
+            expired = [
+                thread_id for thread_id, session in self._sessions.items()
+                if not session.busy and now - session.last_active > self.idle_timeout
+            ]
+            evicted = [self._sessions.pop(thread_id) for thread_id in expired]
+
+        for session in evicted:
+            session.stop_turn()
+            self._close(session.thread_id, self._on_evict)
+        return expired
+
+    def list_sessions(self) -> List[Dict]:
+        """Summaries of all live sessions"""
+        with self._guard:
+            return [session.info() for session in self._sessions.values()]
+
+    async def sweep_forever(self, interval: float = SESSION_SWEEP_INTERVAL) -> None:
+        """Background task: periodically evict idle sessions"""
+        while True:
+            await asyncio.sleep(interval)
+            evicted = self.evict_idle()
+            if evicted:
+                print(f"Evicted idle sessions: {evicted}")
+
+    def _close(self, thread_id: str, callback: Optional[Callable[[str], None]]) -> None:
+        if callback is not None:
+            try:
+                callback(thread_id)
+            except Exception as e:
+                print(f"Error closing session {thread_id}: {e}")
@@ -0,0 +1,122 @@
+"""
+SSE Encoder - orjson frames, batched flushes and Last-Event-ID resume
+Each agent run publishes its events into a RunStream ring buffer; HTTP
+responses subscribe to it and receive coalesced frames, so a reconnecting
+client can replay everything after the last event id it saw.
+"""
+import os
+import asyncio
+import itertools
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+import orjson
+
+# ============================================
+# Configuration
+# ============================================
+SSE_COALESCE_WINDOW = float(os.getenv("SSE_COALESCE_WINDOW", "0.005"))  # seconds frames are batched into one write
+SSE_BUFFER_SIZE = int(os.getenv("SSE_BUFFER_SIZE", "2000"))              # events kept per run for replay
+SSE_RESUME_GRACE = float(os.getenv("SSE_RESUME_GRACE", "10"))           # seconds a run survives without clients
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def encode_frame(event_id: int, event: Dict) -> bytes:
+    """Encode one event as an SSE frame with an id field"""
+    return b"id: %d\ndata: %s\n\n" % (event_id, orjson.dumps(event, default=str))
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Parse a Last-Event-ID header value, 0 means replay from the start"""
+    try:
+        return max(int(value), 0) if value else 0
+    except ValueError:
+        return 0
+
+
+class RunStream:
+    """
+    Ring buffer of encoded SSE frames for a single agent run.
+
+    The producer calls publish()/close(); any number of subscribers read
+    with frames(). `on_idle` is called when the last subscriber detaches
+    before the run finished (used to cancel abandoned runs).
+    """
+
+    def __init__(
+        self,
+        maxlen: int = SSE_BUFFER_SIZE,
+        window: float = SSE_COALESCE_WINDOW,
+        on_idle: Optional[Callable[[], None]] = None
+    ):
+        self._frames: Deque[Tuple[int, bytes]] = deque(maxlen=maxlen)
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._waiter: Optional[asyncio.Future] = None
+        self.window = window
+        self.on_idle = on_idle
+        self.subscribers = 0
+        self.closed = False
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event: Dict) -> int:
+        """Append an event and wake subscribers. Returns its event id"""
+        event_id = next(self._ids)
+        self._frames.append((event_id, encode_frame(event_id, event)))
+        self._last_id = event_id
+        self._wakeup()
+        return event_id
+
+    def close(self) -> None:
+        """Mark the run finished, subscribers drain the buffer and stop"""
+        self.closed = True
+        self._wakeup()
+
+    def _since(self, cursor: int) -> bytes:
+        """Concatenate all buffered frames with id > cursor"""
+        if not self._frames or cursor >= self._last_id:
+            return b""
+        first_id = self._frames[0][0]
+        start = max(cursor - first_id + 1, 0)
+        return b"".join(frame for _, frame in itertools.islice(self._frames, start, None))
+
+    def _wakeup(self) -> None:
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def _wait(self) -> None:
+        if self._waiter is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+        # shield: a disconnecting subscriber must not cancel the shared future
+        await asyncio.shield(self._waiter)
+
+    async def frames(self, last_event_id: int = 0) -> AsyncIterator[bytes]:
+        """Yield batches of frames after last_event_id until the run is closed"""
+        self.subscribers += 1
+        cursor = last_event_id
+        try:
+            while True:
+                batch = self._since(cursor)
+                if batch:
+                    cursor = self._last_id
+                    yield batch
+                    # Frames published within the window are flushed together in the next write
+                    if self.window and not self.closed:
+                        await asyncio.sleep(self.window)
+                    continue
+                if self.closed:
+                    break
+                await self._wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.closed and self.on_idle is not None:
+                self.on_idle()
@@ -0,0 +1,15 @@
+"""
+Test setup - run the modules against a throwaway memory folder and the offline model
+The environment is set before any project module is imported, the memory
+paths are resolved at import time.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ["MEMORY_ROOT"] = tempfile.mkdtemp(prefix="memory-tests-")
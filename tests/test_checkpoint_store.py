@@ -0,0 +1,81 @@
+import asyncio
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from checkpoint_store import SqliteCheckpointSaver
+
+
+def make_checkpoint(step: int, messages: list) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": messages, "todos": ["plan"]}
+    checkpoint["channel_versions"] = {"messages": str(step), "todos": "1"}   # todos never change
+    return checkpoint
+
+
+def save(saver, config, step: int) -> dict:
+    checkpoint = make_checkpoint(step, [f"message {i}" for i in range(step)])
+    new_versions = {"messages": str(step), **({"todos": "1"} if step == 1 else {})}
+    return saver.put(config, checkpoint, {"step": step}, new_versions)
+
+
+def blob_versions(saver) -> set:
+    return set(saver.conn.execute("SELECT channel, version FROM blobs").fetchall())
+
+
+def test_put_get_list_and_prune_round_trip(tmp_path):
+    saver = SqliteCheckpointSaver(tmp_path / "checkpoints.db", retention=3)
+    config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+    for step in range(1, 7):
+        config = save(saver, config, step)
+
+    latest = saver.get_tuple({"configurable": {"thread_id": "t1", "checkpoint_ns": ""}})
+    assert latest.checkpoint["channel_values"] == {"messages": [f"message {i}" for i in range(6)], "todos": ["plan"]}
+    assert latest.metadata["step"] == 6
+
+    listed = list(saver.list({"configurable": {"thread_id": "t1"}}))
+    assert [item.metadata["step"] for item in listed] == [6, 5, 4]
+    # blobs no retained checkpoint refers to are gone, the shared todos blob stays
+    assert blob_versions(saver) == {("messages", "4"), ("messages", "5"), ("messages", "6"), ("todos", "1")}
+    assert listed[-1].checkpoint["channel_values"]["todos"] == ["plan"]
+
+    saver.delete_thread("t1")
+    assert saver.get_tuple({"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}) is None
+    assert saver.conn.execute("SELECT COUNT(*) FROM refs").fetchone() == (0,)
+    saver.close()
+
+
+def test_existing_database_gets_its_refs_backfilled(tmp_path):
+    path = tmp_path / "checkpoints.db"
+    saver = SqliteCheckpointSaver(path, retention=2)
+    config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+    for step in range(1, 3):
+        config = save(saver, config, step)
+    saver.conn.execute("DELETE FROM refs")   # as written before the refs table existed
+    saver.close()
+
+    saver = SqliteCheckpointSaver(path, retention=2)
+    save(saver, config, 3)
+    assert blob_versions(saver) == {("messages", "2"), ("messages", "3"), ("todos", "1")}
+    saver.close()
+
+
+def test_async_api_matches_the_sync_api(tmp_path):
+    saver = SqliteCheckpointSaver(tmp_path / "checkpoints.db", retention=2)
+
+    async def scenario():
+        config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+        for step in range(1, 4):
+            checkpoint = make_checkpoint(step, [f"message {i}" for i in range(step)])
+            config = await saver.aput(config, checkpoint, {"step": step}, {"messages": str(step), "todos": "1"})
+        await saver.aput_writes(config, [("messages", ["pending"])], task_id="task")
+
+        latest = await saver.aget_tuple(config)
+        listed = [item async for item in saver.alist({"configurable": {"thread_id": "t1"}})]
+        await saver.adelete_thread("t1")
+        return latest, listed, await saver.aget_tuple(config)
+
+    latest, listed, deleted = asyncio.run(scenario())
+    assert latest.pending_writes == [("task", "messages", ["pending"])]
+    assert [item.metadata["step"] for item in listed] == [3, 2]
+    assert deleted is None
+    saver.close()
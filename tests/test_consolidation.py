@@ -0,0 +1,55 @@
+from langchain_core.messages import AIMessage
+
+from memory.memory import CONSOLIDATION_WATERMARK, Memory, parse_consolidation_reply
+
+
+class ScriptedAgent:
+    """Consolidation agent stub: replies cut off at the token cap for batches over `fits` entries"""
+
+    def __init__(self, fits: int):
+        self.fits = fits
+        self.batches = []
+
+    def invoke(self, state):
+        prompt = state["messages"][0].content
+        entries = [line for line in prompt.splitlines() if line.strip().startswith("- ") and "**" not in line]  # not the format example
+        self.batches.append(len(entries))
+        if len(entries) > self.fits:
+            return {"messages": [AIMessage("[semantic.md] Partial\n- cut", response_metadata={"finish_reason": "length"})]}
+        bullets = "\n".join(f"- kept {line.strip()[2:]}" for line in entries)
+        return {"messages": [AIMessage(f"[semantic.md] Batch\n{bullets}", response_metadata={"done_reason": "stop"})]}
+
+
+def test_reply_parsing():
+    assert parse_consolidation_reply(AIMessage("NONE")) == []
+    assert parse_consolidation_reply(AIMessage("Nothing new here.")) is None
+    assert parse_consolidation_reply(AIMessage("[semantic.md] A\n- b", response_metadata={"done_reason": "length"})) is None
+    assert parse_consolidation_reply(AIMessage("[semantic.md] A\n- b")) == [("semantic.md", "A", "b")]
+
+
+def test_truncated_batches_are_retried_before_the_watermark_moves():
+    memory = Memory()
+    topics = ["sqlite WAL mode", "asyncio cancellation", "npm lockfiles", "pytest fixtures", "utf-8 decoding"]
+    for topic in topics:
+        memory.memorize({"insights": f"Learned something specific about {topic}"})
+    memory.consolidation_agent = agent = ScriptedAgent(fits=2)
+
+    stats = memory.consolidate()
+
+    assert stats["entries_processed"] == 5
+    assert stats["entries_added"] == 5
+    assert stats["failed_calls"] >= 1
+    assert max(agent.batches[1:]) <= 2
+    assert memory.store.watermark(CONSOLIDATION_WATERMARK) == max(e.id for e in memory.store.entries(tier="short"))
+
+
+def test_unusable_single_entry_keeps_the_watermark():
+    memory = Memory()
+    before = memory.store.watermark(CONSOLIDATION_WATERMARK)
+    memory.memorize({"failures": "a failure the model cannot summarize"})
+    memory.consolidation_agent = ScriptedAgent(fits=0)
+
+    stats = memory.consolidate()
+
+    assert stats["entries_processed"] == 0
+    assert memory.store.watermark(CONSOLIDATION_WATERMARK) == before
@@ -0,0 +1,33 @@
+import random
+
+from bench_hazards import check_regressions, corpus, legacy_validate
+from executor import scan_hazards, validate_command
+
+# fragments that hit single rules, overlapping rules and nothing at all
+FRAGMENTS = [
+    "npm install", "python main.py", "localhost", "bash", "rm -rf /", "rm", "del", "format", "cmd",
+    "&&", ";", "|", ">", "..", "/etc/", "/bin/sh", "$(whoami)", "`id`", "eval(x)", "import os",
+    "require('fs')", "127.0.0.1", "Get-Process", "C:\\\\Windows", "echo", "$(a; b)", "`x | y`", "--port", "8000",
+]
+
+
+def test_scanner_agrees_with_the_legacy_loop_on_the_corpus():
+    assert check_regressions(corpus()) == []
+
+
+def test_scanner_agrees_with_the_legacy_loop_on_random_commands():
+    rng = random.Random(0)
+    for _ in range(2000):
+        cmd = " ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 5)))
+        _, _, pattern = validate_command(cmd)
+        assert (pattern is None, pattern) == legacy_validate(cmd), cmd
+
+
+def test_rules_inside_other_hits_are_reported():
+    # `$(...)` is one hit of the scanner, the earlier `;` rule matches inside it
+    matches = scan_hazards("echo $(id; ls)")
+    assert [(match.pattern, match.start, match.text) for match in matches] == [
+        (r'\$\(.*\)', 5, "$(id; ls)"),
+        (r';', 9, ";"),
+    ]
+    assert validate_command("echo $(id; ls)")[2] == ";"
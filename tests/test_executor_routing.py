@@ -0,0 +1,29 @@
+import executor
+from executor import CommandType, _changes_environment, _route_command, execute, resolve_toolchain
+
+
+def routed(command: str, cmd_type: CommandType):
+    return _route_command(command.split(), cmd_type)
+
+
+def test_only_installs_and_venv_creation_change_the_environment():
+    assert _changes_environment(routed("pip install requests", CommandType.PIP), CommandType.PIP)
+    assert _changes_environment(routed("pip uninstall -y requests", CommandType.PIP), CommandType.PIP)
+    assert _changes_environment(routed("python -m pip install requests", CommandType.PYTHON), CommandType.PYTHON)
+    assert _changes_environment(routed("python -m venv venv", CommandType.PYTHON), CommandType.PYTHON)
+    for command in ("pip list", "pip show requests", "pip --version", "pip freeze"):
+        assert not _changes_environment(routed(command, CommandType.PIP), CommandType.PIP), command
+    assert not _changes_environment(routed("python -m pip list", CommandType.PYTHON), CommandType.PYTHON)
+
+
+def test_pip_list_keeps_the_toolchain_cache(monkeypatch):
+    shutdowns = []
+    monkeypatch.setattr(executor, "shutdown_warm_workers", lambda: shutdowns.append(True))
+    resolve_toolchain()
+    misses = resolve_toolchain.cache_info().misses
+
+    result = execute("pip list", timeout=120)
+
+    assert result.success, result.stderr
+    assert resolve_toolchain.cache_info().misses == misses
+    assert shutdowns == []
@@ -0,0 +1,26 @@
+import threading
+
+import feedback_manager
+
+
+def test_feedback_requests_are_kept_per_thread():
+    responses = {}
+
+    def ask(thread_id):
+        responses[thread_id] = feedback_manager.request_feedback_from_ui(thread_id)
+
+    waiting = [threading.Thread(target=ask, args=(thread_id,)) for thread_id in ("a", "b")]
+    for waiter in waiting:
+        waiter.start()
+    while not all(feedback_manager.get_feedback_state(thread_id)["requested"] for thread_id in ("a", "b")):
+        pass
+
+    assert feedback_manager.set_feedback_response("b", "looks good", True)
+    waiting[1].join(timeout=5)
+    assert responses == {"b": {"feedback": "looks good", "accepted": True}}
+    assert feedback_manager.get_feedback_state("a")["requested"]
+
+    assert feedback_manager.set_feedback_response("a", "", False)
+    waiting[0].join(timeout=5)
+    assert responses["a"] == {"feedback": "", "accepted": False}
+    assert not feedback_manager.set_feedback_response("a", "late", True)
@@ -0,0 +1,31 @@
+import asyncio
+import os
+import tempfile
+
+from memory.ltm import LongTermMemoryLoader
+
+
+def write(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_edit_right_after_watch_starts_is_not_missed():
+    async def scenario():
+        folder = tempfile.mkdtemp(prefix="ltm-watch-")
+        semantic = os.path.join(folder, "semantic.md")
+        write(semantic, "## Topic\n\n- old fact\n")
+        loader = LongTermMemoryLoader(folder)
+        assert "old fact" in loader.snapshot()[1]
+
+        watcher = asyncio.create_task(loader.watch())
+        await asyncio.sleep(0)              # watch() started, its watcher may not be registered yet
+        write(semantic, "## Topic\n\n- new fact, longer\n")
+
+        _, content, _ = loader.select("topic", 0)
+        assert "new fact" in content
+
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+
+    asyncio.run(scenario())
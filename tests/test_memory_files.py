@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+from memory.memory import forget_reads, read_file, write_file
+from memory.paths import resolve_memory_path
+
+
+def runtime(run: str) -> SimpleNamespace:
+    return SimpleNamespace(config={"configurable": {"thread_id": run}})
+
+
+def test_second_writer_of_the_same_version_is_rejected():
+    path = resolve_memory_path("short_term_memory/insights.md")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("- original\n", encoding="utf-8")
+
+    assert read_file.func("short_term_memory/insights.md", runtime("a")) == "- original\n"
+    assert read_file.func("short_term_memory/insights.md", runtime("b")) == "- original\n"
+
+    assert write_file.func("short_term_memory/insights.md", "- original\n- from b\n", runtime("b")) == "Content successfully written"
+    result = write_file.func("short_term_memory/insights.md", "- original\n- from a\n", runtime("a"))
+
+    assert result.startswith("Error writing to file: it was changed")
+    assert path.read_text(encoding="utf-8") == "- original\n- from b\n"
+
+
+def test_write_without_read_is_rejected():
+    path = resolve_memory_path("short_term_memory/observations.md")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("- kept\n", encoding="utf-8")
+
+    result = write_file.func("short_term_memory/observations.md", "- overwritten\n", runtime("c"))
+
+    assert result.startswith("Error writing to file: read it first")
+    assert path.read_text(encoding="utf-8") == "- kept\n"
+
+
+def test_missing_file_can_be_created_after_reading_it():
+    run = runtime("d")
+    assert read_file.func("short_term_memory/new.md", run).startswith("Error reading file")
+    assert write_file.func("short_term_memory/new.md", "- first\n", run) == "Content successfully written"
+    forget_reads("d")
+    assert resolve_memory_path("short_term_memory/new.md").read_text(encoding="utf-8") == "- first\n"
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from executor import ProcessPool, execute_streaming, process_pool
+
+
+def test_async_waiters_hold_no_threads_and_are_served_in_order():
+    async def scenario():
+        pool = ProcessPool(max_processes=1, per_thread=5)
+        assert await pool.acquire_async("holder")
+        threads_before = threading.active_count()
+        order = []
+
+        async def waiter(n):
+            assert await pool.acquire_async(f"t{n}")
+            order.append(n)
+            await asyncio.sleep(0.01)
+            pool.release(f"t{n}")
+
+        tasks = [asyncio.create_task(waiter(n)) for n in range(20)]
+        await asyncio.sleep(0.05)
+        assert pool.stats()["queued"] == 20
+        assert threading.active_count() == threads_before
+
+        threading.Timer(0.05, pool.release, args=("holder",)).start()   # released from another thread
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        assert order == list(range(20))
+        assert pool.stats()["running"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    async def scenario():
+        pool = ProcessPool(max_processes=1, per_thread=1)
+        assert await pool.acquire_async("holder")
+        waiting = asyncio.create_task(pool.acquire_async("other"))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        pool.release("holder")
+        stats = pool.stats()
+        assert (stats["queued"], stats["running"]) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+# leaves a child behind that keeps the output pipes open after the run's process is killed
+PIPE_HOLDING_SCRIPT = """
+import time, multiprocessing
+multiprocessing.get_context("fork").Process(target=time.sleep, args=(2,)).start()
+print("started")
+time.sleep(30)
+"""
+
+
+def test_cancelled_streaming_run_stops_its_readers():
+    async def scenario():
+        run = asyncio.create_task(execute_streaming(
+            ["python", "-u", "-c", PIPE_HOLDING_SCRIPT],
+            thread_id="cancelled", warm_python=False, on_output=lambda *_: started.set(),
+        ))
+        await asyncio.wait_for(started.wait(), 30)
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+        assert [task for task in asyncio.all_tasks() if task.get_coro().__name__ == "_read_stream"] == []
+        assert process_pool.stats()["running"] == 0
+        # the killed process is reaped once the left-behind child closes the pipes
+        await asyncio.wait_for(asyncio.gather(*(asyncio.all_tasks() - {asyncio.current_task()})), 10)
+
+    started = asyncio.Event()
+    asyncio.run(scenario())
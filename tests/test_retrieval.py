@@ -0,0 +1,27 @@
+from memory.retrieval import BM25Index
+
+
+def test_removed_slots_are_reused():
+    index = BM25Index()
+    for round_ in range(50):
+        for n in range(10):
+            index.add(f"{round_}-{n}", f"entry {n} about pytest fixtures round{round_}")
+        for n in range(10):
+            if round_ < 49 or n % 2:
+                index.remove(f"{round_}-{n}")
+
+    assert len(index) == 5
+    assert len(index._doc_ids) == 10
+    assert sorted(doc_id for doc_id, _ in index.search("round49 fixtures", k=10)) == [f"49-{n}" for n in (0, 2, 4, 6, 8)]
+    assert index.search("round48") == []
+
+
+def test_updated_document_replaces_its_postings():
+    index = BM25Index()
+    index.add("a", "sqlite checkpoint retention")
+    index.add("b", "bm25 retrieval")
+    index.add("a", "zstd compression")
+
+    assert index.search("checkpoint") == []
+    assert [doc_id for doc_id, _ in index.search("compression")] == ["a"]
+    assert len(index._doc_ids) == 2
@@ -0,0 +1,36 @@
+import asyncio
+
+from sessions import SessionRegistry
+
+
+def test_turn_exceptions_are_logged(capsys):
+    async def scenario():
+        session = SessionRegistry().get("t1")
+
+        async def failing_turn():
+            raise RuntimeError("boom")
+
+        task = session.start_turn(failing_turn())
+        assert session.task is task
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)  # let the done callback run
+
+    asyncio.run(scenario())
+    assert "Agent turn on thread t1 failed: RuntimeError('boom')" in capsys.readouterr().out
+
+
+def test_reset_and_eviction_cancel_the_turn_task():
+    async def scenario():
+        registry = SessionRegistry(idle_timeout=0)
+        tasks = []
+        for thread_id in ("reset", "idle"):
+            session = registry.get(thread_id)
+            tasks.append(session.start_turn(asyncio.sleep(60)))   # the lock is free, the task is still running
+        await asyncio.sleep(0)
+
+        assert registry.reset("reset")
+        assert registry.evict_idle(now=float("inf")) == ["idle"]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+    asyncio.run(scenario())
@@ -3,14 +3,35 @@ from memory.memory import Memory
 import os
 from typing import Dict, Literal
 from schemas import Todo, NextTodo
-from executor import execute
+from executor import execute_streaming
+from cancellation import RunCancelled, get_cancel_token
 
 
-agent_todos = []
+# todos are kept per chat thread, keyed by thread_id
+agent_todos: Dict[str, list] = {}
+
+
+def _thread_id(runtime: ToolRuntime) -> str:
+    """Get the thread_id of the chat session running the tool"""
+    return runtime.config.get("configurable", {}).get("thread_id", "1")
+
+
+def current_todo(thread_id: str):
+    """Subtask of the first todo of a thread that is not completed yet, None without todos"""
+    for todo in agent_todos.get(thread_id, []):
+        if todo.get("status") != "completed":
+            return todo.get("subtask")
+    return None
+
+
+def clear_todos(thread_id: str) -> None:
+    """Drop the todo list of a chat thread (on session reset/eviction)"""
+    agent_todos.pop(thread_id, None)
+
 
 # todo write tool to write the entire todos to the list
 @tool
-def todo_write(todos: list[Dict[str, str]]):
+def todo_write(todos: list[Dict[str, str]], runtime: ToolRuntime):
     """
     Write the entire todos to the list intially when starting a new task.
 
@@ -34,16 +55,14 @@ def todo_write(todos: list[Dict[str, str]]):
     Returns:
         str: Confirmation message of successful write.
     """
-    global agent_todos
-
-    agent_todos = todos  # Update the global todos variable with the provided list
+    agent_todos[_thread_id(runtime)] = todos  # Update the todos of the current thread with the provided list
 
     return "Todo list saved successfully"
 
 
 # function to get the next todo item
 @tool
-def todo_next(completed_subtask:Dict[str, str] = None, intial_todo: bool = False):
+def todo_next(runtime: ToolRuntime, completed_subtask:Dict[str, str] = None, intial_todo: bool = False):
     """
     Mark a subtask as completed and retrieve the next pending todo item.
 
@@ -69,30 +88,30 @@ def todo_next(completed_subtask:Dict[str, str] = None, intial_todo: bool = False
         NextTodo: Object with fields (subtask, instructions) for next pending task.
     """
 
-    global agent_todos  # Access the global todos variable
+    todos = agent_todos.get(_thread_id(runtime), [])  # Access the todos of the current thread
 
     if intial_todo:
-        if not agent_todos:
+        if not todos:
             return "No todos found. Please write todos first using todo_write tool."
         return NextTodo(
-            subtask = agent_todos[0]["subtask"],
+            subtask = todos[0]["subtask"],
             instructions = "This is the first todo item to be addressed."
         )
 
     #check if todos exist
-    if not agent_todos:
+    if not todos:
         return "No todos found. Please write todos first using todo_write tool."
     #mark the given subtask as completed
     todo_next = 0
-    for todo in agent_todos:
+    for todo in todos:
         todo_next += 1
         if todo["subtask"] == completed_subtask["subtask"]:
             todo["status"] = "completed"
             break
     #get the next pending todo  
-    if todo_next < len(agent_todos):
+    if todo_next < len(todos):
         return NextTodo(
-            subtask = agent_todos[todo_next]["subtask"],
+            subtask = todos[todo_next]["subtask"],
             instructions = "This is the next todo item to be addressed.")
     else:
         return NextTodo(
@@ -354,7 +373,7 @@ def glob(pattern:str, directory:str = "") -> list:
 
 
 @tool
-def get_human_feedback():
+def get_human_feedback(runtime: ToolRuntime):
     """
     Get human feedback for the agent's execution through the UI.
     
@@ -381,7 +400,7 @@ def get_human_feedback():
     # Import the request function from feedback_manager (avoids circular import)
     try:
         from feedback_manager import request_feedback_from_ui
-        response = request_feedback_from_ui()
+        response = request_feedback_from_ui(_thread_id(runtime), cancel_token=get_cancel_token(runtime.config))
         
         feedback = response.get("feedback", "")
         accepted = response.get("accepted", False)
@@ -389,6 +408,8 @@ def get_human_feedback():
         #if not accepted:
             #return "Human feedback request was rejected. Continue with your best judgment."
             
+    except RunCancelled:
+        raise
     except Exception as e:
         # Fallback to terminal input if UI is not available
         feedback = input("Please provide feedback: ")
@@ -415,7 +436,7 @@ def get_human_feedback():
 memory_system = Memory()
 
 @tool
-def memorization(coding_knowledge: str = None, architectural_decisions: str = None, preferences: str = None, observations: str = None, insights: str = None, constraints_discovery: str = None, edges_cases_discovery: str = None, failures: str = None):
+def memorization(runtime: ToolRuntime, coding_knowledge: str = None, architectural_decisions: str = None, preferences: str = None, observations: str = None, insights: str = None, constraints_discovery: str = None, edges_cases_discovery: str = None, failures: str = None):
 
     """
     This tool is used to store structured learning extracted from the agent’s reasoning after completing a TODO or encountering an error.
@@ -516,31 +537,26 @@ def memorization(coding_knowledge: str = None, architectural_decisions: str = No
 
     
 
-    memory_headings = {
-        "coding_knowledge": "Coding Knowledge",
-        "architectural_decisions": "Architectural Decisions",
-        "preferences": "Preferences",
-        "observations": "Observations",
-        "insights": "Insights",
-        "constraints_discovery": "Constraints Discovery",
-        "edges_cases_discovery": "Edges Cases Discovery",
-        "failures": "Failures"
+    memory_entries = {
+        "coding_knowledge": coding_knowledge,
+        "architectural_decisions": architectural_decisions,
+        "preferences": preferences,
+        "observations": observations,
+        "insights": insights,
+        "constraints_discovery": constraints_discovery,
+        "edges_cases_discovery": edges_cases_discovery,
+        "failures": failures
     }
 
+    #queue each provided memory component as an entry of its short-term category, written in the background (no LLM call)
+    thread_id = _thread_id(runtime)
+    queued = memory_system.memorize_later(
+        {category: text for category, text in memory_entries.items() if text is not None},
+        source_thread=thread_id,
+        source_todo=current_todo(thread_id)
+    )
 
-    memory_abstractions = [coding_knowledge, architectural_decisions, preferences, observations, insights, constraints_discovery, edges_cases_discovery, failures]
-
-    #name associations or details and some context at the memory associations variable.
-    memory_associations = ""
-
-    for i in range(len(memory_abstractions)):
-        if memory_abstractions[i] is not None:
-            memory_associations += f"#{memory_headings[list(memory_headings.keys())[i]]} -{ memory_abstractions[i]}\n"
-
-    #call memory(memory_associations) to store the important information in the memory
-    response = memory_system.memorize(memory_associations)
-
-    return f"memorization done you can retrieve the important information later when needed. Response from memory system: {response}"
+    return f"memorization done you can retrieve the important information later when needed. Response from memory system: Queued {queued} memory entries for storage."
 
 
 
@@ -657,15 +673,16 @@ def consolidate():
 
     """
 
-    memory_system.consolidate()
+    stats = memory_system.consolidate()
 
-    return "Memory consolidation completed. Important information has been retained in long-term memory for future use."
+    return (f"Memory consolidation completed. {stats['entries_processed']} new short-term entries processed, "
+            f"{stats['entries_added']} entries added to long-term memory for future use.")
 
 
 
 def force_consolidate():
 
-    memory_system.consolidate()
+    return memory_system.consolidate()
 
 
 
@@ -673,7 +690,7 @@ def force_consolidate():
 
 # executes only python and npm commands
 @tool
-def execute_command(command:str):
+async def execute_command(command:str, runtime: ToolRuntime):
     """
     executes only python, pip and npm commands in the terminal and returns the output. It validates the command before execution to ensure it is either a python,pip or npm command.
     If the command is invalid, it returns an error message. If the command is valid but fails during execution, it returns the error message from the terminal.
@@ -705,6 +722,24 @@ def execute_command(command:str):
     
     """
 
-    output = execute(command)
+    def forward(stream: str, text: str):
+        # live output of the running command, sent to the UI as tool_progress events
+        try:
+            runtime.stream_writer({
+                "type": "tool_progress",
+                "id": runtime.tool_call_id,
+                "name": "execute_command",
+                "stream": stream,
+                "content": text,
+            })
+        except Exception:
+            pass  # not streaming (e.g. invoke), progress is best effort
+
+    output = await execute_streaming(
+        command,
+        cancel_token=get_cancel_token(runtime.config),
+        on_output=forward,
+        thread_id=_thread_id(runtime)
+    )
 
     return output
\ No newline at end of file
@@ -2,7 +2,6 @@ import { useState, useRef, useEffect } from 'react';
 import FileTree from './components/FileTree';
 import EditorComponent from './components/Editor';
 import Chat from './components/Chat';
-import FeedbackModal from './components/FeedbackModal';
 
 function App() {
   const [selectedFile, setSelectedFile] = useState<string | null>(null);
@@ -12,7 +11,6 @@ function App() {
   const [chatWidth, setChatWidth] = useState(25); // percentage
   const [isResizingLeft, setIsResizingLeft] = useState(false);
   const [isResizingRight, setIsResizingRight] = useState(false);
-  const [showFeedbackModal, setShowFeedbackModal] = useState(false);
 
   const handleFileSelect = (path: string, folder: string) => {
     setSelectedFile(path);
@@ -75,38 +73,6 @@ function App() {
     };
   }, [isResizingLeft, isResizingRight]);
 
-  // Poll for feedback requests
-  useEffect(() => {
-    const checkFeedbackRequest = async () => {
-      try {
-        const response = await fetch('/api/feedback/check');
-        const data = await response.json();
-        
-        if (data.requested && !showFeedbackModal) {
-          setShowFeedbackModal(true);
-        }
-      } catch (error) {
-        console.error('Error checking feedback request:', error);
-      }
-    };
-
-    const interval = setInterval(checkFeedbackRequest, 1000); // Check every second
-    return () => clearInterval(interval);
-  }, [showFeedbackModal]);
-
-  const handleFeedbackSubmit = async (feedback: string, accepted: boolean) => {
-    try {
-      await fetch('/api/feedback/submit', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ feedback, accepted }),
-      });
-      setShowFeedbackModal(false);
-    } catch (error) {
-      console.error('Error submitting feedback:', error);
-    }
-  };
-
   const editorWidth = 100 - fileTreeWidth - chatWidth;
 
   return (
@@ -141,13 +107,6 @@ function App() {
       <div style={{ width: `${chatWidth}%`, minWidth: '300px', height: '100%', overflow: 'hidden' }}>
         <Chat />
       </div>
-
-      {showFeedbackModal && (
-        <FeedbackModal
-          onSubmit={handleFeedbackSubmit}
-          onClose={() => setShowFeedbackModal(false)}
-        />
-      )}
     </div>
   );
 }
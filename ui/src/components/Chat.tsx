@@ -1,19 +1,28 @@
 import React, { useState, useRef, useEffect } from 'react';
 import ReactMarkdown from 'react-markdown';
+import FeedbackModal from './FeedbackModal';
 
 interface Message {
   type: 'user' | 'assistant' | 'tool_call' | 'tool_response';
   content: string;
   toolName?: string;
   toolArgs?: any;
+  toolCallId?: string;
+  output?: string;  // live output of a running command (tool_progress events)
   expanded?: boolean;
 }
 
+// Live command output kept per tool call in the chat, older output is dropped
+const MAX_LIVE_OUTPUT_CHARS = 4000;
+
 const Chat: React.FC = () => {
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState('');
   const [isStreaming, setIsStreaming] = useState(false);
   const [expandedMessages, setExpandedMessages] = useState<Set<number>>(new Set());
+  // Each chat tab gets its own agent session on the server
+  const [threadId, setThreadId] = useState<string>(() => crypto.randomUUID());
+  const [showFeedbackModal, setShowFeedbackModal] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
@@ -32,9 +41,11 @@ const Chat: React.FC = () => {
       await fetch('/api/chat/reset', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ thread_id: threadId }),
       });
       
       // Clear UI state
+      setThreadId(crypto.randomUUID());
       setMessages([]);
       setInput('');
       setExpandedMessages(new Set());
@@ -51,19 +62,31 @@ const Chat: React.FC = () => {
     if (isStreaming) return;
     
     try {
+      // Consolidation runs in the background, the endpoint answers 202 with a job id
       const response = await fetch('/api/memory/consolidate', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
       });
       
       const data = await response.json();
+      if (!response.ok) throw new Error(data.detail || 'Consolidation was not accepted');
+
+      let job = data.job;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const poll = await fetch(`/api/memory/consolidate/${data.job_id}`);
+        if (!poll.ok) throw new Error('Consolidation job was lost');
+        job = await poll.json();
+      }
       
-      if (data.status === 'success') {
+      if (job.status === 'done') {
         // Add success message to chat
         setMessages(prev => [...prev, {
           type: 'assistant',
-          content: '✓ Memory consolidation completed successfully. Short-term memories have been transferred to long-term storage.'
+          content: `✓ Memory consolidation completed successfully. ${job.stats.entries_processed} new short-term memories processed, ${job.stats.entries_added} added to long-term storage.`
         }]);
+      } else {
+        throw new Error(job.error || 'Consolidation failed');
       }
     } catch (error) {
       console.error('Failed to consolidate memory:', error);
@@ -74,6 +97,53 @@ const Chat: React.FC = () => {
     }
   };
 
+  // Poll for feedback requests of this session's agent
+  useEffect(() => {
+    const checkFeedbackRequest = async () => {
+      try {
+        const response = await fetch(`/api/feedback/check?thread_id=${encodeURIComponent(threadId)}`);
+        const data = await response.json();
+        
+        if (data.requested && !showFeedbackModal) {
+          setShowFeedbackModal(true);
+        }
+      } catch (error) {
+        console.error('Error checking feedback request:', error);
+      }
+    };
+
+    const interval = setInterval(checkFeedbackRequest, 1000); // Check every second
+    return () => clearInterval(interval);
+  }, [threadId, showFeedbackModal]);
+
+  const handleFeedbackSubmit = async (feedback: string, accepted: boolean) => {
+    try {
+      await fetch('/api/feedback/submit', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ thread_id: threadId, feedback, accepted }),
+      });
+      setShowFeedbackModal(false);
+    } catch (error) {
+      console.error('Error submitting feedback:', error);
+    }
+  };
+
+  const handleCancel = async () => {
+    if (!isStreaming) return;
+
+    try {
+      // Ask backend to stop the running agent turn of this session
+      await fetch('/api/chat/cancel', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ thread_id: threadId }),
+      });
+    } catch (error) {
+      console.error('Failed to cancel run:', error);
+    }
+  };
+
   const toggleExpand = (index: number) => {
     setExpandedMessages(prev => {
       const newSet = new Set(prev);
@@ -99,79 +169,111 @@ const Chat: React.FC = () => {
     setIsStreaming(true);
 
     try {
-      const response = await fetch('/api/chat/stream', {
+      let response = await fetch('/api/chat/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
           content: userMessage.content,
-          thread_id: '1',
+          thread_id: threadId,
         }),
       });
 
-      const reader = response.body?.getReader();
-      const decoder = new TextDecoder();
+      // Last SSE event id seen, used to resume the run if the connection drops
+      let lastEventId = '';
+      let finished = false;
 
-      if (!reader) {
-        throw new Error('Failed to get response stream');
-      }
+      for (let attempt = 0; !finished; attempt++) {
+        try {
+          const reader = response.body?.getReader();
+          const decoder = new TextDecoder();
+
+          if (!reader) {
+            throw new Error('Failed to get response stream');
+          }
 
-      let buffer = '';
+          let buffer = '';
 
-      while (true) {
-        const { done, value } = await reader.read();
+          while (true) {
+            const { done, value } = await reader.read();
         
-        if (done) break;
+            if (done) break;
 
-        buffer += decoder.decode(value, { stream: true });
-        const lines = buffer.split('\n');
-        buffer = lines.pop() || '';
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop() || '';
 
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            const data = line.slice(6);
+            for (const line of lines) {
+              if (line.startsWith('id: ')) {
+                lastEventId = line.slice(4);
+              } else if (line.startsWith('data: ')) {
+                const data = line.slice(6);
             
-            try {
-              const event = JSON.parse(data);
+                try {
+                  const event = JSON.parse(data);
               
-              if (event.type === 'assistant_message') {
-                setMessages(prev => {
-                  if (!event.content) return prev;
+                  if (event.type === 'done') {
+                    finished = true;
+                  } else if (event.type === 'assistant_message') {
+                    setMessages(prev => {
+                      if (!event.content) return prev;
                   
-                  const lastMsg = prev[prev.length - 1];
+                      const lastMsg = prev[prev.length - 1];
                   
-                  // Simple rule: If last message is assistant, append. Otherwise, create new.
-                  // This naturally separates messages after tools because tool messages
-                  // are different types (tool_call/tool_response)
-                  if (lastMsg && lastMsg.type === 'assistant') {
-                    // Append to existing assistant message - continuation
-                    return [
-                      ...prev.slice(0, -1),
-                      { ...lastMsg, content: lastMsg.content + event.content }
-                    ];
-                  } else {
-                    // Create new assistant message (first message or after non-assistant)
-                    return [...prev, { type: 'assistant', content: event.content }];
+                      // Simple rule: If last message is assistant, append. Otherwise, create new.
+                      // This naturally separates messages after tools because tool messages
+                      // are different types (tool_call/tool_response)
+                      if (lastMsg && lastMsg.type === 'assistant') {
+                        // Append to existing assistant message - continuation
+                        return [
+                          ...prev.slice(0, -1),
+                          { ...lastMsg, content: lastMsg.content + event.content }
+                        ];
+                      } else {
+                        // Create new assistant message (first message or after non-assistant)
+                        return [...prev, { type: 'assistant', content: event.content }];
+                      }
+                    });
+                  } else if (event.type === 'tool_call') {
+                    const toolMsg: Message = {
+                      type: 'tool_call',
+                      content: `Calling: ${event.name}`,
+                      toolName: event.name,
+                      toolArgs: event.args,
+                      toolCallId: event.id,
+                    };
+                    setMessages(prev => [...prev, toolMsg]);
+                  } else if (event.type === 'tool_progress') {
+                    setMessages(prev => {
+                      const i = prev.map(m => m.toolCallId).lastIndexOf(event.id);
+                      if (i === -1) return prev;
+                      const output = ((prev[i].output || '') + event.content).slice(-MAX_LIVE_OUTPUT_CHARS);
+                      return [...prev.slice(0, i), { ...prev[i], output }, ...prev.slice(i + 1)];
+                    });
+                  } else if (event.type === 'cancelled') {
+                    setMessages(prev => [...prev, {
+                      type: 'assistant',
+                      content: '✗ Run cancelled.'
+                    }]);
+                  } else if (event.type === 'tool_response') {
+                    const toolRespMsg: Message = {
+                      type: 'tool_response',
+                      content: event.content || 'Tool executed',
+                    };
+                    setMessages(prev => [...prev, toolRespMsg]);
                   }
-                });
-              } else if (event.type === 'tool_call') {
-                const toolMsg: Message = {
-                  type: 'tool_call',
-                  content: `Calling: ${event.name}`,
-                  toolName: event.name,
-                  toolArgs: event.args,
-                };
-                setMessages(prev => [...prev, toolMsg]);
-              } else if (event.type === 'tool_response') {
-                const toolRespMsg: Message = {
-                  type: 'tool_response',
-                  content: event.content || 'Tool executed',
-                };
-                setMessages(prev => [...prev, toolRespMsg]);
+                } catch (e) {
+                  console.error('Failed to parse event:', e);
+                }
               }
-            } catch (e) {
-              console.error('Failed to parse event:', e);
             }
           }
+          break;
+        } catch (error) {
+          // Connection dropped mid-run: resume once from the last received event
+          if (attempt >= 1) throw error;
+          response = await fetch(`/api/chat/stream/${threadId}`, {
+            headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+          });
         }
       }
     } catch (error) {
@@ -266,6 +368,11 @@ const Chat: React.FC = () => {
                 {!isExpanded && hasMoreArgs && '\n...'}
               </div>
             )}
+            {msg.output && (
+              <div className={`tool-content ${isExpanded ? 'expanded' : ''}`}>
+                {isExpanded ? msg.output : msg.output.split('\n').slice(-3).join('\n')}
+              </div>
+            )}
           </div>
         );
       
@@ -360,12 +467,19 @@ const Chat: React.FC = () => {
         />
         <button
           className="send-button"
-          onClick={handleSend}
-          disabled={isStreaming || !input.trim()}
+          onClick={isStreaming ? handleCancel : handleSend}
+          disabled={!isStreaming && !input.trim()}
         >
-          {isStreaming ? 'Sending...' : 'Send'}
+          {isStreaming ? 'Stop' : 'Send'}
         </button>
       </div>
+
+      {showFeedbackModal && (
+        <FeedbackModal
+          onSubmit={handleFeedbackSubmit}
+          onClose={() => setShowFeedbackModal(false)}
+        />
+      )}
     </div>
   );
 };
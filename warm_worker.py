@@ -0,0 +1,178 @@
+"""
+Warm Python Worker - Pre-forked interpreter for workspace python commands
+Started by executor.WarmPythonWorker with the workspace venv python. It imports
+the preload modules once, then forks a child per run: the child takes over the
+output pipes sent with the request, applies the rlimits and runs the script with
+runpy. Every run starts from the worker's module cache, whatever a run imports
+dies with its child. Standard library only, it runs inside the workspace venv.
+
+Protocol (AF_UNIX SOCK_SEQPACKET, one JSON object per message):
+    <- {"ready": true, "preloaded": [...], "failed": [...]}    once, after the preload
+    -> {"id", "mode", "target", "argv", "cwd", "rlimit_cpu", "rlimit_as"} + [stdout fd, stderr fd]
+    <- {"id", "pid"}                                            after the fork
+    <- {"id", "exit_code"}                                      when the child exited (-N = signal N)
+The worker exits once the executor closes its end and the running children are done.
+"""
+import json
+import os
+import runpy
+import selectors
+import signal
+import socket
+import sys
+import traceback
+import types
+
+MAX_MESSAGE = 1 << 16
+
+
+def _send(sock: socket.socket, message: dict) -> None:
+    sock.send(json.dumps(message).encode())
+
+
+def _exit_code(code) -> int:
+    """Exit status of `sys.exit(code)`, as the interpreter computes it"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _print_traceback() -> None:
+    """Print the current exception without the frames of this worker and runpy"""
+    etype, value, tb = sys.exc_info()
+    while tb is not None and (tb.tb_frame.f_globals is globals() or tb.tb_frame.f_globals is vars(runpy)):
+        tb = tb.tb_next
+    traceback.print_exception(etype, value, tb)
+
+
+def _run(request: dict) -> int:
+    """Run the requested script, module or code as __main__, return the exit code"""
+    mode, target = request["mode"], request["target"]
+    sys.argv = list(request["argv"])
+    sys.path.insert(0, os.path.dirname(target) if mode == "path" else os.getcwd() if mode == "module" else "")
+    try:
+        if mode == "path":
+            runpy.run_path(target, run_name="__main__")
+        elif mode == "module":
+            runpy.run_module(target, run_name="__main__", alter_sys=True)
+        else:
+            main = types.ModuleType("__main__")
+            sys.modules["__main__"] = main
+            exec(compile(target, "<string>", "exec"), main.__dict__)
+    except SystemExit as e:
+        return _exit_code(e.code)
+    except BaseException:
+        _print_traceback()
+        return 1
+    return 0
+
+
+def _child(request: dict, fds, keep_closed) -> None:
+    """Forked child: become the run's process, never returns to the worker loop"""
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    for closable in keep_closed:
+        closable.close()
+
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(fds[0], 1)
+    os.dup2(fds[1], 2)
+    for fd in (devnull, *fds):
+        os.close(fd)
+    os.chdir(request["cwd"])
+
+    cpu, address_space = request.get("rlimit_cpu", 0), request.get("rlimit_as", 0)
+    if cpu or address_space:
+        import resource
+        if cpu:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+        if address_space:
+            resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+
+    # a regular interpreter exit: stdio is flushed, atexit handlers run, threads are joined
+    raise SystemExit(_run(request))
+
+
+def _reap(sock: socket.socket, runs: dict) -> None:
+    """Report the exit status of every finished child"""
+    while runs:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        run_id = runs.pop(pid, None)
+        if run_id is not None:
+            try:
+                _send(sock, {"id": run_id, "exit_code": os.waitstatus_to_exitcode(status)})
+            except OSError:
+                pass  # the executor is gone
+
+
+def main() -> None:
+    sock = socket.socket(fileno=int(sys.argv[1]))
+    del sys.path[0]  # the worker's folder is not on the path of the scripts
+
+    preloaded, failed = [], []
+    for name in filter(None, (sys.argv[2] if len(sys.argv) > 2 else "").split(",")):
+        try:
+            __import__(name.strip())
+            preloaded.append(name.strip())
+        except Exception:
+            failed.append(name.strip())
+
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ)
+    selector.register(wake_r, selectors.EVENT_READ)
+    wake_files = [os.fdopen(wake_r, "rb", buffering=0), os.fdopen(wake_w, "wb", buffering=0)]
+    runs = {}
+    accepting = True
+    _send(sock, {"ready": True, "preloaded": preloaded, "failed": failed})
+
+    while accepting or runs:
+        for key, _ in selector.select():
+            if key.fileobj is not sock:
+                try:
+                    while os.read(wake_r, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+                _reap(sock, runs)
+                continue
+            try:
+                data, fds, _, _ = socket.recv_fds(sock, MAX_MESSAGE, 2)
+            except OSError:
+                data, fds = b"", []
+            if not data:
+                accepting = False   # executor closed its end, finish the running children
+                selector.unregister(sock)
+                continue
+            request = json.loads(data)
+            if len(fds) != 2:
+                for fd in fds:
+                    os.close(fd)
+                _send(sock, {"id": request.get("id"), "error": "expected stdout and stderr fds"})
+                continue
+            pid = os.fork()
+            if pid == 0:
+                _child(request, fds, [selector, sock, *wake_files])
+            for fd in fds:
+                os.close(fd)
+            runs[pid] = request["id"]
+            _send(sock, {"id": request["id"], "pid": pid})
+        _reap(sock, runs)
+
+
+if __name__ == "__main__":
+    main()